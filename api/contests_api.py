@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify, request
 import json
 import os
-from services import contest_service
+from services import contest_service, warmup_service
 from utils.jwt_token import validate_token
 from functools import wraps
 from datetime import datetime
@@ -89,3 +89,11 @@ def register_for_contest(current_user, contest_id):
     return jsonify({"message": "Successfully registered for the contest."}), 200
 
 
+
+@contests_bp.route('/<contest_id>/warmup', methods=['GET'])
+@token_required
+def get_contest_warmup_status(current_user, contest_id):
+    status, error = warmup_service.get_warmup_status(contest_id)
+    if error:
+        return jsonify(error), 404
+    return jsonify(status), 200
@@ -1,5 +1,7 @@
+import os
+import math
 from flask import Blueprint, jsonify, request
-from services import problem_service, submission_service, contest_service
+from services import problem_service, submission_service, submission_store, contest_service, manifest_service
 from utils.jwt_token import validate_token
 from functools import wraps
 from extensions import mongo
@@ -24,6 +26,27 @@ def token_required(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
+def admin_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = None
+        if 'Authorization' in request.headers:
+            token = request.headers['Authorization'].split(" ")[1]
+
+        if not token:
+            return jsonify({'message': 'Token is missing!'}), 401
+
+        result = validate_token(token)
+        if not result['valid']:
+            return jsonify({'message': result['error']}), 401
+
+        current_user = result['data']
+        admin_usernames = [name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()]
+        if current_user['username'] not in admin_usernames:
+            return jsonify({'message': 'Admin access required'}), 403
+        return f(current_user, *args, **kwargs)
+    return decorated
+
 @problems_bp.route('/', methods=['GET'])
 @token_required
 def get_problems(current_user):
@@ -87,6 +110,10 @@ def submit_problem(current_user, problem_id):
 
     # Call the minimal submission service
     result = submission_service.handle_new_submission(problem_id, current_user['username'], language, code)
+    if 'retry_after_s' in result:
+        response = jsonify(result)
+        response.headers['Retry-After'] = str(math.ceil(result['retry_after_s']))
+        return response, 429
 
     return jsonify(result), 200
 
@@ -120,7 +147,7 @@ def get_problem_submissions(current_user, problem_id):
         if contest.get('status_info', {}).get('status') == 'Running':
             filters['username'] = current_user['username']
 
-    problem_submissions = list(mongo.db.submissions.find(filters, {'_id': 0}))
+    problem_submissions = list(mongo.db.submissions.find(filters, submission_store.SUMMARY_PROJECTION))
     return jsonify(problem_submissions), 200
 
 @problems_bp.route('/<problem_id>/meta', methods=['GET'])
@@ -130,4 +157,22 @@ def get_problem_meta_by_id(current_user, problem_id):
     if error:
         return jsonify(error), 404
     
-    return jsonify(problem), 200
\ No newline at end of file
+    return jsonify(problem), 200
+
+@problems_bp.route('/<problem_id>/manifest', methods=['GET'])
+@admin_required
+def get_problem_manifest(current_user, problem_id):
+    manifest, error = manifest_service.get_manifest(problem_id, force_refresh=True)
+    if error:
+        return jsonify(error), 404
+
+    return jsonify(manifest), 200
+
+@problems_bp.route('/<problem_id>/manifest/bump', methods=['POST'])
+@admin_required
+def bump_problem_manifest(current_user, problem_id):
+    manifest, error = manifest_service.bump_version(problem_id, current_user['username'])
+    if error:
+        return jsonify(error), 400
+
+    return jsonify(manifest), 200
@@ -1,19 +1,132 @@
-from flask import Blueprint, jsonify
-from services import submission_service
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from services import submission_service, submission_store, progress_service, rejudge_service, metrics_service
+from utils.jwt_token import validate_token
+from functools import wraps
 from extensions import mongo
 from services.github_services import get_file
 from config.github_config import GITHUB_SUBMISSIONS_BASE_PATH
 import json
+import os
 
 submissions_bp = Blueprint('submissions_bp', __name__)
 
+def admin_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = None
+        if 'Authorization' in request.headers:
+            token = request.headers['Authorization'].split(" ")[1]
+
+        if not token:
+            return jsonify({'message': 'Token is missing!'}), 401
+
+        result = validate_token(token)
+        if not result['valid']:
+            return jsonify({'message': result['error']}), 401
+
+        current_user = result['data']
+        admin_usernames = [name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()]
+        if current_user['username'] not in admin_usernames:
+            return jsonify({'message': 'Admin access required'}), 403
+        return f(current_user, *args, **kwargs)
+    return decorated
+
 @submissions_bp.route('/queue', methods=['GET'])
 def get_submissions_queue():
-    queue = submission_service.get_submissions_queue()
-    return jsonify(queue)
+    try:
+        limit = int(request.args.get('limit', submission_service.QUEUE_PAGE_DEFAULT_SIZE))
+    except ValueError:
+        return jsonify({"message": "limit must be an integer"}), 400
+    page, error = submission_service.get_submissions_queue(
+        username=request.args.get('username'),
+        problem_id=request.args.get('problem_id'),
+        cursor=request.args.get('cursor'),
+        limit=limit
+    )
+    if error:
+        return jsonify(error), 400
+    return jsonify(page), 200
+
+@submissions_bp.route('/queue/summary', methods=['GET'])
+def get_submissions_queue_summary():
+    return jsonify(submission_service.get_queue_summary())
+
+@submissions_bp.route('/queue/stats', methods=['GET'])
+def get_submissions_queue_stats():
+    return jsonify(submission_service.get_queue_stats())
+
+@submissions_bp.route('/judge/http-pool', methods=['GET'])
+def get_judge_http_pool_stats():
+    return jsonify(submission_service.get_grader_stats("http_pool"))
+
+@submissions_bp.route('/judge/engine', methods=['GET'])
+def get_judge_engine_stats():
+    return jsonify(submission_service.get_grader_stats("engine"))
+
+@submissions_bp.route('/judge/slots', methods=['GET'])
+def get_judge_slot_stats():
+    return jsonify(submission_service.get_grader_stats("slots"))
+
+@submissions_bp.route('/judge/metrics', methods=['GET'])
+@admin_required
+def get_judge_metrics(current_user):
+    try:
+        window_s = int(request.args.get('window_s', metrics_service.METRICS_WINDOW_S))
+    except ValueError:
+        return jsonify({"message": "window_s must be an integer"}), 400
+    return jsonify({"queue": submission_service.get_queue_summary(), **metrics_service.get_window_metrics(window_s)}), 200
+
+@submissions_bp.route('/rejudge', methods=['POST'])
+@admin_required
+def start_rejudge(current_user):
+    filters = request.get_json() or {}
+    job, error = rejudge_service.start_rejudge(filters, current_user['username'])
+    if error:
+        return jsonify(error), 400
+    return jsonify(job), 202
+
+@submissions_bp.route('/rejudge/<job_id>', methods=['GET'])
+@admin_required
+def get_rejudge_job(current_user, job_id):
+    job, error = rejudge_service.get_rejudge_job(job_id)
+    if error:
+        return jsonify(error), 404
+    return jsonify(job), 200
+
+@submissions_bp.route('/users/<username>/events', methods=['GET'])
+def stream_user_submission_events(username):
+    return Response(
+        stream_with_context(progress_service.stream_user_events(username)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@submissions_bp.route('/<submission_id>/events', methods=['GET'])
+def stream_submission_events(submission_id):
+    return Response(
+        stream_with_context(progress_service.stream_events(submission_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@submissions_bp.route('/<submission_id>/status', methods=['GET'])
+def get_submission_status(submission_id):
+    status, error = submission_service.get_submission_status(submission_id)
+    if error:
+        return jsonify(error), 404
+    return jsonify(status), 200
 
 @submissions_bp.route('/<submission_id>', methods=['GET'])
 def get_submission_by_id(submission_id):
+    submission = submission_store.get_submission(submission_id)
+    if submission is not None:
+        return jsonify(submission), 200
+
+    queued = submission_service.get_queued_submission(submission_id)
+    if queued is not None:
+        return jsonify(queued), 200
+
+    # Submissions graded before records were kept in MongoDB are only in the GitHub archive
     submission_path = f"{GITHUB_SUBMISSIONS_BASE_PATH}/{submission_id}/meta.json"
     submission_content, _, error = get_file(submission_path)
 
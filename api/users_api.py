@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request
-from services import user_service
+from services import user_service, submission_store
 from utils.jwt_token import validate_token
 from functools import wraps
 from extensions import mongo
@@ -65,5 +65,5 @@ def get_user_submissions(current_user, username):
     if language:
         filters['language'] = language
         
-    user_submissions = list(mongo.db.submissions.find(filters, {'_id': 0}))
+    user_submissions = list(mongo.db.submissions.find(filters, submission_store.SUMMARY_PROJECTION))
     return jsonify(user_submissions), 200
@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, Response
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
@@ -10,7 +10,7 @@ from api.auth_api import auth_bp
 from api.contests_api import contests_bp
 from api.submissions_api import submissions_bp
 from api.users_api import users_bp
-from services import submission_service
+from services import submission_service, progress_service, warmup_service, index_service, metrics_service
 
 def create_app():
     # import logging
@@ -35,7 +35,11 @@ def create_app():
     app.config["MONGO_URI"] = os.getenv("MONGO_URI")
     mongo.init_app(app)
 
+    index_service.init_app(app)
+    progress_service.init_app(app)
     submission_service.init_app(app)
+    if submission_service.GRADE_IN_WEB_PROCESS:
+        warmup_service.init_app(app)
 
     app.register_blueprint(problems_bp, url_prefix='/api/problems')
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -46,6 +50,12 @@ def create_app():
     @app.route("/")
     def root():
         return {"message": "Backend is running!"}
+
+    # Queue and grading metrics for Prometheus (and autoscaling of executor nodes)
+    @app.route("/metrics")
+    def metrics():
+        body = metrics_service.render_prometheus(submission_service.get_queue_summary())
+        return Response(body, mimetype="text/plain; version=0.0.4")
     
     return app
 
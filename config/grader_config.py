@@ -0,0 +1,7 @@
+import os
+import uuid
+import socket
+
+# Identifies this grader in the lease it holds on each claimed submission, and guards every
+# write it makes to a queue document so a grader that lost its lease cannot overwrite the new holder's
+WORKER_ID = os.getenv("GRADER_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
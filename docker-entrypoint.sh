@@ -0,0 +1,37 @@
+#!/bin/bash
+# Starts the processes of one container, by APP_ROLE:
+#   api    - the web API only (scale these independently of the graders)
+#   grader - one grader only (python grader.py)
+#   all    - both, for a single-container deployment (the default)
+set -e
+
+# Threaded workers: every open SSE stream (/events) holds a worker thread, which would be the whole
+# worker with the default sync class
+API_CMD=(gunicorn --bind 0.0.0.0:5000 --worker-class gthread --threads "${GUNICORN_THREADS:-32}" app:app)
+GRADER_CMD=(python grader.py)
+
+case "${APP_ROLE:-all}" in
+    api)
+        exec "${API_CMD[@]}"
+        ;;
+    grader)
+        exec "${GRADER_CMD[@]}"
+        ;;
+    all)
+        "${GRADER_CMD[@]}" & grader_pid=$!
+        "${API_CMD[@]}" & api_pid=$!
+        # Forward the stop signal so the grader drains (see GRADER_DRAIN_TIMEOUT_S) instead of being killed
+        trap 'kill -TERM "$grader_pid" "$api_pid" 2>/dev/null' TERM INT
+        # When either process exits, stop the other, so the container restarts as a whole
+        set +e
+        wait -n "$grader_pid" "$api_pid"
+        status=$?
+        kill -TERM "$grader_pid" "$api_pid" 2>/dev/null
+        wait
+        exit "$status"
+        ;;
+    *)
+        echo "Unknown APP_ROLE: ${APP_ROLE} (expected api, grader or all)" >&2
+        exit 1
+        ;;
+esac
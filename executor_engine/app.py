@@ -1,14 +1,22 @@
+import pathlib
+import tempfile
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from execute import execute_code
+from execute import execute_code, execute_batch
+import calibration
 
 app = Flask(__name__)
 CORS(app)
+calibration.start()
 
 @app.route('/')
 def index():
     return "Code Execution API is running"
 
+@app.route('/api/calibration', methods=['GET'])
+def get_calibration():
+    return jsonify(calibration.get_calibration())
+
 @app.route('/api/execute', methods=['POST'])
 def execute():
     data = request.get_json()
@@ -26,10 +34,60 @@ def execute():
         code=code,
         stdin=stdin,
         time_limit_s=timelimit,
-        memory_limit_mb=memorylimit
+        memory_limit_mb=memorylimit,
+        speed_factor=calibration.get_speed_factor()
     )
 
     return jsonify(result)
 
+@app.route('/api/execute/batch', methods=['POST'])
+def execute_many():
+    data = request.get_json()
+    code = data.get('code')
+    language = data.get('language')
+    stdins = data.get('stdins')
+    timelimit = data.get('timelimit', 2) # Default to 2 seconds
+    memorylimit = data.get('memorylimit', 1024) # Default to 1024 MB
+
+    if not code or not language or not isinstance(stdins, list):
+        return jsonify({'error': 'Code, language and a list of stdins are required.'}), 400
+
+    results = execute_batch(
+        language=language,
+        code=code,
+        stdins=stdins,
+        time_limit_s=timelimit,
+        memory_limit_mb=memorylimit,
+        speed_factor=calibration.get_speed_factor()
+    )
+
+    return jsonify({'results': results})
+
+@app.route('/api/execute/stream', methods=['POST'])
+def execute_stream():
+    # multipart/form-data: the stdin file part is spooled to disk by the form parser, never held in memory
+    code = request.form.get('code')
+    language = request.form.get('language')
+    stdin_file = request.files.get('stdin')
+    timelimit = request.form.get('timelimit', 2) # Default to 2 seconds
+    memorylimit = request.form.get('memorylimit', 1024) # Default to 1024 MB
+
+    if not code or not language or stdin_file is None:
+        return jsonify({'error': 'Code, language and a stdin file are required.'}), 400
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stdin_path = pathlib.Path(temp_dir, 'input.txt')
+        stdin_file.save(stdin_path)
+        result = execute_batch(
+            language=language,
+            code=code,
+            stdins=[stdin_path],
+            time_limit_s=timelimit,
+            memory_limit_mb=memorylimit,
+            speed_factor=calibration.get_speed_factor()
+        )[0]
+
+    return jsonify(result)
+
 if __name__ == '__main__':
     app.run(host="0.0.0.0", port=5000, debug=True)
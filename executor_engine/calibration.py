@@ -0,0 +1,71 @@
+import os
+import time
+import threading
+
+# Seconds the benchmark takes on the reference node; a node twice as slow gets a speed factor of 0.5
+CALIBRATION_REFERENCE_S = float(os.getenv("CALIBRATION_REFERENCE_S", 0.05))
+CALIBRATION_INTERVAL_S = int(os.getenv("CALIBRATION_INTERVAL_S", 600))
+CALIBRATION_RUNS = int(os.getenv("CALIBRATION_RUNS", 5))
+# Bounds that keep a noisy measurement from making limits absurdly tight or loose
+MIN_SPEED_FACTOR = 0.25
+MAX_SPEED_FACTOR = 4.0
+
+_state = {
+    "speed_factor": 1.0,
+    "benchmark_s": None,
+    "calibrated_at": None
+}
+_state_lock = threading.Lock()
+
+def _benchmark():
+    """
+    A fixed CPU-bound workload (integer arithmetic, a list sort and dict updates) standing in for typical solutions.
+    """
+    started = time.perf_counter()
+    total = 0
+    for i in range(300000):
+        total = (total + i * i) % 1000003
+    values = sorted((i * 7919) % 100003 for i in range(100000))
+    counts = {}
+    for value in values:
+        counts[value % 1000] = counts.get(value % 1000, 0) + 1
+    return time.perf_counter() - started
+
+def calibrate():
+    """
+    Runs the benchmark several times and keeps the fastest run, which is the least disturbed by other load.
+    Returns the new calibration.
+    """
+    benchmark_s = min(_benchmark() for _ in range(CALIBRATION_RUNS))
+    speed_factor = min(MAX_SPEED_FACTOR, max(MIN_SPEED_FACTOR, CALIBRATION_REFERENCE_S / benchmark_s))
+    with _state_lock:
+        _state.update({
+            "speed_factor": round(speed_factor, 3),
+            "benchmark_s": benchmark_s,
+            "calibrated_at": time.time()
+        })
+        print(f"[Calibration] benchmark took {benchmark_s:.3f}s, speed factor {_state['speed_factor']}")
+        return dict(_state)
+
+def get_speed_factor():
+    with _state_lock:
+        return _state["speed_factor"]
+
+def get_calibration():
+    with _state_lock:
+        return dict(_state)
+
+def _recalibrate_periodically():
+    while True:
+        time.sleep(CALIBRATION_INTERVAL_S)
+        try:
+            calibrate()
+        except Exception as e:
+            print(f"[Calibration] Recalibration failed: {e}")
+
+def start():
+    """
+    Calibrates once at startup, then again every CALIBRATION_INTERVAL_S in the background.
+    """
+    calibrate()
+    threading.Thread(target=_recalibrate_periodically, daemon=True).start()
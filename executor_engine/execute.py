@@ -3,13 +3,16 @@ import tempfile
 import os
 import re
 import uuid
+import shutil
+import pathlib
 from io import BytesIO
 
 def execute_code(language='python', 
                  code='print("this is test code\\nsubmit ur own code, this is the default code")', 
                  stdin='', 
                  time_limit_s=2, 
-                 memory_limit_mb=1024):
+                 memory_limit_mb=1024,
+                 speed_factor=1.0):
     """
     Executes user-provided code in a secure Docker sandbox using subprocess.
 
@@ -19,10 +22,33 @@ def execute_code(language='python',
         stdin (str): The standard input for the code.
         time_limit_s (int): The time limit in seconds.
         memory_limit_mb (int): The memory limit in megabytes.
+        speed_factor (float): This node's speed relative to the reference node (see calibration.py).
 
     Returns:
         dict: A dictionary containing execution results.
     """
+    return execute_batch(language, code, [stdin], time_limit_s, memory_limit_mb, speed_factor)[0]
+
+def execute_batch(language, code, stdins, time_limit_s=2, memory_limit_mb=1024, speed_factor=1.0):
+    """
+    Compiles user-provided code once and runs it against every input in a single Docker sandbox.
+
+    Args:
+        language (str): The programming language ('c', 'c++', 'python').
+        code (str): The source code to execute.
+        stdins (list): The standard inputs to run the code against. An input given as a
+            pathlib.Path is copied from that file instead of being held in memory.
+        time_limit_s (int): The time limit in seconds for each run, on the reference node.
+        memory_limit_mb (int): The memory limit in megabytes.
+        speed_factor (float): This node's speed relative to the reference node. The limit is
+            stretched on slower nodes and reported times are normalized to the reference node.
+
+    Returns:
+        list: One execution result dictionary per input, in order.
+    """
+    def same_for_all(result):
+        return [dict(result) for _ in stdins]
+
     # 1. Validate the language input
     language = language.lower()
     file_info = {
@@ -31,10 +57,10 @@ def execute_code(language='python',
         'python': {'ext': 'py', 'compiler': None, 'executable': 'solution.py'}
     }
     if language not in file_info:
-        return {
+        return same_for_all({
             "stdout": "", "stderr": "", "err": f"Language '{language}' is not supported.",
             "timetaken": 0, "memorytaken": 0, "success": False
-        }
+        })
 
     # 2. Check for Docker and prepare the image
     image_name = "code-runner-image:latest"
@@ -65,10 +91,10 @@ def execute_code(language='python',
 
     except (subprocess.CalledProcessError, FileNotFoundError) as e:
         error_message = e.stderr.decode('utf-8') if hasattr(e, 'stderr') and e.stderr else str(e)
-        return {
+        return same_for_all({
             "stdout": "", "stderr": "", "err": f"Docker error: {error_message}",
             "timetaken": 0, "memorytaken": 0, "success": False
-        }
+        })
 
     info = file_info[language]
     code_filename = f"solution.{info['ext']}"
@@ -80,10 +106,6 @@ def execute_code(language='python',
         with open(code_filepath, "w") as f:
             f.write(code)
 
-        stdin_filepath = os.path.join(temp_dir, "input.txt")
-        with open(stdin_filepath, "w") as f:
-            f.write(stdin)
-
         container_id = None
         try:
             # 4. Start the container as root
@@ -98,11 +120,10 @@ def execute_code(language='python',
             ]
             container_id = subprocess.check_output(run_cmd).decode('utf-8').strip()
 
-            # 5. Copy files into the container
+            # 5. Copy the code into the container
             subprocess.run(["docker", "cp", code_filepath, f"{container_id}:/sandbox/temp/{code_filename}"], check=True)
-            subprocess.run(["docker", "cp", stdin_filepath, f"{container_id}:/sandbox/temp/input.txt"], check=True)
 
-            # 6. Compilation Step (for C/C++)
+            # 6. Compilation Step (for C/C++), done once for every input
             if info['compiler']:
                 compile_cmd = f"{info['compiler']} -o {info['executable']} {code_filename}"
                 compile_proc = subprocess.run(
@@ -110,65 +131,86 @@ def execute_code(language='python',
                     capture_output=True
                 )
                 if compile_proc.returncode != 0:
-                    return {
+                    return same_for_all({
                         "stdout": "", "stderr": compile_proc.stderr.decode('utf-8'), "err": "Compilation Error",
                         "timetaken": 0, "memorytaken": 0, "success": False
-                    }
-
-            # 7. Execution Step
-            exec_path = info['executable']
-            if language == 'python':
-                run_cmd_main = f"python3 {exec_path}"
-            else:
-                run_cmd_main = f"./{exec_path}"
-            
-            run_cmd_container = f"timeout {time_limit_s}s /usr/bin/time -v {run_cmd_main} < input.txt"
-            
-            exec_proc = subprocess.run(
-                ["docker", "exec", container_id, "/bin/sh", "-c", run_cmd_container],
-                capture_output=True
-            )
-            
-            exit_code = exec_proc.returncode
-            stdout_output = exec_proc.stdout.decode('utf-8')
-            stderr_output = exec_proc.stderr.decode('utf-8')
-
-            # 8. Parse resource usage from stderr
-            time_taken_match = re.search(r"User time \(seconds\): ([\d\.]+)", stderr_output)
-            mem_taken_match = re.search(r"Maximum resident set size \(kbytes\): (\d+)", stderr_output)
-            
-            time_taken = float(time_taken_match.group(1)) if time_taken_match else 0.0
-            mem_taken = float(mem_taken_match.group(1)) / 1024 if mem_taken_match else 0.0
-
-            clean_stderr = re.sub(r"Command being timed:.*\n(.|\n)*", "", stderr_output, 1).strip()
-            
-            # 9. Determine the result
-            if exit_code == 124:
-                return {
-                    "stdout": "", "stderr": "", "err": f"Time Limit Exceeded (> {time_limit_s}s)",
-                    "timetaken": time_limit_s * 1000, "memorytaken": mem_taken, "success": False
-                }
-            elif exit_code == 137:
-                 return {
-                    "stdout": stdout_output, "stderr": clean_stderr, "err": f"Memory Limit Exceeded (> {memory_limit_mb} MB)",
-                    "timetaken": time_taken, "memorytaken": mem_taken, "success": False
-                }
-            elif exit_code == 0:
-                return {
-                    "stdout": stdout_output, "stderr": clean_stderr, "err": "",
-                    "timetaken": time_taken, "memorytaken": mem_taken, "success": True
-                }
-            else:
-                return {
-                    "stdout": stdout_output, "stderr": clean_stderr, "err": f"Runtime Error (Exit Code: {exit_code})",
-                    "timetaken": time_taken, "memorytaken": mem_taken, "success": False
-                }
+                    })
+
+            results = []
+            for stdin in stdins:
+                stdin_filepath = os.path.join(temp_dir, "input.txt")
+                if isinstance(stdin, pathlib.PurePath):
+                    shutil.copyfile(stdin, stdin_filepath)
+                else:
+                    with open(stdin_filepath, "w") as f:
+                        f.write(stdin)
+                subprocess.run(["docker", "cp", stdin_filepath, f"{container_id}:/sandbox/temp/input.txt"], check=True)
+
+                results.append(_run_in_container(container_id, language, info, time_limit_s, memory_limit_mb, speed_factor))
+            return results
 
         finally:
             # 10. Clean up the container
             if container_id:
                 subprocess.run(["docker", "rm", "-f", container_id], capture_output=True)
 
+def _run_in_container(container_id, language, info, time_limit_s, memory_limit_mb, speed_factor=1.0):
+    # 7. Execution Step
+    exec_path = info['executable']
+    if language == 'python':
+        run_cmd_main = f"python3 {exec_path}"
+    else:
+        run_cmd_main = f"./{exec_path}"
+    
+    # A node half as fast as the reference one gets twice the wall time
+    node_time_limit_s = float(time_limit_s) / speed_factor
+    run_cmd_container = f"timeout {node_time_limit_s:.3f}s /usr/bin/time -v {run_cmd_main} < input.txt"
+    
+    exec_proc = subprocess.run(
+        ["docker", "exec", container_id, "/bin/sh", "-c", run_cmd_container],
+        capture_output=True
+    )
+    
+    exit_code = exec_proc.returncode
+    stdout_output = exec_proc.stdout.decode('utf-8')
+    stderr_output = exec_proc.stderr.decode('utf-8')
+
+    # 8. Parse resource usage from stderr
+    time_taken_match = re.search(r"User time \(seconds\): ([\d\.]+)", stderr_output)
+    mem_taken_match = re.search(r"Maximum resident set size \(kbytes\): (\d+)", stderr_output)
+    
+    raw_time_taken = float(time_taken_match.group(1)) if time_taken_match else 0.0
+    time_taken = round(raw_time_taken * speed_factor, 3)
+    mem_taken = float(mem_taken_match.group(1)) / 1024 if mem_taken_match else 0.0
+
+    clean_stderr = re.sub(r"Command being timed:.*\n(.|\n)*", "", stderr_output, 1).strip()
+    
+    # 9. Determine the result
+    if exit_code == 124:
+        return {
+            "stdout": "", "stderr": "", "err": f"Time Limit Exceeded (> {time_limit_s}s)",
+            "timetaken": float(time_limit_s) * 1000, "memorytaken": mem_taken, "success": False,
+            "raw_timetaken": raw_time_taken, "speed_factor": speed_factor
+        }
+    elif exit_code == 137:
+         return {
+            "stdout": stdout_output, "stderr": clean_stderr, "err": f"Memory Limit Exceeded (> {memory_limit_mb} MB)",
+            "timetaken": time_taken, "memorytaken": mem_taken, "success": False,
+            "raw_timetaken": raw_time_taken, "speed_factor": speed_factor
+        }
+    elif exit_code == 0:
+        return {
+            "stdout": stdout_output, "stderr": clean_stderr, "err": "",
+            "timetaken": time_taken, "memorytaken": mem_taken, "success": True,
+            "raw_timetaken": raw_time_taken, "speed_factor": speed_factor
+        }
+    else:
+        return {
+            "stdout": stdout_output, "stderr": clean_stderr, "err": f"Runtime Error (Exit Code: {exit_code})",
+            "timetaken": time_taken, "memorytaken": mem_taken, "success": False,
+            "raw_timetaken": raw_time_taken, "speed_factor": speed_factor
+        }
+
 
 if __name__ == '__main__':
     import json
@@ -0,0 +1,41 @@
+from flask import Flask
+from dotenv import load_dotenv
+import os
+import signal
+import threading
+from extensions import mongo
+from services import submission_service, progress_service, index_service, warmup_service
+
+def create_grader_app():
+    """
+    A bare app that only carries the MongoDB connection: no blueprints, no HTTP server.
+    Run one grader per host with `python grader.py`; graders coordinate through the
+    leases they take on submissions_queue. Concurrency is set with GRADING_ENGINE and
+    GRADING_MIN_IN_FLIGHT / GRADING_MAX_IN_FLIGHT, independently of the web workers.
+    """
+    app = Flask(__name__)
+
+    # Load environment variables
+    load_dotenv()
+
+    # MongoDB configuration
+    app.config["MONGO_URI"] = os.getenv("MONGO_URI")
+    mongo.init_app(app)
+
+    index_service.init_app(app)
+    progress_service.init_app(app)
+    # Contest packages are warmed where they are graded, once per grader rather than once per web worker
+    warmup_service.init_app(app)
+    return app
+
+if __name__ == "__main__":
+    app = create_grader_app()
+    stop = threading.Event()
+    # SIGTERM (e.g. from a deploy) drains the grader instead of killing submissions mid-grading
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    with app.app_context():
+        submission_service.start_grading()
+        while not stop.wait(60):
+            pass
+        submission_service.stop_grading()
@@ -0,0 +1,34 @@
+from flask import Flask
+from dotenv import load_dotenv
+import os
+import sys
+from extensions import mongo
+from services import index_service
+
+def create_index_app():
+    app = Flask(__name__)
+    load_dotenv()
+    app.config["MONGO_URI"] = os.getenv("MONGO_URI")
+    mongo.init_app(app)
+    return app
+
+# Creates the declared indexes and audits the query plans of hot endpoints: `python manage_indexes.py`.
+# Exits with status 1 if an index could not be created or a query scans a whole collection.
+if __name__ == "__main__":
+    app = create_index_app()
+    with app.app_context():
+        names, errors = index_service.ensure_indexes()
+        for name in names:
+            print(f"ok    {name}")
+        for error in errors:
+            print(f"error {error['collection']} {error['keys']}: {error['message']}")
+
+        report, error = index_service.audit_query_plans()
+        if error:
+            print(f"Query plan audit failed: {error['message']}")
+            sys.exit(1)
+        for entry in report:
+            marker = "SCAN " if entry["collection_scan"] else "ok   "
+            print(f"{marker} {entry['query']} ({entry['collection']}): {' <- '.join(entry['stages'])}")
+
+    sys.exit(1 if errors or any(entry["collection_scan"] for entry in report) else 0)
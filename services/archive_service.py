@@ -0,0 +1,95 @@
+import os
+import time
+import threading
+from services.github_services import commit_files
+
+# A batch is committed every ARCHIVE_FLUSH_INTERVAL_S, or as soon as ARCHIVE_BATCH_SIZE submissions are pending
+ARCHIVE_FLUSH_INTERVAL_S = float(os.getenv("ARCHIVE_FLUSH_INTERVAL_S", 10))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 100))
+ARCHIVE_MAX_BACKOFF_S = 300
+
+# path -> content of every file waiting for the next commit; a later write to the same path replaces the earlier one
+_pending_files = {}
+# submission ids with files in _pending_files, for the batch size and the commit message
+_pending_submissions = set()
+_pending_lock = threading.Lock()
+_flush_event = threading.Event()
+_flush_lock = threading.Lock()
+_stats = {
+    "commits": 0,
+    "archived_submissions": 0,
+    "failed_commits": 0,
+    "last_commit_at": None,
+    "last_error": None
+}
+_started = False
+_start_lock = threading.Lock()
+
+def archive(submission_id, files):
+    """
+    Queues the files of one submission ({path: content}) for the next batch commit.
+    """
+    with _pending_lock:
+        _pending_files.update(files)
+        _pending_submissions.add(str(submission_id))
+        full = len(_pending_submissions) >= ARCHIVE_BATCH_SIZE
+    if full:
+        _flush_event.set()
+
+def flush():
+    """
+    Commits every pending file in one commit. Files of a failed commit go back to the
+    pending batch, unless they were written again meanwhile. Returns (commit_sha, error);
+    (None, None) when there is nothing to commit.
+    """
+    with _flush_lock:
+        with _pending_lock:
+            files = dict(_pending_files)
+            submissions = set(_pending_submissions)
+            _pending_files.clear()
+            _pending_submissions.clear()
+        if not files:
+            return None, None
+
+        commit_sha, error = commit_files(files, f"Archive {len(submissions)} submissions")
+        if error:
+            with _pending_lock:
+                for path, data in files.items():
+                    _pending_files.setdefault(path, data)
+                _pending_submissions.update(submissions)
+            _stats.update(failed_commits=_stats["failed_commits"] + 1, last_error=error["message"])
+            print(f"[Archive] Failed to archive {len(submissions)} submissions: {error['message']}")
+            return None, error
+
+        _stats.update(
+            commits=_stats["commits"] + 1,
+            archived_submissions=_stats["archived_submissions"] + len(submissions),
+            last_commit_at=time.time(),
+            last_error=None
+        )
+        print(f"[Archive] Archived {len(submissions)} submissions ({len(files)} files) in commit {commit_sha}")
+        return commit_sha, None
+
+def _flusher():
+    backoff_s = ARCHIVE_FLUSH_INTERVAL_S
+    while True:
+        _flush_event.wait(backoff_s)
+        _flush_event.clear()
+        _commit_sha, error = flush()
+        # Back off while GitHub keeps failing, so a rate limit is not hammered further
+        backoff_s = min(backoff_s * 2, ARCHIVE_MAX_BACKOFF_S) if error else ARCHIVE_FLUSH_INTERVAL_S
+
+def get_archive_stats():
+    with _pending_lock:
+        pending = {"pending_submissions": len(_pending_submissions), "pending_files": len(_pending_files)}
+    return {**_stats, **pending}
+
+def start():
+    """
+    Starts the flusher thread. Safe to call more than once.
+    """
+    global _started
+    with _start_lock:
+        if not _started:
+            threading.Thread(target=_flusher, daemon=True).start()
+            _started = True
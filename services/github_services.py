@@ -1,8 +1,11 @@
 import base64
+import hashlib
+import uuid
 import requests
 import json
 import os
 import time
+import random
 from dotenv import load_dotenv
 import queue
 import threading
@@ -29,6 +32,11 @@ if config_error:
     exit(1)
 
 API_BASE = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/contents"
+GIT_API_BASE = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/git"
+REPO_API_BASE = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}"
+# Branch that commits made through the Git Data API go to; defaults to the repository's default branch
+GITHUB_BRANCH = os.getenv("GITHUB_BRANCH")
+BLOB_CHUNK_BYTES = 64 * 1024
 
 # Create a session and set default headers
 session = requests.Session()
@@ -129,9 +137,9 @@ def get_file(filename_path, force_refresh=False):
     except requests.exceptions.RequestException as e:
         return None, None, {"error": True, "message": f"Request failed: {e}"}
 
-def get_folder_contents(path):
-    # Check cache first
-    if path in folder_cache:
+def get_folder_contents(path, force_refresh=False):
+    # Check cache first, unless force_refresh is True
+    if not force_refresh and path in folder_cache:
         return folder_cache[path], None
 
     url = f"{API_BASE}/{path}"
@@ -150,6 +158,120 @@ def get_folder_contents(path):
     except requests.exceptions.RequestException as e:
         return {"success": False, "error": f"Request failed: {e}"}, None
 
+# --- Git Data Reads (Immutable, addressed by SHA) ---
+def get_tree(tree_sha):
+    """
+    Lists every entry under a tree, recursively. Returns (entries, error).
+    """
+    url = f"{GIT_API_BASE}/trees/{tree_sha}"
+    try:
+        response = session.get(url, params={"recursive": "1"}, timeout=60)
+        if response.status_code != 200:
+            return None, {"error": True, "message": f"Error getting tree: {response.status_code} - {response.text}"}
+        tree = response.json()
+        if tree.get("truncated"):
+            return None, {"error": True, "message": f"Tree {tree_sha} is too large to list"}
+        return tree["tree"], None
+    except requests.exceptions.RequestException as e:
+        return None, {"error": True, "message": f"Request failed: {e}"}
+
+def _git_blob_sha(file_path):
+    digest = hashlib.sha1(f"blob {os.path.getsize(file_path)}\0".encode("ascii"))
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(BLOB_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def download_blob(blob_sha, destination_path):
+    """
+    Streams the raw content of a blob to destination_path and verifies it against its Git SHA,
+    so a corrupted or partial download never replaces the destination.
+    Returns (size, error).
+    """
+    url = f"{GIT_API_BASE}/blobs/{blob_sha}"
+    partial_path = f"{destination_path}.{uuid.uuid4().hex}.part"
+    try:
+        with session.get(url, headers={"Accept": "application/vnd.github.raw+json"}, stream=True, timeout=60) as response:
+            if response.status_code != 200:
+                return None, {"error": True, "message": f"Error getting blob {blob_sha}: {response.status_code}"}
+            with open(partial_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=BLOB_CHUNK_BYTES):
+                    f.write(chunk)
+
+        if _git_blob_sha(partial_path) != blob_sha:
+            return None, {"error": True, "message": f"Blob {blob_sha} failed verification"}
+        size = os.path.getsize(partial_path)
+        os.replace(partial_path, destination_path)
+        return size, None
+    except (requests.exceptions.RequestException, OSError) as e:
+        return None, {"error": True, "message": f"Request failed: {e}"}
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+# --- Git Data Writes (Many Files, One Commit) ---
+_branch = GITHUB_BRANCH
+
+def _get_branch():
+    global _branch
+    if _branch is None:
+        response = session.get(REPO_API_BASE, timeout=30)
+        response.raise_for_status()
+        _branch = response.json()["default_branch"]
+    return _branch
+
+def _create_commit(branch, files, message):
+    """
+    Makes one attempt at committing files on top of the branch head.
+    Returns (commit_sha, conflict); conflict is True when the branch moved before the ref update.
+    """
+    response = session.get(f"{GIT_API_BASE}/ref/heads/{branch}", timeout=30)
+    response.raise_for_status()
+    head_sha = response.json()["object"]["sha"]
+
+    response = session.get(f"{GIT_API_BASE}/commits/{head_sha}", timeout=30)
+    response.raise_for_status()
+    base_tree_sha = response.json()["tree"]["sha"]
+
+    # Inline content creates each blob as part of the tree request, saving a request per file
+    tree = [{"path": path, "mode": "100644", "type": "blob", "content": str(data)} for path, data in files.items()]
+    response = session.post(f"{GIT_API_BASE}/trees", data=json.dumps({"base_tree": base_tree_sha, "tree": tree}), timeout=60)
+    response.raise_for_status()
+    tree_sha = response.json()["sha"]
+
+    response = session.post(f"{GIT_API_BASE}/commits", data=json.dumps({"message": message, "tree": tree_sha, "parents": [head_sha]}), timeout=30)
+    response.raise_for_status()
+    commit_sha = response.json()["sha"]
+
+    response = session.patch(f"{GIT_API_BASE}/refs/heads/{branch}", data=json.dumps({"sha": commit_sha, "force": False}), timeout=30)
+    if response.status_code in (409, 422): # Not a fast-forward: someone committed in between
+        return None, True
+    response.raise_for_status()
+    return commit_sha, False
+
+def commit_files(files, message):
+    """
+    Adds or replaces many files in a single commit through the Git Data API
+    (tree -> commit -> ref update), instead of one Contents API commit per file.
+    When the branch moves while committing, the commit is rebuilt on the new head.
+    Returns (commit_sha, error).
+    """
+    if not files:
+        return None, {"error": True, "message": "files cannot be empty"}
+    try:
+        branch = _get_branch()
+        for attempt in range(MAX_RETRIES):
+            commit_sha, conflict = _create_commit(branch, files, message)
+            if not conflict:
+                for path in files:
+                    invalidate_cache(path)
+                return commit_sha, None
+            print(f"[GitHub] Branch {branch} moved while committing; retrying (Attempt {attempt + 1}/{MAX_RETRIES})")
+            time.sleep(random.uniform(0, 2 ** attempt))
+        return None, {"error": True, "message": f"Branch {branch} kept moving; gave up after {MAX_RETRIES} attempts"}
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        return None, {"error": True, "message": f"Commit failed: {e}"}
+
 # --- Internal Write Operations (Executed by Worker) ---
 def _execute_add_file(filename_path, data, commit_message):
     url = f"{API_BASE}/{filename_path}"
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+import threading
+import concurrent.futures
+from services import judge_service
+from services import progress_service
+from utils import tracing
+from utils.tracing import logger
+
+# --- Downstream Concurrency Limits ---
+# Each downstream gets its own bound; submissions waiting on a bound cost a coroutine, not a thread.
+DOWNSTREAM_LIMITS = {
+    "executor": int(os.getenv("GRADING_EXECUTOR_CONCURRENCY", 16)),
+    "validator": int(os.getenv("GRADING_VALIDATOR_CONCURRENCY", 8)),
+    "github": int(os.getenv("GRADING_GITHUB_CONCURRENCY", 4)),
+    "mongo": int(os.getenv("GRADING_MONGO_CONCURRENCY", 8))
+}
+
+_loop = None
+_io_pool = None
+_semaphores = {}
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+_start_lock = threading.Lock()
+
+async def _run_step(downstream, func, args):
+    async with _semaphores[downstream]:
+        return await _loop.run_in_executor(_io_pool, func, *args)
+
+async def _drive_steps(steps):
+    """
+    Async counterpart of judge_service._drive_steps: every yielded blocking call runs on the
+    I/O pool once its downstream has a free slot, while the event loop keeps other submissions moving.
+    """
+    try:
+        step = next(steps)
+        while True:
+            downstream, func, args = step
+            try:
+                value = await _run_step(downstream, func, args)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(value)
+    except StopIteration as stop:
+        return stop.value
+
+async def grade_submission(submission_id, code, language, problem_id):
+    try:
+        with tracing.span("grade", submission_id=submission_id, problem_id=problem_id):
+            return await _drive_steps(judge_service._grading_steps(submission_id, code, language, problem_id))
+    except Exception as e:
+        logger.exception("Unexpected error while grading submission_id=%s", submission_id)
+        return {"overall_status": "error", "message": f"An unexpected error occurred during grading: {e}"}
+
+async def _grading_task(submission, finalize):
+    global _in_flight
+    print(f"Grading submission: {submission['_id']}")
+    try:
+        submission["started_at"] = time.time()
+        # track relays the transition through MongoDB, so it must not block the event loop
+        await _run_step("mongo", progress_service.track, (submission['_id'], submission.get('username')))
+        grading_results = await grade_submission(
+            submission['_id'],
+            submission['code'],
+            submission['language'],
+            submission['problem_id']
+        )
+        await _run_step("mongo", finalize, (submission, grading_results))
+    except Exception as e:
+        print(f"[Grading Engine] Failed to grade submission {submission['_id']}: {e}")
+    finally:
+        with _in_flight_lock:
+            _in_flight -= 1
+
+async def _create_semaphores():
+    for downstream, limit in DOWNSTREAM_LIMITS.items():
+        _semaphores[downstream] = asyncio.Semaphore(limit)
+
+def start():
+    """
+    Starts the event loop thread. Safe to call more than once.
+    """
+    global _loop, _io_pool
+    with _start_lock:
+        if _loop is not None:
+            return
+
+        # Blocking calls only run while holding a downstream slot, so this many threads is always enough
+        _io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=sum(DOWNSTREAM_LIMITS.values()))
+        _loop = asyncio.new_event_loop()
+        threading.Thread(target=_loop.run_forever, daemon=True).start()
+        # Semaphores are created on the loop itself so they are bound to it on every Python version
+        asyncio.run_coroutine_threadsafe(_create_semaphores(), _loop).result()
+
+def submit(submission, finalize):
+    """
+    Schedules a claimed submission on the event loop. finalize(submission, grading_results)
+    runs after grading, exactly like submission_service.grading_task does.
+    Returns a concurrent.futures.Future.
+    """
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+    return asyncio.run_coroutine_threadsafe(_grading_task(submission, finalize), _loop)
+
+def get_engine_stats():
+    with _in_flight_lock:
+        in_flight = _in_flight
+    return {
+        "in_flight": in_flight,
+        "downstream_limits": dict(DOWNSTREAM_LIMITS)
+    }
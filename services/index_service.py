@@ -0,0 +1,155 @@
+import os
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+from extensions import mongo
+from services.intake_service import DEDUP_WINDOW_S
+
+# Every index the app relies on, by collection: (keys, options). Creating an index that already
+# exists with the same keys and options is a no-op, so ensure_indexes() is safe on every startup.
+INDEXES = {
+    "submissions": [
+        ([("submission_id", ASCENDING)], {"unique": True}),
+        # A user's submissions, optionally for one problem and verdict
+        ([("username", ASCENDING), ("problem_id", ASCENDING), ("status", ASCENDING)], {}),
+        # A problem's submissions, and rejudges by problem and verdict
+        ([("problem_id", ASCENDING), ("status", ASCENDING)], {}),
+        # Rejudges by verdict and language
+        ([("status", ASCENDING), ("language", ASCENDING)], {}),
+        # Recent completions give the grading rate behind queue ETAs
+        ([("graded_at", ASCENDING)], {}),
+    ],
+    "submissions_queue": [
+        ([("status", ASCENDING), ("created_at", ASCENDING)], {}),
+        ([("status", ASCENDING), ("lease_expires_at", ASCENDING)], {}),
+        ([("created_at", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("username", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], {}),
+        ([("problem_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], {}),
+    ],
+    "users": [
+        ([("username", ASCENDING)], {"unique": True}),
+        # Google sign-ins may create users without an email
+        ([("email", ASCENDING)], {"unique": True, "partialFilterExpression": {"email": {"$type": "string"}}}),
+    ],
+    "problems": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("contest_id", ASCENDING)], {}),
+    ],
+    "contests": [
+        ([("id", ASCENDING)], {"unique": True}),
+    ],
+    "problem_manifests": [
+        ([("problem_id", ASCENDING), ("version", DESCENDING)], {"unique": True}),
+    ],
+    "testcase_stats": [
+        ([("problem_id", ASCENDING), ("testcase", ASCENDING)], {"unique": True}),
+    ],
+    "submission_dedup": [
+        ([("created_at", ASCENDING)], {"expireAfterSeconds": DEDUP_WINDOW_S}),
+    ],
+    "rate_limits": [
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "grader_stats": [
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+}
+
+# The queries behind hot endpoints and grader loops, as (name, collection, filter, sort).
+# Values only need the right types; the audit looks at the plan, not at the results.
+AUDITED_QUERIES = [
+    ("GET /api/users/<username>", "users", {"username": ""}, None),
+    ("POST /api/auth/signup", "users", {"email": ""}, None),
+    ("GET /api/users/<username>/submissions", "submissions", {"username": ""}, None),
+    ("GET /api/problems/<problem_id>/submissions", "submissions", {"problem_id": ""}, None),
+    ("GET /api/submissions/<submission_id>", "submissions", {"submission_id": ""}, None),
+    ("GET /api/submissions/queue", "submissions_queue", {}, [("created_at", 1), ("_id", 1)]),
+    ("GET /api/submissions/queue?username=", "submissions_queue", {"username": ""}, [("created_at", 1), ("_id", 1)]),
+    ("GET /api/submissions/queue/summary", "submissions_queue", {"status": "in_queue"}, [("created_at", 1)]),
+    ("GET /api/problems/<problem_id>", "problems", {"id": ""}, None),
+    ("GET /api/contests/<contest_id>", "contests", {"id": ""}, None),
+    ("grader: lease reaper", "submissions_queue", {"status": {"$in": ["grading", "finalizing"]}, "lease_expires_at": {"$lt": 0}}, None),
+    ("grader: testcase ordering", "testcase_stats", {"problem_id": ""}, None),
+]
+
+# Run the plan audit after creating indexes at startup, and log collection scans
+INDEX_AUDIT_ON_STARTUP = os.getenv("INDEX_AUDIT_ON_STARTUP", "true").lower() == "true"
+
+def ensure_indexes():
+    """
+    Creates every declared index that does not exist yet.
+    Returns (index names, errors); one failing index does not stop the others, but an unreachable
+    MongoDB stops at the first index, since every other one would wait for the same timeout.
+    """
+    names = []
+    errors = []
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                names.append(f"{collection}.{mongo.db[collection].create_index(keys, **options)}")
+            except OperationFailure as e:
+                # E.g. duplicate values under a unique index, or an older index with the same keys and other options
+                errors.append({"collection": collection, "keys": keys, "message": str(e)})
+            except PyMongoError as e:
+                # E.g. ServerSelectionTimeoutError; the indexes are created on the next startup
+                errors.append({"collection": collection, "keys": keys, "message": str(e)})
+                return names, errors
+    return names, errors
+
+def _plan_stages(plan):
+    """
+    Lists the stages of an explain plan, whatever the nesting (inputStage, inputStages, queryPlan).
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+def explain_query(collection, query, sort=None):
+    """
+    Returns the stages of the plan MongoDB would choose for a find, without running it.
+    """
+    find = {"find": collection, "filter": query}
+    if sort:
+        find["sort"] = dict(sort)
+    explained = mongo.db.command({"explain": find, "verbosity": "queryPlanner"})
+    return _plan_stages(explained["queryPlanner"]["winningPlan"])
+
+def audit_query_plans():
+    """
+    Explains every audited query. Returns (report, error), one report entry per query,
+    with collection_scan set when its plan reads the whole collection.
+    """
+    report = []
+    try:
+        for name, collection, query, sort in AUDITED_QUERIES:
+            stages = explain_query(collection, query, sort)
+            report.append({
+                "query": name,
+                "collection": collection,
+                "stages": stages,
+                "collection_scan": "COLLSCAN" in stages
+            })
+    except PyMongoError as e:
+        return None, {"message": str(e)}
+    return report, None
+
+def init_app(app):
+    _, errors = ensure_indexes()
+    for error in errors:
+        print(f"[Indexes] Could not create index {error['keys']} on {error['collection']}: {error['message']}")
+
+    if not INDEX_AUDIT_ON_STARTUP:
+        return
+    report, error = audit_query_plans()
+    if error:
+        print(f"[Indexes] Query plan audit failed: {error['message']}")
+        return
+    for entry in report:
+        if entry["collection_scan"]:
+            print(f"[Indexes] {entry['query']} scans the whole {entry['collection']} collection")
@@ -0,0 +1,88 @@
+import os
+import time
+import hashlib
+import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from extensions import mongo
+
+# Token buckets, shared by every API process through MongoDB: a user may send INTAKE_USER_BURST
+# submissions at once, then INTAKE_USER_RATE_PER_S per second; a contest as a whole likewise
+INTAKE_USER_BURST = float(os.getenv("INTAKE_USER_BURST", 5))
+INTAKE_USER_RATE_PER_S = float(os.getenv("INTAKE_USER_RATE_PER_S", 0.2))
+INTAKE_CONTEST_BURST = float(os.getenv("INTAKE_CONTEST_BURST", 200))
+INTAKE_CONTEST_RATE_PER_S = float(os.getenv("INTAKE_CONTEST_RATE_PER_S", 20))
+# Identical code for the same problem and user within this window returns the earlier submission
+DEDUP_WINDOW_S = int(os.getenv("SUBMISSION_DEDUP_WINDOW_S", 60))
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+def take_token(bucket, burst, rate_per_s, now=None):
+    """
+    Refills a token bucket for the time elapsed since it was last used and takes one token from it,
+    in a single atomic update. Returns None if a token was taken, otherwise the seconds until one is available.
+    """
+    now = now or time.time()
+    refilled = {"$min": [burst, {"$add": [
+        {"$ifNull": ["$tokens", burst]},
+        {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, rate_per_s]}
+    ]}]}
+    bucket_doc = mongo.db.rate_limits.find_one_and_update(
+        {"_id": bucket},
+        [
+            {"$set": {"tokens": refilled, "updated_at": now}},
+            {"$set": {
+                "allowed": {"$gte": ["$tokens", 1]},
+                "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                # By then the bucket is full again, which is the same as having no record
+                "expires_at": _utcnow() + datetime.timedelta(seconds=burst / rate_per_s)
+            }}
+        ],
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if bucket_doc["allowed"]:
+        return None
+    return (1 - bucket_doc["tokens"]) / rate_per_s
+
+def check_rate_limits(username, contest_id=None):
+    """
+    Takes a token from the user's bucket and, for contest problems, from the contest's.
+    Returns None if the submission may be queued, otherwise the seconds to wait.
+    """
+    retry_after = take_token(f"user:{username}", INTAKE_USER_BURST, INTAKE_USER_RATE_PER_S)
+    if retry_after is None and contest_id:
+        retry_after = take_token(f"contest:{contest_id}", INTAKE_CONTEST_BURST, INTAKE_CONTEST_RATE_PER_S)
+    return retry_after
+
+def fingerprint(username, problem_id, language, code):
+    return hashlib.sha256(f"{username}\0{problem_id}\0{language}\0{code}".encode("utf-8")).hexdigest()
+
+def claim_fingerprint(key, submission_id):
+    """
+    Records that submission_id carries the code with this fingerprint. Returns the id of an
+    identical submission received within DEDUP_WINDOW_S, or None if this one is new.
+    """
+    now = _utcnow()
+    try:
+        mongo.db.submission_dedup.insert_one({"_id": key, "submission_id": submission_id, "created_at": now})
+        return None
+    except DuplicateKeyError:
+        pass
+
+    # The TTL monitor removes expired records up to a minute late; take over one that has expired
+    expired = mongo.db.submission_dedup.find_one_and_update(
+        {"_id": key, "created_at": {"$lt": now - datetime.timedelta(seconds=DEDUP_WINDOW_S)}},
+        {"$set": {"submission_id": submission_id, "created_at": now}}
+    )
+    if expired:
+        return None
+    existing = mongo.db.submission_dedup.find_one({"_id": key})
+    return existing["submission_id"] if existing else None
+
+def release_fingerprint(key):
+    """
+    Forgets a fingerprint whose submission was not queued after all.
+    """
+    mongo.db.submission_dedup.delete_one({"_id": key})
@@ -2,72 +2,113 @@ import time
 import os
 import json
 import re
+import tempfile
 import requests
+import threading
 from dotenv import load_dotenv
 import subprocess
 
 load_dotenv()
 
+from pymongo.errors import PyMongoError
 from extensions import mongo
-from services.github_services import get_file, get_folder_contents
+from services.github_services import download_blob
 from services import problem_service
+from services import progress_service
+from services import http_client
+from services import testcase_stats_service
+from services import subtask_service
+from services import manifest_service
+from config.grader_config import WORKER_ID
+from utils import tracing
+from utils.tracing import logger
 
-SIZE = 50
+# --- Testcase Storage ---
+# Testcases are streamed to disk and cached by blob SHA; only those up to TESTCASE_INLINE_MAX_BYTES are
+# also kept in memory, larger ones are referenced by their "file" and streamed to the executor and the validator.
+TESTCASE_CACHE_DIR = os.getenv("TESTCASE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "judge-testcases"))
+TESTCASE_INLINE_MAX_BYTES = int(os.getenv("TESTCASE_INLINE_MAX_BYTES", 64 * 1024))
 
-def get_testcases(problem_id):
-    print(f"--- Starting get_testcases for problem_id: {problem_id} ---")
-    testcases = []
-    
-    match = re.match(r'^(C\d+)([A-Z]+)$', problem_id)
-    if not match:
-        print(f"Invalid problem ID format for get_testcases: {problem_id}")
-        return []
-    contest_id = match.group(1)
-    problem_letter = match.group(2)
-
-    testcases_path = f'data/contests/{contest_id}/problems/{problem_letter}/testcases'
-    
-    print(f"[Get Testcases] Fetching test cases from: {testcases_path}")
-    contents_response, error = get_folder_contents(testcases_path)
-    print(f"[Get Testcases] Contents response: {contents_response}")
-
-    if error or not contents_response.get('success'):
-        error_message = error['message'] if error else contents_response.get('error', 'Unknown error')
-        print(f"Error fetching test cases for problem {problem_id}: {error_message}")
-        return []
+# --- Checkpoints ---
+# Each finished testcase is saved on the queue document, so a grading interrupted by a restart
+# resumes where it stopped. Only the verdict and the measurements are kept, for at most this many
+# testcases per submission; the testcases past it are rerun instead.
+CHECKPOINT_MAX_COUNT = int(os.getenv("GRADING_CHECKPOINT_MAX_COUNT", 1000))
+CHECKPOINT_FIELDS = ("testcase", "status", "timetaken", "memorytaken")
 
-    contents_list = contents_response.get('data', [])
-    
-    file_download_urls = {}
-    for item in contents_list:
-        if item['type'] == 'file' and item['name'].endswith('.in'):
-            file_download_urls[item['path']] = item['download_url']
+# --- Testcase Cache ---
+# problem_id -> {"version": manifest version, "testcases": [...]}
+testcase_cache = {}
+_testcase_locks = {}
+_testcase_locks_guard = threading.Lock()
 
-    print(f"[Get Testcases] File download URLs: {file_download_urls}")
+def _get_testcase_lock(problem_id):
+    with _testcase_locks_guard:
+        return _testcase_locks.setdefault(problem_id, threading.Lock())
 
-    if not file_download_urls:
+def get_testcases(problem_id, force_refresh=False):
+    """
+    Returns the testcases of the manifest version a problem is currently pinned to.
+    """
+    manifest, error = manifest_service.get_manifest(problem_id, force_refresh=force_refresh)
+    if error:
+        logger.warning("No manifest for problem %s: %s", problem_id, error['message'])
         return []
+    return _get_manifest_testcases(manifest, force_refresh)
 
-    print()
-    print(SIZE * '=' + " EXTRACTING TESTCASES " + SIZE * '=')
-    for file_path, download_url in file_download_urls.items():
-        input_content_resp = requests.get(download_url)
-
-        if input_content_resp.status_code == 200:
-            print(f"[Get Testcases] Fetched content for {file_path}: {input_content_resp.text}")
-            testcases.append({
-                'stdin': input_content_resp.text,
-                'path': file_path
-            })
-        else:
-            print(f"Warning: Failed to fetch content for test case {file_path}")
+def _get_manifest_testcases(manifest, force_refresh=False):
+    problem_id = manifest["problem_id"]
+    # Concurrent graders of the same problem wait for a single fetch instead of all hitting GitHub
+    with _get_testcase_lock(problem_id):
+        cached = testcase_cache.get(problem_id)
+        if not force_refresh and cached and cached["version"] == manifest["version"]:
+            return cached["testcases"]
+
+        testcases = _fetch_testcases(manifest)
+        if testcases:
+            testcase_cache[problem_id] = {"version": manifest["version"], "testcases": testcases}
+        return testcases
 
-    print(testcases)
-    print(SIZE * '=' + " DONE WITH EXTRACTING TESTCASES " + SIZE * '=')
-    print()
+@tracing.traced("fetch_testcases")
+def _fetch_testcases(manifest):
+    logger.debug("Fetching testcases for problem_id=%s version=%s", manifest["problem_id"], manifest["version"])
+    testcases = []
+    for entry in manifest["testcases"]:
+        local_path, error = _get_blob_file(entry["sha"])
+        if error:
+            # A pinned snapshot is all or nothing: grading against part of it is what pinning prevents
+            logger.warning("Failed to fetch test case %s: %s", entry["path"], error['message'])
+            return []
+
+        testcase = {'path': entry["path"], 'file': local_path, 'size': os.path.getsize(local_path)}
+        if testcase['size'] <= TESTCASE_INLINE_MAX_BYTES:
+            testcase['stdin'] = _read_blob_file(local_path)
+            tracing.payload("testcase", testcase['stdin'], path=entry["path"])
+        testcases.append(testcase)
 
+    logger.debug("Fetched %d testcases for problem_id=%s", len(testcases), manifest["problem_id"])
     return testcases
 
+def _get_blob_file(blob_sha):
+    """
+    Returns (path, error) for a verified local copy of a blob, streaming it to disk on first use.
+    Blobs are addressed by the hash of their content, so a cached copy never goes stale.
+    """
+    local_path = os.path.join(TESTCASE_CACHE_DIR, "blobs", blob_sha)
+    if os.path.exists(local_path):
+        return local_path, None
+
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    _, error = download_blob(blob_sha, local_path)
+    if error:
+        return None, error
+    return local_path, None
+
+def _read_blob_file(local_path):
+    with open(local_path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+@tracing.traced("execute")
 def _execute_testcase(code, language, stdin, time_limit_s, memory_limit_mb):
     url = os.getenv('EXECUTE_API_SERVER_URL')
     payload = {
@@ -77,147 +118,459 @@ def _execute_testcase(code, language, stdin, time_limit_s, memory_limit_mb):
         "timelimit": str(time_limit_s),
         "memorylimit": str(memory_limit_mb)
     }
-    headers = {
-        'Content-Type': 'application/json'
-    }
     try:
-        response = requests.post(url, data=json.dumps(payload), headers=headers, timeout=30)
+        response = http_client.post_json(url, payload)
         response.raise_for_status()
         return response.json(), None
     except requests.exceptions.RequestException as e:
-        print(f"Error calling execution server: {e}")
+        logger.error("Error calling execution server: %s", e)
+        return None, {"overall_status": "error", "message": "Code execution server is not running. Please contact the admin."}
+
+@tracing.traced("execute")
+def _execute_testcase_file(code, language, stdin_path, time_limit_s, memory_limit_mb):
+    """
+    Like _execute_testcase, but streams the input from disk to the executor's multipart endpoint.
+    """
+    url = os.getenv('EXECUTE_STREAM_API_SERVER_URL') or f"{os.getenv('EXECUTE_API_SERVER_URL')}/stream"
+    fields = {
+        "language": language,
+        "code": code,
+        "timelimit": str(time_limit_s),
+        "memorylimit": str(memory_limit_mb)
+    }
+    try:
+        response = http_client.post_file(url, fields, "stdin", stdin_path)
+        response.raise_for_status()
+        return response.json(), None
+    except (requests.exceptions.RequestException, OSError) as e:
+        logger.error("Error calling execution server: %s", e)
+        return None, {"overall_status": "error", "message": "Code execution server is not running. Please contact the admin."}
+
+@tracing.traced("execute_batch")
+def _execute_batch(code, language, stdins, time_limit_s, memory_limit_mb):
+    url = os.getenv('EXECUTE_BATCH_API_SERVER_URL') or f"{os.getenv('EXECUTE_API_SERVER_URL')}/batch"
+    payload = {
+        "language": language,
+        "code": code,
+        "stdins": stdins,
+        "timelimit": str(time_limit_s),
+        "memorylimit": str(memory_limit_mb)
+    }
+    try:
+        # A batch runs every test back to back, so allow each of them the full per-request read timeout
+        response = http_client.post_json(url, payload, read_timeout=http_client.HTTP_READ_TIMEOUT_S * max(1, len(stdins)))
+        response.raise_for_status()
+        return response.json()["results"], None
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        logger.error("Error calling execution server: %s", e)
         return None, {"overall_status": "error", "message": "Code execution server is not running. Please contact the admin."}
 
+@tracing.traced("validate")
+def _run_validator(validator_content, user_output, test_input):
+    validation_url = os.getenv("VALIDATOR_API_URL")
+    validation_payload = {
+        "validator_language": "python",
+        "validator_code": validator_content,
+        "user_output": user_output,
+        "test_input": test_input
+    }
+    try:
+        validation_response = http_client.post_json(validation_url, validation_payload)
+        validation_response.raise_for_status()
+        return validation_response.json(), None
+    except requests.exceptions.RequestException as e:
+        return None, e
+
+def _run_validator_file(validator_content, user_output, test_input_path):
+    """
+    Like _run_validator for a testcase kept on disk. The input is streamed to VALIDATOR_STREAM_API_URL
+    when it is configured; the JSON validator API can only take this one testcase read into memory.
+    """
+    stream_url = os.getenv("VALIDATOR_STREAM_API_URL")
+    if not stream_url:
+        with open(test_input_path, encoding='utf-8', newline='') as f:
+            return _run_validator(validator_content, user_output, f.read())
+
+    fields = {
+        "validator_language": "python",
+        "validator_code": validator_content,
+        "user_output": user_output
+    }
+    with tracing.span("validate"):
+        try:
+            validation_response = http_client.post_file(stream_url, fields, "test_input", test_input_path)
+            validation_response.raise_for_status()
+            return validation_response.json(), None
+        except (requests.exceptions.RequestException, OSError) as e:
+            return None, e
+
 import subprocess
 
-def grade_submission(submission_id, code, language, problem_id):
+@tracing.traced("fetch_package")
+def load_problem_package(problem_id, force_refresh=False):
     """
-    Grades a submission by running it against all test cases for a given problem.
-    This function returns a list of results for each test case.
+    Loads everything needed to grade a problem from the snapshot its manifest is pinned to:
+    limits from meta.json, the testcases and the validator.
+    Returns (package, error) where error is a grading error result.
+    """
+    match = re.match(r'^(C\d+)([A-Z]+)$', problem_id)
+    if not match:
+        return None, {"overall_status": "error", "message": f"Invalid problem ID format: {problem_id}"}
+
+    manifest, manifest_error = manifest_service.get_manifest(problem_id, force_refresh=force_refresh)
+    if manifest_error:
+        return None, {"overall_status": "error", "message": f"Failed to get problem manifest: {manifest_error['message']}"}
+
+    # Get problem metadata for time and memory limits from the pinned snapshot
+    problem_meta_path, problem_meta_error = _get_blob_file(manifest["files"]["meta.json"])
+    if problem_meta_error:
+        return None, {"overall_status": "error", "message": f"Failed to get problem metadata: {problem_meta_error['message']}"}
+    problem_meta_content = _read_blob_file(problem_meta_path)
+
+    try:
+        problem_meta_data = json.loads(problem_meta_content)
+        time_limit_ms = int(problem_meta_data.get("timeLimit", 2000)) # Default to 2000ms
+        memory_limit_mb = int(problem_meta_data.get("memoryLimit", 256)) # Default to 256MB
+    except json.JSONDecodeError:
+        return None, {"overall_status": "error", "message": "Failed to decode problem meta.json"}
+
+    # Per-language time limit multipliers, e.g. "timeMultipliers": {"python": 3}
+    try:
+        time_multipliers = {language: float(multiplier) for language, multiplier in problem_meta_data.get("timeMultipliers", {}).items()}
+    except (AttributeError, TypeError, ValueError):
+        return None, {"overall_status": "error", "message": "Invalid timeMultipliers in meta.json"}
+
+    # Convert time limit from milliseconds to seconds for the judge service
+    time_limit_s = max(1, time_limit_ms // 1000) # Ensure at least 1 second
+
+    testcases = _get_manifest_testcases(manifest, force_refresh=force_refresh)
+
+    if not testcases:
+        return None, {"overall_status": "error", "message": "No test cases found for this problem."}
+
+    validator_path, validator_error = _get_blob_file(manifest["files"]["validator.py"])
+    if validator_error:
+        return None, {"overall_status": "error", "message": f"Failed to get validator.py: {validator_error['message']}"}
+    validator_content = _read_blob_file(validator_path)
+
+    tracing.payload("validator", validator_content, problem_id=problem_id)
+
+    subtasks, subtasks_error = subtask_service.parse_subtasks(problem_meta_data, testcases)
+    if subtasks_error:
+        return None, {"overall_status": "error", "message": f"Invalid subtasks in meta.json: {subtasks_error['message']}"}
+
+    return {
+        "meta": problem_meta_data,
+        "time_limit_s": time_limit_s,
+        "memory_limit_mb": memory_limit_mb,
+        "time_multipliers": time_multipliers,
+        "testcases": testcases,
+        "validator": validator_content,
+        "subtasks": subtasks,
+        "manifest_version": manifest["version"]
+    }, None
+
+def _grading_steps(submission_id, code, language, problem_id):
+    """
+    The grading flow for one submission, written as a generator so the same logic can be
+    driven by a thread (grade_submission) or by the asyncio engine (services.grading_engine).
+    Every blocking call is yielded as (downstream, function, args); the driver runs it and
+    sends back its return value. The generator returns {"test_results", "manifest_version"},
+    plus the subtask scores (see _subtask_steps) for problems split into subtasks.
     """
     all_test_results = []
+    logger.debug("Grading submission_id=%s problem_id=%s", submission_id, problem_id)
+
+    match = re.match(r'^(C\d+)([A-Z]+)$', problem_id)
+    if not match:
+        logger.warning("Invalid problem ID format for grading: %s", problem_id)
+        return []
+
+    package, package_error = yield ("github", load_problem_package, (problem_id,))
+    if package_error:
+        return package_error
+    checkpoints = yield ("mongo", _load_checkpoints, (submission_id, package.get("manifest_version")))
+
+    if package.get("subtasks"):
+        failure_rates = yield ("mongo", testcase_stats_service.get_failure_rates, (problem_id,))
+        grading_results = yield from _subtask_steps(submission_id, code, language, package, failure_rates, checkpoints)
+        if grading_results.get("overall_status") == "error":
+            return grading_results
+        yield ("mongo", testcase_stats_service.record_results, (problem_id, _fresh_results(grading_results["test_results"], checkpoints)))
+        return {**grading_results, "manifest_version": package.get("manifest_version")}
+
+    testcases = package["testcases"]
+    stop_on_first_failure = yield ("mongo", _get_stop_on_first_failure, (match.group(1), package["meta"]))
+    if stop_on_first_failure:
+        failure_rates = yield ("mongo", testcase_stats_service.get_failure_rates, (problem_id,))
+        testcases = testcase_stats_service.order_testcases(testcases, failure_rates)
+
+    for i, testcase in enumerate(testcases):
+        test_result, error = yield from _testcase_steps(submission_id, code, language, package, testcase, i + 1, checkpoints)
+        if error:
+            all_test_results.append(error)
+            if stop_on_first_failure:
+                break
+            continue
+
+        all_test_results.append(test_result)
+
+        if stop_on_first_failure and test_result["status"] != "passed":
+            all_test_results.extend(_skipped_result(remaining) for remaining in testcases[i + 1:])
+            break
+
+    yield ("mongo", testcase_stats_service.record_results, (problem_id, _fresh_results(all_test_results, checkpoints)))
+    return {"test_results": all_test_results, "manifest_version": package.get("manifest_version")}
+
+def _time_limit_s(package, language):
+    """
+    The time limit for a language, as measured on the reference executor node: every executor
+    node stretches it by its own calibrated speed factor and normalizes the reported time.
+    """
+    return package["time_limit_s"] * package.get("time_multipliers", {}).get(language, 1)
+
+def _load_checkpoints(submission_id, manifest_version):
+    """
+    Returns {testcase path: result} of the testcases an earlier attempt at grading a submission
+    finished, against the same version of the tests.
+    """
+    queued = mongo.db.submissions_queue.find_one({"_id": submission_id}, {"_id": 0, "checkpoints": 1})
+    checkpoints = {}
+    for checkpoint in (queued or {}).get("checkpoints", []):
+        if checkpoint.get("manifest_version") == manifest_version:
+            checkpoints[checkpoint["testcase"]] = checkpoint["result"]
+    if checkpoints:
+        logger.info("Resuming submission_id=%s with %d checkpointed test cases", submission_id, len(checkpoints))
+    return checkpoints
+
+def _fresh_results(test_results, checkpoints):
+    """
+    Leaves out the results taken from checkpoints: an earlier attempt already counted them in the testcase statistics.
+    """
+    return [result for result in test_results if result.get("testcase") not in checkpoints]
+
+def _save_checkpoint(submission_id, manifest_version, test_result):
+    """
+    Saves a finished testcase on the queue document. A checkpoint only spares rerunning the
+    testcase, so outputs are left out and a failure to save it does not fail the grading.
+    """
+    result = {field: test_result[field] for field in CHECKPOINT_FIELDS if field in test_result}
     try:
-        print("GRADING A SUBMISSION NOW")
-        
-        match = re.match(r'^(C\d+)([A-Z]+)$', problem_id)
-        if not match:
-            print(f"Invalid problem ID format for get_testcases: {problem_id}")
-            return []
-        contest_id = match.group(1)
-        problem_letter = match.group(2)
+        # Only while this grader holds the lease: once it is reaped, handed back or finalized, late results are dropped
+        mongo.db.submissions_queue.update_one(
+            {"_id": submission_id, "worker_id": WORKER_ID, f"checkpoints.{CHECKPOINT_MAX_COUNT - 1}": {"$exists": False}},
+            {"$push": {"checkpoints": {"testcase": test_result["testcase"], "manifest_version": manifest_version, "result": result}}}
+        )
+    except PyMongoError as e:
+        logger.warning("Failed to checkpoint test case %s of submission_id=%s: %s", test_result["testcase"], submission_id, e)
 
-    
-        # Get problem metadata for time and memory limits from GitHub
-        problem_meta_path = f'data/contests/{contest_id}/problems/{problem_letter}/meta.json'
-        problem_meta_content, _, problem_meta_error = get_file(problem_meta_path)
+def _testcase_steps(submission_id, code, language, package, testcase, number, checkpoints=None):
+    """
+    Runs and validates one testcase, or takes its checkpointed result, which has the verdict and
+    measurements but not the outputs. Returns (test_result, error) where error is a grading error result.
+    """
+    path = testcase.get('path')
+    if checkpoints and path in checkpoints:
+        return dict(checkpoints[path]), None
 
-        if problem_meta_error:
-            return {"overall_status": "error", "message": f"Failed to get problem metadata: {problem_meta_error['message']}"}
+    yield ("mongo", progress_service.report_progress, (submission_id, f"running test case {number}"))
+    limits = (_time_limit_s(package, language), package["memory_limit_mb"])
+    stdin = testcase.get('stdin')
+    if stdin is not None:
+        result, error = yield ("executor", _execute_testcase, (code, language, stdin, *limits))
+    else:
+        result, error = yield ("executor", _execute_testcase_file, (code, language, testcase['file'], *limits))
+    if error:
+        return None, error
 
-        try:
-            problem_meta_data = json.loads(problem_meta_content)
-            time_limit_ms = int(problem_meta_data.get("timeLimit", 2000)) # Default to 2000ms
-            memory_limit_mb = int(problem_meta_data.get("memoryLimit", 256)) # Default to 256MB
-        except json.JSONDecodeError:
-            return {"overall_status": "error", "message": "Failed to decode problem meta.json"}
-
-        # Convert time limit from milliseconds to seconds for the judge service
-        time_limit_s = max(1, time_limit_ms // 1000) # Ensure at least 1 second
-
-        print("[Grade Submission] Calling get_testcases...")
-        testcases = get_testcases(problem_id)
-        
-        print(f"[Grade Submission] Test cases: {testcases}")
-
-        if not testcases:
-            return {"overall_status": "error", "message": "No test cases found for this problem."}
-
-        # Get validator path from GitHub
-        validator_path = f'data/contests/{contest_id}/problems/{problem_letter}/validator.py'
-        validator_content, _, validator_error = get_file(validator_path)
-        if validator_error:
-            return {"overall_status": "error", "message": f"Failed to get validator.py: {validator_error['message']}"}
-
-        print(f"DEBUG: Validator content for {problem_id}: {validator_content}")
-
-
-        
-        for i, testcase in enumerate(testcases):
-            mongo.db.submissions_queue.update_one(
-                {"_id": submission_id},
-                {"$set": {"status": f"running test case {i + 1}"}}
-            )
-            print(SIZE * '=' + f' Running testcase {i + 1}! ' + '=' * SIZE)
-            stdin = testcase.get('stdin', '') # Assuming 'stdin' field in testcase from GitHub
-            
-            result, error = _execute_testcase(code, language, stdin, time_limit_s, memory_limit_mb)
-            if error:
-                all_test_results.append(error)
+    tracing.payload("execution_result", result, submission_id=submission_id, test=number)
+
+    test_status, message = _classify_execution(result)
+    if test_status is None:
+        # Validate the output using the validation service
+        if stdin is not None:
+            validation = yield ("validator", _run_validator, (package["validator"], result.get('stdout', ''), stdin))
+        else:
+            validation = yield ("validator", _run_validator_file, (package["validator"], result.get('stdout', ''), testcase['file']))
+        test_status, message = _classify_validation(*validation)
+
+    test_result = _build_test_result(result, test_status, message, stdin)
+    test_result["testcase"] = path
+    if path is not None:
+        yield ("mongo", _save_checkpoint, (submission_id, package.get("manifest_version"), test_result))
+    return test_result, None
+
+def _subtask_steps(submission_id, code, language, package, failure_rates, checkpoints=None):
+    """
+    Grades a problem split into subtasks. Subtasks run in their declared order, most often failed
+    tests first; the first failing test skips the rest of its subtask and every subtask depending on it.
+    A testcase shared by several subtasks runs at most once.
+    Returns {"test_results", "subtasks", "score", "max_score"}, or a grading error result.
+    """
+    results_by_path = {}
+    failed_subtasks = set()
+    number = 0
+
+    for subtask in package["subtasks"]:
+        failed_dependencies = [dependency for dependency in subtask["depends_on"] if dependency in failed_subtasks]
+        skip_message = f"Skipped because subtask {failed_dependencies[0]} failed" if failed_dependencies else None
+
+        for testcase in testcase_stats_service.order_testcases(subtask["testcases"], failure_rates):
+            path = testcase.get('path')
+            previous = results_by_path.get(path)
+            if previous and previous["status"] != "skipped":
+                if previous["status"] != "passed" and not skip_message:
+                    skip_message = f"Skipped after an earlier test case of subtask {subtask['name']} failed"
+                continue
+            if skip_message:
+                results_by_path.setdefault(path, _skipped_result(testcase, skip_message))
                 continue
 
-            print(result)
-
-            user_stdout = result.get('stdout', '') # Store user's stdout
-            stdout = result.get('stdout', '')
-            stderr = result.get('stderr', '')
-            err = result.get('err', '')
-            timetaken = result.get('timetaken', 0)
-            memorytaken = result.get('memorytaken', 0)
-
-            test_status = "passed"
-            message = "Test case passed"
-
-            # print("BEFORE err")
-            if err:
-                if "Compilation Error" in err:
-                    test_status = "compilation_error"
-                    message = f"Compilation Error: {stderr}"
-                elif "Time Limit Exceeded" in err:
-                    test_status = "time_limit_exceeded"
-                    message = "Time Limit Exceeded"
-                elif "Memory Limit Exceeded" in err:
-                    test_status = "memory_limit_exceeded"
-                    message = "Memory Limit Exceeded"
-                else:
-                    test_status = "runtime_error"
-                    message = f"Runtime Error: {stderr}"
+            number += 1
+            test_result, error = yield from _testcase_steps(submission_id, code, language, package, testcase, number, checkpoints)
+            if error:
+                return error
+
+            test_result["subtask"] = subtask["name"]
+            results_by_path[path] = test_result
+            if test_result["status"] != "passed":
+                skip_message = f"Skipped after an earlier test case of subtask {subtask['name']} failed"
+
+        if skip_message:
+            failed_subtasks.add(subtask["name"])
+
+    subtask_results, score, max_score = subtask_service.score_subtasks(package["subtasks"], results_by_path)
+    return {
+        "test_results": [results_by_path[testcase.get('path')] for testcase in package["testcases"] if testcase.get('path') in results_by_path],
+        "subtasks": subtask_results,
+        "score": score,
+        "max_score": max_score
+    }
+
+def _get_stop_on_first_failure(contest_id, problem_meta):
+    """
+    Stop-on-first-failure is enabled by "stopOnFirstFailure" in the problem's meta.json,
+    falling back to the same flag on the contest document.
+    """
+    if "stopOnFirstFailure" in problem_meta:
+        return bool(problem_meta["stopOnFirstFailure"])
+
+    contest = mongo.db.contests.find_one({'id': contest_id}, {'_id': 0, 'stopOnFirstFailure': 1})
+    return bool(contest and contest.get("stopOnFirstFailure"))
+
+def _skipped_result(testcase, message="Skipped after an earlier test case failed"):
+    return {
+        "status": "skipped",
+        "message": message,
+        "testcase": testcase.get('path')
+    }
+
+def _classify_execution(result):
+    """
+    Maps an executor result to (test_status, message).
+    Returns (None, None) when the run succeeded and its output still has to be validated.
+    """
+    stderr = result.get('stderr', '')
+    err = result.get('err', '')
+
+    if not err:
+        return None, None
+    if "Compilation Error" in err:
+        return "compilation_error", f"Compilation Error: {stderr}"
+    if "Time Limit Exceeded" in err:
+        return "time_limit_exceeded", "Time Limit Exceeded"
+    if "Memory Limit Exceeded" in err:
+        return "memory_limit_exceeded", "Memory Limit Exceeded"
+    return "runtime_error", f"Runtime Error: {stderr}"
+
+def _classify_validation(validation_result, validation_error):
+    if validation_error:
+        return "runtime_error", f"Validator service error: {validation_error}"
+
+    verdict = validation_result.get("stdout", "").strip()
+    if verdict != "Accepted":
+        return "wrong_answer", "Output mismatch"
+    return "passed", "Test case passed"
+
+def _build_test_result(result, test_status, message, stdin):
+    result["status"] = test_status
+    result["message"] = message
+    result["stdin"] = stdin
+    result["user_output"] = result.get('stdout', '') # Store user's stdout
+    return result
+
+def _drive_steps(steps):
+    """
+    Runs a grading step generator to completion on the current thread.
+    """
+    try:
+        step = next(steps)
+        while True:
+            _, func, args = step
+            try:
+                value = func(*args)
+            except Exception as e:
+                step = steps.throw(e)
             else:
-                # print("NOW NO ERR")
-                # Validate the output using the validation service
-                validation_url = os.getenv("VALIDATOR_API_URL")
-                validation_payload = {
-                    "validator_language": "python",
-                    "validator_code": validator_content,
-                    "user_output": stdout,
-                    "test_input": stdin
-                }
-                headers = {'Content-Type': 'application/json'}
-                
-                try:
-                    validation_response = requests.post(validation_url, data=json.dumps(validation_payload), headers=headers, timeout=30)
-                    validation_response.raise_for_status()
-                    validation_result = validation_response.json()
-                    
-                    verdict = validation_result.get("stdout", "").strip()
-                    print(f"The verdict is {verdict}")
-                    if verdict != "Accepted":
-                        test_status = "wrong_answer"
-                        message = "Output mismatch"
-                        
-                except requests.exceptions.RequestException as e:
-                    test_status = "runtime_error"
-                    message = f"Validator service error: {e}"
-            
-            print(f"[Grade Submission] Determined test_status: {test_status}")
-            result["status"] = test_status
-            result["message"] = message
-            result["stdin"] = stdin
-            result["user_output"] = user_stdout
-            print(f"[Grade Submission] Appending result: {result}")
-            all_test_results.append(result)
-        
-        return all_test_results
+                step = steps.send(value)
+    except StopIteration as stop:
+        return stop.value
 
+def grade_submission(submission_id, code, language, problem_id):
+    """
+    Grades a submission by running it against all test cases for a given problem.
+    Returns {"test_results": [...], "manifest_version": ...}, or an error result.
+    """
+    try:
+        with tracing.span("grade", submission_id=submission_id, problem_id=problem_id):
+            return _drive_steps(_grading_steps(submission_id, code, language, problem_id))
     except Exception as e:
-        print(f"[Grade Submission] An unexpected error occurred: {e}")
-        return {"overall_status": "error", "message": f"An unexpected error occurred during grading: {e}"}
\ No newline at end of file
+        logger.exception("Unexpected error while grading submission_id=%s", submission_id)
+        return {"overall_status": "error", "message": f"An unexpected error occurred during grading: {e}"}
+
+def grade_batch(code, language, package):
+    """
+    Grades a program against a loaded problem package with a single batch execution:
+    the code is compiled once and run against every testcase. Problems with testcases
+    too large to keep in memory are run one streamed testcase at a time instead.
+    Returns the same results as grade_submission, including subtask scores.
+    """
+    testcases = package["testcases"]
+    limits = (_time_limit_s(package, language), package["memory_limit_mb"])
+    if all('stdin' in testcase for testcase in testcases):
+        results, error = _execute_batch(code, language, [testcase['stdin'] for testcase in testcases], *limits)
+        if error:
+            return error
+    else:
+        # Testcases kept on disk are streamed one at a time rather than sent together in one request
+        results = []
+        for testcase in testcases:
+            if 'stdin' in testcase:
+                result, error = _execute_testcase(code, language, testcase['stdin'], *limits)
+            else:
+                result, error = _execute_testcase_file(code, language, testcase['file'], *limits)
+            if error:
+                return error
+            results.append(result)
+
+    all_test_results = []
+    for testcase, result in zip(testcases, results):
+        stdin = testcase.get('stdin')
+        test_status, message = _classify_execution(result)
+        if test_status is None:
+            if stdin is not None:
+                validation = _run_validator(package["validator"], result.get('stdout', ''), stdin)
+            else:
+                validation = _run_validator_file(package["validator"], result.get('stdout', ''), testcase['file'])
+            test_status, message = _classify_validation(*validation)
+        test_result = _build_test_result(result, test_status, message, stdin)
+        test_result["testcase"] = testcase.get('path')
+        all_test_results.append(test_result)
+
+    grading_results = {"test_results": all_test_results, "manifest_version": package.get("manifest_version")}
+    if package.get("subtasks"):
+        # Every test already ran in the batch, so subtasks are only scored, never short-circuited
+        results_by_path = {result["testcase"]: result for result in all_test_results}
+        subtask_results, score, max_score = subtask_service.score_subtasks(package["subtasks"], results_by_path)
+        grading_results.update({"subtasks": subtask_results, "score": score, "max_score": max_score})
+    return grading_results
@@ -0,0 +1,129 @@
+import os
+import re
+import time
+import threading
+from pymongo.errors import DuplicateKeyError
+from extensions import mongo
+from services.github_services import get_folder_contents, get_tree
+
+# Seconds a manifest is reused before MongoDB is checked again, which bounds how long
+# other app instances keep grading against the old version after a bump
+MANIFEST_CACHE_TTL_S = int(os.getenv("MANIFEST_CACHE_TTL_S", 30))
+
+# problem_id -> (latest manifest, cached_at)
+_manifest_cache = {}
+_manifest_lock = threading.Lock()
+
+def _build_manifest(problem_id):
+    """
+    Snapshots a problem's current tree: the tree SHA plus the blob SHA of every testcase,
+    meta.json and validator.py. Returns (manifest, error).
+    """
+    match = re.match(r'^(C\d+)([A-Z]+)$', problem_id)
+    if not match:
+        return None, {"message": f"Invalid problem ID format: {problem_id}"}
+    contest_id = match.group(1)
+    problem_letter = match.group(2)
+    problems_path = f"data/contests/{contest_id}/problems"
+
+    listing, error = get_folder_contents(problems_path, force_refresh=True)
+    if error or not listing.get('success'):
+        return None, {"message": f"Failed to list problems of {contest_id}: {error['message'] if error else listing.get('error')}"}
+
+    entry = next((item for item in listing.get('data', []) if item['name'] == problem_letter and item['type'] == 'dir'), None)
+    if entry is None:
+        return None, {"message": f"Problem {problem_id} not found"}
+
+    entries, error = get_tree(entry['sha'])
+    if error:
+        return None, {"message": f"Failed to read tree of {problem_id}: {error['message']}"}
+    blobs = {item['path']: item for item in entries if item['type'] == 'blob'}
+
+    base_path = f"{problems_path}/{problem_letter}"
+    files = {}
+    for name in ("meta.json", "validator.py"):
+        if name not in blobs:
+            return None, {"message": f"Problem {problem_id} has no {name}"}
+        files[name] = blobs[name]['sha']
+
+    testcases = [
+        {"path": f"{base_path}/{path}", "sha": blob['sha'], "size": blob.get('size', 0)}
+        for path, blob in sorted(blobs.items())
+        if path.startswith("testcases/") and path.count("/") == 1 and path.endswith(".in")
+    ]
+    if not testcases:
+        return None, {"message": f"Problem {problem_id} has no test cases"}
+
+    return {
+        "problem_id": problem_id,
+        "tree_sha": entry['sha'],
+        "files": files,
+        "testcases": testcases
+    }, None
+
+def _cache(problem_id, manifest):
+    with _manifest_lock:
+        _manifest_cache[problem_id] = (manifest, time.time())
+
+def _latest_manifest(problem_id):
+    return mongo.db.problem_manifests.find_one({"problem_id": problem_id}, {"_id": 0}, sort=[("version", -1)])
+
+def pin_problem(problem_id, pinned_by=None):
+    """
+    Pins a problem to its current tree as the next manifest version. Pinning an unchanged
+    tree returns the current version. Returns (manifest, error).
+    """
+    manifest, error = _build_manifest(problem_id)
+    if error:
+        return None, error
+
+    current = _latest_manifest(problem_id)
+    if current and current["tree_sha"] == manifest["tree_sha"]:
+        _cache(problem_id, current)
+        return current, None
+
+    manifest.update({
+        "version": (current["version"] if current else 0) + 1,
+        "pinned_at": time.time(),
+        "pinned_by": pinned_by
+    })
+    try:
+        mongo.db.problem_manifests.insert_one(manifest)
+        manifest.pop("_id", None)
+    except DuplicateKeyError:
+        # Another grader pinned the same version first; use theirs
+        manifest = _latest_manifest(problem_id)
+
+    _cache(problem_id, manifest)
+    print(f"[Manifest] Pinned {problem_id} to tree {manifest['tree_sha']} as version {manifest['version']}")
+    return manifest, None
+
+def get_manifest(problem_id, force_refresh=False):
+    """
+    Returns (manifest, error) for the version a problem is graded against, pinning the
+    problem's current tree the first time it is needed.
+    """
+    if not force_refresh:
+        with _manifest_lock:
+            cached = _manifest_cache.get(problem_id)
+        if cached and time.time() - cached[1] < MANIFEST_CACHE_TTL_S:
+            return cached[0], None
+
+    manifest = _latest_manifest(problem_id)
+    if manifest is None:
+        return pin_problem(problem_id, pinned_by="judge")
+
+    _cache(problem_id, manifest)
+    return manifest, None
+
+def bump_version(problem_id, requested_by):
+    """
+    Moves a problem forward to its current tree. Submissions graded from now on use the new
+    version; already graded ones keep the version they were graded against until rejudged.
+    Returns (manifest, error).
+    """
+    previous = _latest_manifest(problem_id)
+    manifest, error = pin_problem(problem_id, pinned_by=requested_by)
+    if error:
+        return None, error
+    return {**manifest, "changed": previous is None or previous["version"] != manifest["version"]}, None
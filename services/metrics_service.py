@@ -0,0 +1,148 @@
+import os
+import time
+from extensions import mongo
+
+# Upper bounds, in seconds, of the latency histogram buckets (Prometheus adds +Inf)
+LATENCY_BUCKETS_S = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+# How a graded submission's time was spent: waiting in the queue, claimed but waiting for the
+# grading engine, and grading (executor runs and finalize)
+HISTOGRAMS = {
+    "queue_wait_s": "Seconds from submission to claim by a grader.",
+    "claim_to_start_s": "Seconds from claim to the start of grading.",
+    "grading_s": "Seconds from the start of grading to the verdict."
+}
+# Default and largest window of the rolling view
+METRICS_WINDOW_S = int(os.getenv("METRICS_WINDOW_S", 300))
+METRICS_WINDOW_MAX_S = 3600
+
+def _bucket_key(bound):
+    return str(bound).replace(".", "_")
+
+def _series_id(record):
+    return f"{record['problem_id']}|{record.get('contest_id') or ''}|{record['language']}"
+
+def timings(submission, graded_at):
+    """
+    Returns the durations of a graded submission's stages, for the fields named in HISTOGRAMS.
+    Stages whose timestamps are missing (e.g. submissions queued before they were recorded) are left out.
+    """
+    created_at = submission.get("created_at")
+    claimed_at = submission.get("claimed_at")
+    started_at = submission.get("started_at")
+    durations = {}
+    if created_at is not None and claimed_at is not None:
+        durations["queue_wait_s"] = max(0.0, claimed_at - created_at)
+    if claimed_at is not None and started_at is not None:
+        durations["claim_to_start_s"] = max(0.0, started_at - claimed_at)
+    if started_at is not None:
+        durations["grading_s"] = max(0.0, graded_at - started_at)
+    return durations
+
+def record_grading(record):
+    """
+    Adds a graded submission to the cumulative counters and histograms of its (problem, contest, language),
+    kept in MongoDB so every grader process contributes to the same series.
+    """
+    inc = {"graded": 1, f"verdicts.{record['status']}": 1}
+    for name in HISTOGRAMS:
+        value = record.get(name)
+        if value is None:
+            continue
+        inc[f"{name}.count"] = 1
+        inc[f"{name}.sum"] = value
+        for bound in LATENCY_BUCKETS_S:
+            if value <= bound:
+                inc[f"{name}.buckets.{_bucket_key(bound)}"] = 1
+    mongo.db.grading_metrics.update_one(
+        {"_id": _series_id(record)},
+        {
+            "$set": {"problem_id": record["problem_id"], "contest_id": record.get("contest_id"), "language": record["language"]},
+            "$inc": inc
+        },
+        upsert=True
+    )
+
+def _labels(series, **extra):
+    labels = {"problem_id": series["problem_id"], "contest_id": series.get("contest_id") or "", "language": series["language"], **extra}
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+def render_prometheus(queue_summary):
+    """
+    Returns the queue gauges and the cumulative grading counters and histograms in the Prometheus text format.
+    """
+    lines = [
+        "# HELP judge_queue_depth Submissions waiting to be claimed.",
+        "# TYPE judge_queue_depth gauge",
+        f"judge_queue_depth {queue_summary['depth']}",
+        "# HELP judge_queue_grading Submissions claimed by a grader and not finished yet.",
+        "# TYPE judge_queue_grading gauge",
+        f"judge_queue_grading {queue_summary['grading']}",
+        "# HELP judge_queue_oldest_wait_seconds Wait of the oldest queued submission.",
+        "# TYPE judge_queue_oldest_wait_seconds gauge",
+        f"judge_queue_oldest_wait_seconds {queue_summary['oldest_wait_s']}",
+    ]
+
+    series_list = list(mongo.db.grading_metrics.find({}))
+    lines += ["# HELP judge_graded_total Graded submissions by verdict.", "# TYPE judge_graded_total counter"]
+    for series in series_list:
+        for verdict, count in sorted(series.get("verdicts", {}).items()):
+            lines.append(f"judge_graded_total{{{_labels(series, verdict=verdict)}}} {count}")
+
+    for name, description in HISTOGRAMS.items():
+        metric = f"judge_{name[:-2]}_seconds"
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} histogram"]
+        for series in series_list:
+            histogram = series.get(name)
+            if not histogram:
+                continue
+            buckets = histogram.get("buckets", {})
+            for bound in LATENCY_BUCKETS_S:
+                lines.append(f'{metric}_bucket{{{_labels(series, le=bound)}}} {buckets.get(_bucket_key(bound), 0)}')
+            lines.append(f'{metric}_bucket{{{_labels(series, le="+Inf")}}} {histogram["count"]}')
+            lines.append(f"{metric}_sum{{{_labels(series)}}} {histogram['sum']}")
+            lines.append(f"{metric}_count{{{_labels(series)}}} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda percentile: values[max(0, -(-len(values) * percentile // 100) - 1)]
+    return {"p50": round(pick(50), 3), "p90": round(pick(90), 3), "p99": round(pick(99), 3), "max": round(values[-1], 3)}
+
+def _summarize(records):
+    verdicts = {}
+    for record in records:
+        verdicts[record["status"]] = verdicts.get(record["status"], 0) + 1
+    summary = {"graded": len(records), "verdicts": verdicts}
+    for name in HISTOGRAMS:
+        summary[name] = _percentiles([record[name] for record in records if record.get(name) is not None])
+    return summary
+
+def get_window_metrics(window_s=METRICS_WINDOW_S):
+    """
+    Returns grading throughput, verdict mix and latency percentiles over the last window_s seconds,
+    overall and per problem, contest and language, with the arrival rate over the same window.
+    """
+    window_s = max(1, min(int(window_s), METRICS_WINDOW_MAX_S))
+    since = time.time() - window_s
+    projection = {"_id": 0, "problem_id": 1, "contest_id": 1, "language": 1, "status": 1, "timestamp": 1, **{name: 1 for name in HISTOGRAMS}}
+    records = list(mongo.db.submissions.find({"graded_at": {"$gte": since}}, projection))
+    # Submissions that arrived in the window: graded since (so among records) or still in the queue
+    received = sum(1 for record in records if (record.get("timestamp") or 0) >= since)
+    received += mongo.db.submissions_queue.count_documents({"created_at": {"$gte": since}})
+
+    groups = {"by_problem": "problem_id", "by_contest": "contest_id", "by_language": "language"}
+    metrics = {
+        "window_s": window_s,
+        "received_per_minute": round(received * 60 / window_s, 1),
+        "graded_per_minute": round(len(records) * 60 / window_s, 1),
+        **_summarize(records)
+    }
+    for group, field in groups.items():
+        grouped = {}
+        for record in records:
+            if record.get(field):
+                grouped.setdefault(record[field], []).append(record)
+        metrics[group] = {key: _summarize(group_records) for key, group_records in grouped.items()}
+    return metrics
@@ -0,0 +1,305 @@
+import os
+import time
+import json
+import uuid
+import queue
+import collections
+import threading
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+from extensions import mongo
+from config.grader_config import WORKER_ID
+
+# Minimum number of seconds between two progress writes to Mongo for the same submission
+PROGRESS_WRITE_INTERVAL_S = float(os.getenv("PROGRESS_WRITE_INTERVAL_S", 2))
+# How long an SSE stream waits for an event before sending a keep-alive comment
+SSE_KEEPALIVE_S = 15
+# An SSE stream holds a web worker thread, so it is closed after this long; EventSource clients reconnect on their own
+SSE_STREAM_MAX_S = float(os.getenv("SSE_STREAM_MAX_S", 600))
+SUBSCRIBER_QUEUE_SIZE = 100
+# "mongo" relays status transitions between processes (API and graders) through a capped collection; "local" keeps them in-process
+PROGRESS_BROKER = os.getenv("PROGRESS_BROKER", "mongo")
+PROGRESS_EVENTS_MAX_BYTES = int(os.getenv("PROGRESS_EVENTS_MAX_BYTES", 16 * 1024 * 1024))
+BROKER_RETRY_S = 1
+# How often a process that could not set up the capped event collection tries again
+EVENTS_COLLECTION_RETRY_S = 30
+# Clocks of the relaying processes may disagree by this much
+BROKER_CLOCK_SKEW_S = 2
+SEEN_EVENTS_SIZE = 1000
+
+# --- In-Process Pub/Sub ---
+# channel ("submission:<id>" or "user:<username>") -> listener queues
+_subscribers = {}
+_subscribers_lock = threading.Lock()
+# submission_id -> username of the submissions being graded here, so their events reach user channels
+_owners = {}
+# Marks the events this process relayed, so it does not deliver them twice
+_origin = uuid.uuid4().hex
+
+# Whether submission_events is known to be capped, and when it was last checked
+_events_collection = {"capped": False, "checked_at": None}
+_events_collection_lock = threading.Lock()
+
+# --- Write Throttling State ---
+_last_write_at = {}
+_write_lock = threading.Lock()
+
+def _subscribe(channel):
+    listener = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _subscribers_lock:
+        _subscribers.setdefault(channel, set()).add(listener)
+    return listener
+
+def _unsubscribe(channel, listener):
+    with _subscribers_lock:
+        listeners = _subscribers.get(channel)
+        if listeners is None:
+            return
+        listeners.discard(listener)
+        if not listeners:
+            _subscribers.pop(channel, None)
+
+def subscribe(submission_id):
+    """
+    Registers a new listener for a submission and returns the queue its events are delivered to.
+    """
+    return _subscribe(f"submission:{submission_id}")
+
+def unsubscribe(submission_id, listener):
+    _unsubscribe(f"submission:{submission_id}", listener)
+
+def subscribe_user(username):
+    """
+    Registers a new listener for every submission of a user.
+    """
+    return _subscribe(f"user:{username}")
+
+def unsubscribe_user(username, listener):
+    _unsubscribe(f"user:{username}", listener)
+
+def _deliver(event):
+    """
+    Hands an event to the listeners of its submission and of its user without blocking the grader.
+    A slow listener loses its oldest events instead of holding up grading.
+    """
+    channels = [f"submission:{event['submission_id']}"]
+    if event.get("username"):
+        channels.append(f"user:{event['username']}")
+    with _subscribers_lock:
+        listeners = [listener for channel in channels for listener in _subscribers.get(channel, ())]
+
+    for listener in listeners:
+        while True:
+            try:
+                listener.put_nowait(event)
+                break
+            except queue.Full:
+                try:
+                    listener.get_nowait()
+                except queue.Empty:
+                    pass
+
+def _ensure_events_collection():
+    """
+    Creates the capped submission_events collection unless it exists. Returns True once it is known
+    to be capped: an insert into a missing collection would create it uncapped, and tailable cursors,
+    which the relay depends on, only work on capped collections. Checked again at most every
+    EVENTS_COLLECTION_RETRY_S after a failure.
+    """
+    with _events_collection_lock:
+        if _events_collection["capped"]:
+            return True
+        checked_at = _events_collection["checked_at"]
+        if checked_at is not None and time.monotonic() - checked_at < EVENTS_COLLECTION_RETRY_S:
+            return False
+        _events_collection["checked_at"] = time.monotonic()
+        try:
+            try:
+                mongo.db.create_collection("submission_events", capped=True, size=PROGRESS_EVENTS_MAX_BYTES)
+            except CollectionInvalid:
+                pass # Already exists
+            capped = mongo.db.submission_events.options().get("capped", False)
+        except PyMongoError as e:
+            print(f"[Progress] Cannot set up the submission_events collection, events are not relayed: {e}")
+            return False
+        if not capped:
+            print("[Progress] submission_events exists but is not capped, so events are not relayed between processes. "
+                  "Drop it, or convert it with the convertToCapped command, and restart.")
+            return False
+        _events_collection["capped"] = True
+        return True
+
+def _relay(event):
+    if PROGRESS_BROKER != "mongo" or not _ensure_events_collection():
+        return
+    try:
+        mongo.db.submission_events.insert_one({**event, "origin": _origin, "relayed_at": event.get("timestamp") or time.time()})
+    except PyMongoError as e:
+        print(f"[Progress] Failed to relay event for {event['submission_id']}: {e}")
+
+def publish(submission_id, event, relay=True, username=None):
+    """
+    Delivers an event to the listeners of a submission and of its user in this process and,
+    when relay is set, to the other processes through the broker.
+    """
+    key = str(submission_id)
+    event = {**event, "submission_id": key}
+    username = username or _owners.get(key)
+    if username:
+        event["username"] = username
+    _deliver(event)
+    if relay:
+        _relay(event)
+
+def track(submission_id, username):
+    """
+    Marks a submission as being graded in this process and publishes the transition to "grading".
+    """
+    key = str(submission_id)
+    _owners[key] = username
+    publish(key, {"status": "grading", "timestamp": time.time()})
+
+def report_progress(submission_id, status, force=False):
+    """
+    Publishes a progress update and persists it to the queue document's progress field at most once
+    per PROGRESS_WRITE_INTERVAL_S for each submission. The status field stays the lease state the
+    reaper and the drain rely on, and only the grader holding the lease writes. Returns True if Mongo was written.
+    """
+    key = str(submission_id)
+    now = time.time()
+
+    with _write_lock:
+        last_write = _last_write_at.get(key)
+        throttled = not force and last_write is not None and now - last_write < PROGRESS_WRITE_INTERVAL_S
+        if not throttled:
+            _last_write_at[key] = now
+
+    # Other processes get the same throttled subset of progress events that Mongo does
+    publish(key, {"status": status, "timestamp": now}, relay=not throttled)
+    if throttled:
+        return False
+
+    mongo.db.submissions_queue.update_one(
+        {"_id": submission_id, "worker_id": WORKER_ID},
+        {"$set": {"progress": status}}
+    )
+    return True
+
+def finish(submission_id, final_status):
+    """
+    Publishes the final verdict of a submission and drops its throttling state.
+    """
+    key = str(submission_id)
+    with _write_lock:
+        _last_write_at.pop(key, None)
+    publish(key, {"status": final_status, "timestamp": time.time(), "final": True})
+    _owners.pop(key, None)
+
+def _get_current_event(submission_id):
+    try:
+        queued = mongo.db.submissions_queue.find_one({"_id": ObjectId(submission_id)}, {"status": 1, "progress": 1})
+    except InvalidId:
+        queued = None
+    if queued:
+        return {"submission_id": submission_id, "status": queued.get("progress") or queued["status"], "timestamp": time.time()}
+
+    graded = mongo.db.submissions.find_one({"submission_id": submission_id}, {"status": 1})
+    if graded:
+        return {"submission_id": submission_id, "status": graded["status"], "timestamp": time.time(), "final": True}
+    return None
+
+def _listen(listener):
+    """
+    Yields the events delivered to a listener, or None after SSE_KEEPALIVE_S without one,
+    until SSE_STREAM_MAX_S has passed.
+    """
+    deadline = time.monotonic() + SSE_STREAM_MAX_S
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            yield listener.get(timeout=min(SSE_KEEPALIVE_S, remaining))
+        except queue.Empty:
+            yield None
+
+def stream_events(submission_id):
+    """
+    Generator producing a server-sent events stream for a submission.
+    Starts with the current state and ends after the final verdict has been sent, or after SSE_STREAM_MAX_S.
+    """
+    listener = subscribe(submission_id)
+    try:
+        current = _get_current_event(submission_id)
+        if current is None:
+            yield f"event: error\ndata: {json.dumps({'message': 'Submission not found'})}\n\n"
+            return
+
+        yield f"data: {json.dumps(current)}\n\n"
+        if current.get("final"):
+            return
+
+        for event in _listen(listener):
+            yield f"data: {json.dumps(event)}\n\n" if event else ": keep-alive\n\n"
+            if event and event.get("final"):
+                return
+    finally:
+        unsubscribe(submission_id, listener)
+
+def stream_user_events(username):
+    """
+    Generator producing a server-sent events stream of the status transitions of every
+    submission of a user, until the client disconnects or SSE_STREAM_MAX_S has passed.
+    """
+    listener = subscribe_user(username)
+    try:
+        yield ": connected\n\n"
+        for event in _listen(listener):
+            yield f"data: {json.dumps(event)}\n\n" if event else ": keep-alive\n\n"
+    finally:
+        unsubscribe_user(username, listener)
+
+def _tail_events():
+    """
+    Delivers the events relayed by other processes to this process's listeners, by tailing
+    the capped submission_events collection. After an interruption, tailing resumes from the
+    last event seen (less BROKER_CLOCK_SKEW_S, with duplicates skipped).
+    """
+    since = time.time()
+    seen_order = collections.deque(maxlen=SEEN_EVENTS_SIZE)
+    seen = set()
+    while True:
+        if not _ensure_events_collection():
+            time.sleep(BROKER_RETRY_S)
+            continue
+        try:
+            query = {"origin": {"$ne": _origin}, "relayed_at": {"$gte": since - BROKER_CLOCK_SKEW_S}}
+            cursor = mongo.db.submission_events.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                for event in cursor:
+                    event_id = event.pop("_id")
+                    if event_id in seen:
+                        continue
+                    if len(seen_order) == seen_order.maxlen:
+                        seen.discard(seen_order[0])
+                    seen_order.append(event_id)
+                    seen.add(event_id)
+                    since = max(since, event.pop("relayed_at"))
+                    event.pop("origin", None)
+                    _deliver(event)
+        except PyMongoError as e:
+            print(f"[Progress] Event relay interrupted: {e}")
+        # A tailable cursor on an empty collection ends at once; try again shortly
+        time.sleep(BROKER_RETRY_S)
+
+def init_app(app):
+    """
+    Creates the capped event collection and starts relaying events from other processes.
+    Called by the API (app.py) and by every grader (grader.py), before either publishes an event.
+    """
+    if PROGRESS_BROKER != "mongo":
+        return
+    _ensure_events_collection()
+    threading.Thread(target=_tail_events, daemon=True).start()
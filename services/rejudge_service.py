@@ -0,0 +1,299 @@
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+from pymongo import UpdateOne, ReturnDocument
+from extensions import mongo
+from services import judge_service
+from services import archive_service
+from services import submission_store
+from services import user_service
+from services import manifest_service
+from services import submission_service
+from services.github_services import get_file
+from config.github_config import GITHUB_SUBMISSIONS_BASE_PATH
+
+REJUDGE_FILTER_FIELDS = ["problem_id", "contest_id", "username", "status", "language"]
+# What a queued program keeps of each of its submissions
+REJUDGE_SUBMISSION_FIELDS = ["submission_id", "problem_id", "username", "language", "status", "timestamp", "test_results_file_id"]
+
+def build_rejudge_query(filters):
+    """
+    Turns rejudge filters into a query on the submissions collection.
+    Returns (query, error); at least one filter is required.
+    """
+    query = {}
+    for field in ("problem_id", "username", "status", "language"):
+        if filters.get(field):
+            query[field] = filters[field]
+
+    contest_id = filters.get("contest_id")
+    if contest_id:
+        contest_problems = {"$regex": f"^{re.escape(contest_id)}[A-Z]+$"}
+        if "problem_id" in query:
+            query = {"$and": [query, {"problem_id": contest_problems}]}
+        else:
+            query["problem_id"] = contest_problems
+
+    if not query:
+        return None, {"message": f"At least one filter is required: {', '.join(REJUDGE_FILTER_FIELDS)}"}
+    return query, None
+
+def start_rejudge(filters, requested_by):
+    """
+    Starts a rejudge of the submissions matching filters. With "bump" set, every problem
+    involved is first moved to its current tree (manifest_service.bump_version), so the
+    rejudge picks up tests pushed since the problem was pinned. Every distinct program is queued
+    in submissions_queue under the "rejudge" priority class and graded by the graders, behind
+    contest and practice submissions. Returns (job, error).
+    """
+    query, error = build_rejudge_query(filters)
+    if error:
+        return None, error
+    bump = filters.get("bump", False)
+    if not isinstance(bump, bool):
+        return None, {"message": "bump must be a boolean"}
+
+    submissions = list(mongo.db.submissions.find(query, {'_id': 0, 'test_results': 0}))
+    if not submissions:
+        return None, {"message": "No submissions match the given filters"}
+
+    job_id = uuid.uuid4().hex
+    # Kept in MongoDB, so the job can be followed from any API process, not only the one running it
+    job = {
+        "_id": job_id,
+        "job_id": job_id,
+        "status": "collecting",
+        "filters": {field: filters[field] for field in REJUDGE_FILTER_FIELDS if filters.get(field)},
+        "requested_by": requested_by,
+        "bump": bump,
+        "total_submissions": len(submissions),
+        "distinct_programs": 0,
+        "processed_programs": 0,
+        "processed_submissions": 0,
+        "changed_verdicts": 0,
+        "errors": [],
+        "started_at": time.time(),
+        "eta_s": None
+    }
+    mongo.db.rejudge_jobs.insert_one(job)
+
+    threading.Thread(target=_run_rejudge, args=(job_id, submissions, bump, requested_by), daemon=True).start()
+    return get_rejudge_job(job_id)
+
+def get_rejudge_job(job_id):
+    job = mongo.db.rejudge_jobs.find_one({"_id": job_id}, {"_id": 0, "finished_programs": 0, "changed_users": 0})
+    if job is None:
+        return None, {"message": "Rejudge job not found"}
+    return job, None
+
+def _update_job(job_id, increments=None, **fields):
+    update = {"$set": fields}
+    if increments:
+        update["$inc"] = increments
+    mongo.db.rejudge_jobs.update_one({"_id": job_id}, update)
+
+def _record_error(job_id, message):
+    print(f"[Rejudge] {message}")
+    mongo.db.rejudge_jobs.update_one({"_id": job_id}, {"$push": {"errors": message}})
+
+def _get_code(submission):
+    code = submission_store.get_code(submission)
+    if code is not None:
+        return code, None
+    # Submissions graded before code was stored in MongoDB only have it in the GitHub archive
+    file_extension = {"python": "py", "c": "c", "c++": "cpp"}.get(submission['language'], "txt")
+    code_path = f"{GITHUB_SUBMISSIONS_BASE_PATH}/{submission['submission_id']}/code.{file_extension}"
+    code, _, error = get_file(code_path)
+    return code, error
+
+def group_by_program(job_id, submissions):
+    """
+    Groups submissions by problem and by the hash of their language and code,
+    so every distinct program is graded only once per problem.
+    """
+    problems = {}
+    for submission in submissions:
+        code, error = _get_code(submission)
+        if error:
+            _record_error(job_id, f"Skipping submission {submission['submission_id']}: {error['message']}")
+            continue
+
+        code_hash = hashlib.sha256(f"{submission['language']}\0{code}".encode('utf-8')).hexdigest()
+        programs = problems.setdefault(submission['problem_id'], {})
+        program = programs.setdefault(code_hash, {"code": code, "language": submission['language'], "submissions": []})
+        program["submissions"].append(submission)
+    return problems
+
+def _apply_results(program, final_status, test_results, score):
+    """
+    Builds the bulk Mongo updates for every submission of a program and queues their GitHub meta.json updates.
+    Returns (operations, changed_count).
+    """
+    operations = []
+    changed = 0
+    rejudged_at = time.time()
+    for submission in program["submissions"]:
+        if submission.get("status") != final_status:
+            changed += 1
+        results, unset = submission_store.encode_test_results(submission["submission_id"], test_results)
+        update = {"$set": {"status": final_status, "rejudged_at": rejudged_at, **score, **results}}
+        if unset:
+            update["$unset"] = unset
+        operations.append(UpdateOne({"submission_id": submission["submission_id"]}, update))
+
+        github_meta_data = {
+            "submission_id": submission["submission_id"],
+            "problem_id": submission["problem_id"],
+            "username": submission["username"],
+            "language": submission["language"],
+            "status": final_status,
+            "timestamp": submission.get("timestamp"),
+            "test_results": test_results,
+            **score
+        }
+        archive_service.archive(submission["submission_id"], {
+            f"{GITHUB_SUBMISSIONS_BASE_PATH}/{submission['submission_id']}/meta.json": json.dumps(github_meta_data, indent=4)
+        })
+    return operations, changed
+
+def _queued_program(job_id, problem_id, manifest_version, program, requested_by):
+    """
+    Returns the submissions_queue document a grader claims to grade one distinct program.
+    It carries what finalize_program needs of every submission sharing the program.
+    """
+    return {
+        "kind": "rejudge",
+        "rejudge_job_id": job_id,
+        "problem_id": problem_id,
+        "contest_id": None,
+        "username": requested_by,
+        "language": program["language"],
+        "code": program["code"],
+        "manifest_version": manifest_version,
+        "submissions": [
+            {field: submission[field] for field in REJUDGE_SUBMISSION_FIELDS if field in submission}
+            for submission in program["submissions"]
+        ],
+        "status": "in_queue",
+        "priority_class": "rejudge",
+        "priority": submission_service.PRIORITY_CLASSES["rejudge"],
+        "created_at": time.time()
+    }
+
+def _run_rejudge(job_id, submissions, bump=False, requested_by=None):
+    try:
+        problems = group_by_program(job_id, submissions)
+        distinct_programs = sum(len(programs) for programs in problems.values())
+
+        queued = []
+        skipped = 0
+        for problem_id, programs in problems.items():
+            if bump:
+                manifest, error = manifest_service.bump_version(problem_id, requested_by)
+                if error:
+                    _record_error(job_id, f"Skipping problem {problem_id}: failed to bump its tests: {error['message']}")
+                    skipped += len(programs)
+                    continue
+            else:
+                # Without "bump", tests pushed since the problem was pinned are not picked up
+                manifest, error = manifest_service.get_manifest(problem_id, force_refresh=True)
+                if error:
+                    _record_error(job_id, f"Skipping problem {problem_id}: {error['message']}")
+                    skipped += len(programs)
+                    continue
+            queued.extend(
+                _queued_program(job_id, problem_id, manifest["version"], program, requested_by)
+                for program in programs.values()
+            )
+
+        # Set before queueing, so the graders find the job ready to count their programs
+        _update_job(job_id, status="grading", distinct_programs=distinct_programs,
+                    processed_programs=skipped, grading_started_at=time.time())
+        if queued:
+            mongo.db.submissions_queue.insert_many(queued)
+        else:
+            _update_job(job_id, status="done", finished_at=time.time(), eta_s=0)
+    except Exception as e:
+        _record_error(job_id, f"Rejudge failed: {e}")
+        _update_job(job_id, status="failed", finished_at=time.time())
+
+def grade_program(program):
+    """
+    Grades a queued rejudge program with a single batch execution against the manifest version
+    the job pinned, or a later one. Runs on a grader; returns grading results like grade_submission.
+    """
+    package, error = judge_service.load_problem_package(program["problem_id"])
+    if not error and (package.get("manifest_version") or 0) < program["manifest_version"]:
+        # This grader cached the problem before the job bumped or pinned it
+        package, error = judge_service.load_problem_package(program["problem_id"], force_refresh=True)
+    if error:
+        return error
+    return judge_service.grade_batch(program["code"], program["language"], package)
+
+def finalize_program(program, grading_results):
+    """
+    Stores the verdict of a graded rejudge program on every submission sharing it and counts it
+    towards its job. Called by submission_service.finalize_submission while the grader holds
+    the program's lease; the last program of a job rebuilds the stats of the users whose verdicts
+    changed and marks the job done.
+    """
+    job_id = program["rejudge_job_id"]
+    try:
+        final_status, test_results = submission_service.compute_final_status(grading_results)
+        score = submission_service.compute_score(grading_results)
+    except Exception as e:
+        final_status, test_results, score = "error", [], {}
+        print(f"[Rejudge] Grading failed: {e}")
+
+    changed = 0
+    changed_users = []
+    if final_status == "error":
+        # An infrastructure failure must not overwrite the verdicts that are already stored
+        ids = ", ".join(submission["submission_id"] for submission in program["submissions"])
+        _record_error(job_id, f"Grading failed for submissions {ids}; verdicts left unchanged")
+    else:
+        operations, changed = _apply_results(program, final_status, test_results, score)
+        mongo.db.submissions.bulk_write(operations, ordered=False)
+        # Per-test results replaced above that were kept in GridFS
+        submission_store.delete_files(
+            submission["test_results_file_id"]
+            for submission in program["submissions"] if "test_results_file_id" in submission
+        )
+        changed_users = sorted({
+            submission["username"] for submission in program["submissions"]
+            if submission.get("status") != final_status
+        })
+
+    # Counted once, even if the program is finalized again after its lease expired mid-finalize
+    job = mongo.db.rejudge_jobs.find_one_and_update(
+        {"_id": job_id, "finished_programs": {"$ne": str(program["_id"])}},
+        {
+            "$inc": {"processed_programs": 1, "processed_submissions": len(program["submissions"]), "changed_verdicts": changed},
+            "$addToSet": {"finished_programs": str(program["_id"]), "changed_users": {"$each": changed_users}}
+        },
+        projection={"status": 1, "processed_programs": 1, "distinct_programs": 1, "grading_started_at": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if job is None:
+        return
+
+    processed, total = job["processed_programs"], job["distinct_programs"]
+    if processed < total:
+        elapsed = time.time() - job["grading_started_at"]
+        _update_job(job_id, eta_s=elapsed / processed * (total - processed))
+        return
+    # Only the grader that moves the job out of "grading" finishes it
+    if mongo.db.rejudge_jobs.update_one({"_id": job_id, "status": "grading"}, {"$set": {"status": "finishing"}}).modified_count:
+        _finish_job(job_id)
+
+def _finish_job(job_id):
+    job = mongo.db.rejudge_jobs.find_one({"_id": job_id}, {"changed_users": 1})
+    # Aggregates were counted with the old verdicts
+    for username in job.get("changed_users", []):
+        _, error = user_service.rebuild_user_stats(username)
+        if error:
+            _record_error(job_id, f"Failed to rebuild stats of user {username}: {error['message']}")
+    _update_job(job_id, status="done", finished_at=time.time(), eta_s=0)
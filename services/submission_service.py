@@ -1,29 +1,176 @@
 import time
-import uuid
 import json
 import threading
 import concurrent.futures
 import os
+import re
+import math
+import datetime
+import collections
+from urllib.parse import urlsplit
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
 from extensions import mongo
 from services.judge_service import grade_submission
-from services.github_services import get_file, add_file
+from services import progress_service
+from services import grading_engine
+from services import contest_service
+from services import http_client
+from services import archive_service
+from services import submission_store
+from services import user_service
+from services import intake_service
+from services import metrics_service
+from services import rejudge_service
+from services.github_services import get_file
 from config.github_config import GITHUB_SUBMISSIONS_BASE_PATH
+from config.grader_config import WORKER_ID
+from utils import tracing
 
-def handle_new_submission(problem_id, username, language, code):
+# "asyncio" grades on one event loop with bounded concurrency per downstream,
+# "threads" grades each submission on its own pool thread
+GRADING_ENGINE = os.getenv("GRADING_ENGINE", "asyncio")
+
+# --- Dispatch ---
+# Submissions claimed but not finished yet. Claiming stops at this bound, so a burst stays queued
+# in MongoDB (where other graders can take it) and drains as fast as grading slots free up.
+GRADING_MAX_IN_FLIGHT = int(os.getenv("GRADING_MAX_IN_FLIGHT", 64 if GRADING_ENGINE == "asyncio" else os.cpu_count()))
+# The slot count adapts between these bounds to how the executor copes: it grows by one slot per
+# interval while all slots are busy and the executor keeps up, and is halved when the executor
+# answers 429/503 or its average latency goes over the target
+GRADING_MIN_IN_FLIGHT = int(os.getenv("GRADING_MIN_IN_FLIGHT", 1))
+GRADING_TARGET_EXECUTOR_LATENCY_S = float(os.getenv("GRADING_TARGET_EXECUTOR_LATENCY_S", 5.0))
+SLOT_ADJUST_INTERVAL_S = float(os.getenv("GRADING_SLOT_ADJUST_INTERVAL_S", 5.0))
+# Without change streams the queue is polled, backing off from the minimum to the maximum interval while it stays empty
+QUEUE_POLL_MIN_INTERVAL_S = float(os.getenv("QUEUE_POLL_MIN_INTERVAL_S", 0.05))
+QUEUE_POLL_MAX_INTERVAL_S = float(os.getenv("QUEUE_POLL_MAX_INTERVAL_S", 1.0))
+# With change streams the queue is still swept now and then, in case an event was missed
+QUEUE_SWEEP_INTERVAL_S = float(os.getenv("QUEUE_SWEEP_INTERVAL_S", 5.0))
+CHANGE_STREAM_RETRY_S = 30
+
+# --- Leases ---
+# A claimed submission belongs to its grader until the lease expires; the heartbeat keeps extending
+# it while grading is in progress, so only a grader that died or hung lets its leases run out
+LEASE_DURATION_S = float(os.getenv("GRADING_LEASE_DURATION_S", 60))
+HEARTBEAT_INTERVAL_S = float(os.getenv("GRADING_HEARTBEAT_INTERVAL_S", 15))
+REAPER_INTERVAL_S = float(os.getenv("GRADING_REAPER_INTERVAL_S", 30))
+# Claims after which a submission whose graders keep dying is finalized as an error instead of re-queued
+GRADING_MAX_ATTEMPTS = int(os.getenv("GRADING_MAX_ATTEMPTS", 3))
+# A claimed submission is returned without its checkpoints; judge_service reads them when grading starts
+CLAIM_PROJECTION = {"checkpoints": 0}
+
+# --- Process Roles ---
+# Web workers only enqueue; grading runs in grader.py. Set to grade inside the API process as well,
+# e.g. for a single-process development setup.
+GRADE_IN_WEB_PROCESS = os.getenv("GRADE_IN_WEB_PROCESS", "false").lower() == "true"
+# On shutdown a grader stops claiming and gives the submissions in flight this long to finish;
+# keep it below the time the process manager waits between SIGTERM and SIGKILL
+GRADER_DRAIN_TIMEOUT_S = float(os.getenv("GRADER_DRAIN_TIMEOUT_S", 25))
+DRAIN_POLL_INTERVAL_S = 0.1
+
+# --- Scheduling ---
+# Lower is claimed first: submissions to a running contest, then practice, then rejudges
+PRIORITY_CLASSES = {"contest": 0, "practice": 1, "rejudge": 2}
+# get_queue_stats() reports the queue waits of the submissions claimed over this window, by any grader
+QUEUE_WAIT_WINDOW_S = int(os.getenv("QUEUE_WAIT_WINDOW_S", 300))
+
+# --- Grader Stats ---
+# Every heartbeat, each grader records its slots, grading engine and executor HTTP pools in
+# mongo.db.grader_stats for the API; a record not refreshed for this long is from a grader that stopped
+GRADER_STATS_TTL_S = float(os.getenv("GRADER_STATS_TTL_S", 60))
+
+# --- Queue Views ---
+QUEUE_PAGE_DEFAULT_SIZE = 50
+QUEUE_PAGE_MAX_SIZE = 200
+# Queued submissions are listed without their code
+QUEUE_PROJECTION = {"code": 0, "worker_id": 0, "lease_expires_at": 0, "checkpoints": 0, "submissions": 0}
+# The summary is shared by all callers for this long, and ETAs use the grading rate over this window
+QUEUE_SUMMARY_TTL_S = float(os.getenv("QUEUE_SUMMARY_TTL_S", 1.0))
+QUEUE_RATE_WINDOW_S = int(os.getenv("QUEUE_RATE_WINDOW_S", 300))
+
+_queue_event = threading.Event()
+# Set when this grader is draining: nothing more is claimed
+_stopping = threading.Event()
+_slots = {
+    "limit": GRADING_MAX_IN_FLIGHT,
+    "in_use": 0,
+    # Whether a claim was turned away for lack of a slot since the last adjustment
+    "saturated": False
+}
+_slots_lock = threading.Lock()
+# Executor counters from http_client at the last adjustment
+_executor_totals = {"requests": 0, "throttled": 0, "total_latency_s": 0.0}
+_change_stream_active = False
+# Submissions this grader holds a lease on
+_held_leases = set()
+_held_leases_lock = threading.Lock()
+_summary_cache = {"summary": None, "computed_at": 0}
+_summary_lock = threading.Lock()
+
+def _contest_of(problem_id):
+    match = re.match(r'^(C\d+)[A-Z]+$', problem_id)
+    return match.group(1) if match else None
+
+def _priority_class(contest_id):
+    """
+    Submissions to a contest that is running right now are contest traffic; everything else is practice.
+    """
+    if contest_id is None:
+        return "practice"
+    contest = mongo.db.contests.find_one({"id": contest_id}, {"_id": 0, "startTime": 1, "endTime": 1})
+    if contest and contest_service.get_contest_status(contest)["status"] == "Running":
+        return "contest"
+    return "practice"
+
+def handle_new_submission(problem_id, username, language, code, priority_class=None):
     print(f"Submission received for Problem ID: {problem_id}, Username: {username}")
 
+    contest_id = _contest_of(problem_id)
+    submission_id = ObjectId()
+
+    # A double-click or a resend of the same code gets the submission already queued
+    fingerprint = intake_service.fingerprint(username, problem_id, language, code)
+    duplicate_of = intake_service.claim_fingerprint(fingerprint, str(submission_id))
+    if duplicate_of:
+        return {
+            "submission_id": duplicate_of,
+            "status": "duplicate",
+            "message": "An identical submission was received moments ago."
+        }
+
+    retry_after = intake_service.check_rate_limits(username, contest_id)
+    if retry_after is not None:
+        intake_service.release_fingerprint(fingerprint)
+        return {
+            "error": f"Too many submissions. Try again in {math.ceil(retry_after)} seconds.",
+            "retry_after_s": retry_after
+        }
+
+    priority_class = priority_class or _priority_class(contest_id)
     submission_data = {
+        "_id": submission_id,
         "problem_id": problem_id,
+        "contest_id": contest_id,
         "username": username,
         "language": language,
         "code": code,
         "status": "in_queue",
+        "priority_class": priority_class,
+        "priority": PRIORITY_CLASSES[priority_class],
         "created_at": time.time()
     }
 
-    result = mongo.db.submissions_queue.insert_one(submission_data)
-    submission_id = str(result.inserted_id)
+    try:
+        mongo.db.submissions_queue.insert_one(submission_data)
+    except PyMongoError:
+        intake_service.release_fingerprint(fingerprint)
+        raise
+    submission_id = str(submission_id)
+    # Wake this process's worker right away; other processes learn about it from the change stream
+    _queue_event.set()
+    progress_service.publish(submission_id, {"status": "in_queue", "timestamp": submission_data["created_at"]}, username=username)
 
     return {
         "submission_id": submission_id,
@@ -31,12 +178,127 @@ def handle_new_submission(problem_id, username, language, code):
         "message": "Submission received and is waiting to be graded."
     }
 
-def get_submissions_queue():
-    queue_submissions = list(mongo.db.submissions_queue.find({}, {'_id': 0}))
-    return queue_submissions
+def _queue_cursor(submission):
+    return f"{submission['created_at']!r}:{submission['_id']}"
+
+def _parse_queue_cursor(cursor):
+    created_at, _, submission_id = cursor.rpartition(":")
+    try:
+        return float(created_at), ObjectId(submission_id)
+    except (ValueError, TypeError, InvalidId):
+        return None
+
+def get_submissions_queue(username=None, problem_id=None, cursor=None, limit=QUEUE_PAGE_DEFAULT_SIZE):
+    """
+    Returns one page of the queue in FIFO order, without code, as
+    ({"submissions": [...], "next_cursor": cursor or None}, error).
+    Pass next_cursor back to get the following page.
+    """
+    query = {}
+    if username:
+        query["username"] = username
+    if problem_id:
+        query["problem_id"] = problem_id
+    if cursor:
+        position = _parse_queue_cursor(cursor)
+        if position is None:
+            return None, {"message": "Invalid cursor"}
+        created_at, last_id = position
+        query["$or"] = [{"created_at": {"$gt": created_at}}, {"created_at": created_at, "_id": {"$gt": last_id}}]
+
+    limit = max(1, min(int(limit), QUEUE_PAGE_MAX_SIZE))
+    # One extra document tells whether there is a next page
+    page = list(mongo.db.submissions_queue.find(query, QUEUE_PROJECTION).sort([("created_at", 1), ("_id", 1)]).limit(limit + 1))
+    next_cursor = _queue_cursor(page[limit - 1]) if len(page) > limit else None
+    return {
+        "submissions": [{"submission_id": str(submission.pop("_id")), **submission} for submission in page[:limit]],
+        "next_cursor": next_cursor
+    }, None
+
+def _grading_rate():
+    """
+    Submissions graded per second over the last QUEUE_RATE_WINDOW_S, across all graders.
+    """
+    graded = mongo.db.submissions.count_documents({"graded_at": {"$gte": time.time() - QUEUE_RATE_WINDOW_S}})
+    return graded / QUEUE_RATE_WINDOW_S
+
+def _eta_s(position, rate):
+    return round(position / rate, 1) if rate > 0 else None
+
+def get_queue_summary():
+    """
+    Returns queue depth, submissions being graded, the oldest wait and the time to drain
+    the queue at the recent grading rate. Computed at most once per QUEUE_SUMMARY_TTL_S,
+    so clients can poll it every second.
+    """
+    with _summary_lock:
+        if _summary_cache["summary"] is not None and time.time() - _summary_cache["computed_at"] < QUEUE_SUMMARY_TTL_S:
+            return _summary_cache["summary"]
+
+    now = time.time()
+    depth = mongo.db.submissions_queue.count_documents({"status": "in_queue"})
+    grading = mongo.db.submissions_queue.count_documents({"status": {"$ne": "in_queue"}})
+    oldest = mongo.db.submissions_queue.find_one({"status": "in_queue"}, {"created_at": 1}, sort=[("created_at", 1)])
+    rate = _grading_rate()
+    summary = {
+        "depth": depth,
+        "grading": grading,
+        "oldest_wait_s": round(now - oldest["created_at"], 1) if oldest else 0,
+        "graded_per_minute": round(rate * 60, 1),
+        "eta_s": _eta_s(depth, rate) if depth else 0
+    }
+    with _summary_lock:
+        _summary_cache.update(summary=summary, computed_at=now)
+    return summary
+
+def get_submission_status(submission_id):
+    """
+    Returns the status of one submission: its approximate position in the queue and an ETA while it
+    is queued, its verdict (and score) once graded. Returns (status, error).
+    """
+    if not ObjectId.is_valid(submission_id):
+        return None, {"message": "Invalid submission ID"}
+
+    queued = mongo.db.submissions_queue.find_one({"_id": ObjectId(submission_id)}, {"_id": 0, "status": 1, "progress": 1, "priority": 1, "created_at": 1})
+    if queued is not None:
+        status = {"submission_id": submission_id, "status": queued["status"]}
+        if queued.get("progress"):
+            status["progress"] = queued["progress"]
+        if queued["status"] == "in_queue":
+            # Higher priority classes are claimed first, then older submissions of the same class. Turns taken
+            # between contests and users reorder a class, so the position is an estimate, not a promise.
+            priority = queued.get("priority", PRIORITY_CLASSES["practice"])
+            position = mongo.db.submissions_queue.count_documents({"status": "in_queue", "$or": [
+                {"priority": {"$lt": priority}},
+                {"priority": priority, "created_at": {"$lt": queued["created_at"]}}
+            ]}) + 1
+            status.update(position=position, eta_s=_eta_s(position, _grading_rate()))
+        return status, None
+
+    graded = mongo.db.submissions.find_one({"submission_id": submission_id}, {"_id": 0, "submission_id": 1, "status": 1, "score": 1, "max_score": 1})
+    if graded is not None:
+        return graded, None
+    return None, {"message": "Submission not found"}
+
+def get_queued_submission(submission_id):
+    """
+    Returns a submission that is still queued or being graded, or None.
+    """
+    if not ObjectId.is_valid(submission_id):
+        return None
+    queued = mongo.db.submissions_queue.find_one(
+        {"_id": ObjectId(submission_id)},
+        {"_id": 0, "problem_id": 1, "username": 1, "language": 1, "code": 1, "status": 1, "progress": 1, "created_at": 1}
+    )
+    if queued is None:
+        return None
+    queued["timestamp"] = queued.pop("created_at", None)
+    return {"submission_id": submission_id, **queued}
 
 def grading_task(submission):
     print(f"Grading submission: {submission['_id']}")
+    submission["started_at"] = time.time()
+    progress_service.track(submission['_id'], submission['username'])
     
     grading_results = grade_submission(
         submission['_id'],
@@ -45,33 +307,81 @@ def grading_task(submission):
         submission['problem_id']
     )
 
+    finalize_submission(submission, grading_results)
+
+def rejudge_task(program):
+    print(f"Rejudging program {program['_id']} of job {program['rejudge_job_id']}")
+    finalize_submission(program, rejudge_service.grade_program(program))
+
+def compute_final_status(grading_results):
+    """
+    Collapses the per-test grading results into the final verdict.
+    Returns (final_status, test_results).
+    """
     if isinstance(grading_results, dict) and grading_results.get("overall_status") == "error":
+        return "error", []
+
+    test_results = grading_results["test_results"] if isinstance(grading_results, dict) else grading_results
+    has_error = any(result.get("overall_status") == "error" for result in test_results)
+    if has_error:
         final_status = "error"
-        test_results = []
     else:
-        test_results = grading_results
-        has_error = any(result.get("overall_status") == "error" for result in test_results)
-        if has_error:
-            final_status = "error"
-        else:
-            verdicts = [result["status"] for result in test_results if "status" in result]
-            final_status = "accepted"
-            if "compilation_error" in verdicts:
-                final_status = "compilation_error"
-            elif "runtime_error" in verdicts:
-                final_status = "runtime_error"
-            elif "time_limit_exceeded" in verdicts:
-                final_status = "time_limit_exceeded"
-            elif "memory_limit_exceeded" in verdicts:
-                final_status = "memory_limit_exceeded"
-            elif "wrong_answer" in verdicts:
-                final_status = "wrong_answer"
-        print(f"has_error: {has_error}")
-        print(f"final_status: {final_status}")
+        verdicts = [result["status"] for result in test_results if "status" in result]
+        final_status = "accepted"
+        if "compilation_error" in verdicts:
+            final_status = "compilation_error"
+        elif "runtime_error" in verdicts:
+            final_status = "runtime_error"
+        elif "time_limit_exceeded" in verdicts:
+            final_status = "time_limit_exceeded"
+        elif "memory_limit_exceeded" in verdicts:
+            final_status = "memory_limit_exceeded"
+        elif "wrong_answer" in verdicts:
+            final_status = "wrong_answer"
+
+    return final_status, test_results
+
+def compute_score(grading_results):
+    """
+    Returns the fields stored with a graded submission besides its verdict: the manifest
+    version it was graded against and, for problems split into subtasks, "score",
+    "max_score" and "subtasks".
+    """
+    if not isinstance(grading_results, dict):
+        return {}
+    return {
+        field: grading_results[field]
+        for field in ("manifest_version", "score", "max_score", "subtasks")
+        if field in grading_results
+    }
+
+@tracing.traced("persist")
+def finalize_submission(submission, grading_results):
+    """
+    Computes the final verdict of a graded submission, archives it to GitHub,
+    records it in MongoDB and removes it from the queue. Nothing is persisted if
+    the grader's lease has expired and the submission was handed to another grader.
+    Queued rejudge programs are handed to rejudge_service.finalize_program instead.
+    """
+    lease = mongo.db.submissions_queue.update_one(
+        {"_id": submission["_id"], "worker_id": submission.get("worker_id")},
+        {"$set": {"status": "finalizing", "lease_expires_at": time.time() + LEASE_DURATION_S}}
+    )
+    if not lease.matched_count:
+        print(f"[Worker] Lease on submission {submission['_id']} was lost; discarding its results")
+        return
+
+    if submission.get("kind") == "rejudge":
+        rejudge_service.finalize_program(submission, grading_results)
+        mongo.db.submissions_queue.delete_one({"_id": submission["_id"]})
+        return
+
+    final_status, test_results = compute_final_status(grading_results)
+    score = compute_score(grading_results)
 
     submission_id_str = str(submission['_id'])
     
-    # Create submission files in GitHub
+    # Archive submission files to GitHub; the archiver commits them together with other submissions
     submission_path = f"{GITHUB_SUBMISSIONS_BASE_PATH}/{submission_id_str}"
     
     # Create meta.json for GitHub
@@ -82,43 +392,448 @@ def grading_task(submission):
         "language": submission['language'],
         "status": final_status,
         "timestamp": submission['created_at'],
-        "test_results": test_results
+        "test_results": test_results,
+        **score
     }
-    add_file(f"{submission_path}/meta.json", json.dumps(github_meta_data, indent=4), f"Create submission {submission_id_str} meta.json")
-
-    # Create code file
     file_extension = {"python": "py", "c": "c", "c++": "cpp"}.get(submission['language'], "txt")
-    add_file(f"{submission_path}/code.{file_extension}", submission['code'], f"Create submission {submission_id_str} code file")
+    archive_service.archive(submission_id_str, {
+        f"{submission_path}/meta.json": json.dumps(github_meta_data, indent=4),
+        f"{submission_path}/code.{file_extension}": submission['code']
+    })
 
     # Create meta data for MongoDB
+    graded_at = time.time()
     mongo_meta_data = {
         "submission_id": submission_id_str,
         "problem_id": submission['problem_id'],
+        "contest_id": submission.get('contest_id'),
+        "priority_class": submission.get('priority_class', "practice"),
         "username": submission['username'],
         "language": submission['language'],
         "status": final_status,
-        "timestamp": submission['created_at']
+        "timestamp": submission['created_at'],
+        "graded_at": graded_at,
+        **metrics_service.timings(submission, graded_at),
+        **score
     }
-    # Insert into submissions collection
-    mongo.db.submissions.insert_one(mongo_meta_data)
+    # Store the full record, code and per-test results included; GitHub only mirrors it
+    submission_store.save_submission({**mongo_meta_data, "code": submission['code'], "test_results": test_results})
+
+    counted, error = user_service.record_graded_submission(mongo_meta_data)
+    if error:
+        print(f"[Worker] Failed to update stats of user {submission['username']}: {error['message']}")
+    if counted:
+        # Counted once per submission, like the user statistics, even if finalize is retried
+        try:
+            metrics_service.record_grading(mongo_meta_data)
+        except PyMongoError as e:
+            print(f"[Worker] Failed to record grading metrics: {e}")
 
     # Remove from queue
     mongo.db.submissions_queue.delete_one({"_id": submission["_id"]})
+
+    # Notify live listeners of the verdict
+    progress_service.finish(submission["_id"], final_status)
     
     print(f"Finished grading submission: {submission['_id']}")
 
-def worker(executor):
-    while True:
-        submission = mongo.db.submissions_queue.find_one_and_update(
-            {"status": "in_queue"},
-            {"$set": {"status": "grading"}}
+def _queue_heads():
+    """
+    Returns the oldest queued submission of every (priority, contest, user), in FIFO order.
+    """
+    return list(mongo.db.submissions_queue.aggregate([
+        {"$match": {"status": "in_queue"}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {"priority": "$priority", "contest_id": "$contest_id", "username": "$username"},
+            "submission_id": {"$first": "$_id"},
+            "created_at": {"$first": "$created_at"}
+        }},
+        {"$sort": {"created_at": 1}}
+    ]))
+
+def _in_flight_counts():
+    """
+    Returns (per contest, per user) counts of submissions being graded by any grader,
+    i.e. holding a lease, whatever stage of grading they are in.
+    """
+    by_contest = collections.Counter()
+    by_user = collections.Counter()
+    for group in mongo.db.submissions_queue.aggregate([
+        {"$match": {"worker_id": {"$exists": True}}},
+        {"$group": {"_id": {"contest_id": "$contest_id", "username": "$username"}, "count": {"$sum": 1}}}
+    ]):
+        by_contest[group["_id"].get("contest_id")] += group["count"]
+        by_user[group["_id"].get("username")] += group["count"]
+    return by_contest, by_user
+
+def _pick_next(heads, by_contest, by_user):
+    """
+    Picks the queue head to grade next: the highest priority class first, then the contest and
+    the user with the fewest submissions in flight, then the oldest. Claiming one submission per
+    user at a time makes users take turns, so a user with fifty queued submissions waits behind
+    everyone else's next one instead of starving them.
+    """
+    def rank(head):
+        key = head["_id"]
+        return (
+            key.get("priority", PRIORITY_CLASSES["practice"]),
+            by_contest[key.get("contest_id")],
+            by_user[key.get("username")],
+            head["created_at"]
         )
+    return min(heads, key=rank) if heads else None
 
+def _claim_next():
+    heads = _queue_heads()
+    by_contest, by_user = _in_flight_counts()
+    while heads:
+        head = _pick_next(heads, by_contest, by_user)
+        now = time.time()
+        submission = mongo.db.submissions_queue.find_one_and_update(
+            {"_id": head["submission_id"], "status": "in_queue"},
+            {
+                "$set": {"status": "grading", "worker_id": WORKER_ID, "claimed_at": now, "lease_expires_at": now + LEASE_DURATION_S},
+                "$inc": {"attempts": 1}
+            },
+            projection=CLAIM_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
         if submission:
-            executor.submit(grading_task, submission)
+            return submission
+        # Another grader claimed it first; try the next head
+        heads.remove(head)
+    return None
+
+def _percentile(sorted_values, percentile):
+    index = max(0, -(-len(sorted_values) * percentile // 100) - 1)
+    return sorted_values[int(index)]
+
+def get_queue_stats():
+    """
+    Returns, per priority class, the number of queued submissions and the queue wait percentiles of the
+    submissions claimed by any grader over the last QUEUE_WAIT_WINDOW_S seconds: those graded since, from
+    their stored queue_wait_s, and those still being graded, from their claim and creation times.
+    """
+    queued = {priority_class: 0 for priority_class in PRIORITY_CLASSES}
+    for group in mongo.db.submissions_queue.aggregate([
+        {"$match": {"status": "in_queue"}},
+        {"$group": {"_id": "$priority_class", "count": {"$sum": 1}}}
+    ]):
+        queued[group["_id"] or "practice"] += group["count"]
+
+    since = time.time() - QUEUE_WAIT_WINDOW_S
+    waits = {priority_class: [] for priority_class in PRIORITY_CLASSES}
+    graded = mongo.db.submissions.find(
+        {"graded_at": {"$gte": since}, "queue_wait_s": {"$exists": True}},
+        {"_id": 0, "priority_class": 1, "queue_wait_s": 1}
+    )
+    for record in graded:
+        waits.get(record.get("priority_class") or "practice", []).append(record["queue_wait_s"])
+    grading = mongo.db.submissions_queue.find(
+        {"status": {"$ne": "in_queue"}, "claimed_at": {"$gte": since}},
+        {"_id": 0, "priority_class": 1, "claimed_at": 1, "created_at": 1}
+    )
+    for submission in grading:
+        waits.get(submission.get("priority_class") or "practice", []).append(max(0.0, submission["claimed_at"] - submission["created_at"]))
+
+    stats = {}
+    for priority_class in PRIORITY_CLASSES:
+        waits[priority_class].sort()
+        claimed = waits[priority_class]
+        stats[priority_class] = {
+            "queued": queued.get(priority_class, 0),
+            "claimed": len(claimed),
+            "wait_s": {f"p{p}": round(_percentile(claimed, p), 3) for p in (50, 90, 99)} if claimed else None
+        }
+    return stats
+
+def _acquire_slot():
+    with _slots_lock:
+        if _slots["in_use"] >= _slots["limit"]:
+            _slots["saturated"] = True
+            return False
+        _slots["in_use"] += 1
+        return True
+
+def _release_slot(submission_id=None):
+    with _held_leases_lock:
+        _held_leases.discard(submission_id)
+    with _slots_lock:
+        _slots["in_use"] -= 1
+    # A free slot may be all that queued submissions are waiting for
+    _queue_event.set()
+
+def drain_queue(dispatch):
+    """
+    Claims queued submissions, oldest first, and dispatches them while grading slots are free.
+    Returns the number of submissions claimed.
+    """
+    claimed = 0
+    while not _stopping.is_set() and _acquire_slot():
+        try:
+            submission = _claim_next()
+        except PyMongoError as e:
+            print(f"[Worker] Failed to claim a submission: {e}")
+            submission = None
+        if not submission:
+            with _slots_lock:
+                _slots["in_use"] -= 1
+            break
+
+        claimed += 1
+        submission_id = submission["_id"]
+        with _held_leases_lock:
+            _held_leases.add(submission_id)
+        try:
+            dispatch(submission).add_done_callback(lambda _future, submission_id=submission_id: _release_slot(submission_id))
+        except Exception as e:
+            print(f"[Worker] Failed to dispatch submission {submission_id}: {e}")
+            _release_slot(submission_id)
+    return claimed
+
+def _executor_hosts():
+    urls = (os.getenv("EXECUTE_API_SERVER_URL"), os.getenv("EXECUTE_STREAM_API_SERVER_URL"))
+    return {urlsplit(url).netloc for url in urls if url}
+
+def adjust_slots():
+    """
+    Adapts the number of grading slots to the executor (additive increase, multiplicative decrease),
+    from the requests http_client sent to it since the last adjustment. Returns the new slot count.
+    """
+    pool_stats = http_client.get_pool_stats()
+    totals = {key: 0 for key in _executor_totals}
+    for host in _executor_hosts():
+        host_stats = pool_stats.get(host, {})
+        for key in totals:
+            totals[key] += host_stats.get(key, 0)
+
+    requests_sent = totals["requests"] - _executor_totals["requests"]
+    throttled = totals["throttled"] - _executor_totals["throttled"]
+    latency_s = totals["total_latency_s"] - _executor_totals["total_latency_s"]
+    _executor_totals.update(totals)
+    avg_latency_s = latency_s / requests_sent if requests_sent else 0.0
+
+    with _slots_lock:
+        limit = _slots["limit"]
+        if throttled or avg_latency_s > GRADING_TARGET_EXECUTOR_LATENCY_S:
+            limit = max(GRADING_MIN_IN_FLIGHT, limit // 2)
+        elif _slots["saturated"] and requests_sent:
+            limit = min(GRADING_MAX_IN_FLIGHT, limit + 1)
+        if limit != _slots["limit"]:
+            print(f"[Worker] Grading slots {_slots['limit']} -> {limit} (executor: {requests_sent} requests, "
+                  f"{throttled} throttled, {avg_latency_s:.2f}s average latency)")
+        _slots["limit"] = limit
+        _slots["saturated"] = False
+        has_free_slots = limit > _slots["in_use"]
+
+    if has_free_slots:
+        _queue_event.set()
+    return limit
+
+def get_slot_stats():
+    with _slots_lock:
+        return {
+            "limit": _slots["limit"],
+            "in_use": _slots["in_use"],
+            "min": GRADING_MIN_IN_FLIGHT,
+            "max": GRADING_MAX_IN_FLIGHT
+        }
+
+def publish_grader_stats():
+    """
+    Records this grader's slots, grading engine and executor HTTP pools where any API process can read them.
+    """
+    pool_stats = http_client.get_pool_stats()
+    mongo.db.grader_stats.replace_one({"_id": WORKER_ID}, {
+        "slots": get_slot_stats(),
+        "engine": {"name": GRADING_ENGINE, **grading_engine.get_engine_stats()},
+        # Host names contain dots, which do not belong in field names
+        "http_pool": [{"host": host, **host_stats} for host, host_stats in pool_stats.items()],
+        "updated_at": time.time(),
+        "expires_at": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=GRADER_STATS_TTL_S)
+    }, upsert=True)
+
+def get_grader_stats(section):
+    """
+    Returns {worker_id: stats} of one section ("slots", "engine" or "http_pool") for every grader
+    that reported within GRADER_STATS_TTL_S.
+    """
+    graders = {}
+    for record in mongo.db.grader_stats.find({"updated_at": {"$gte": time.time() - GRADER_STATS_TTL_S}}, {section: 1}):
+        stats = record.get(section)
+        if section == "http_pool":
+            stats = {entry.pop("host"): entry for entry in stats or []}
+        graders[record["_id"]] = stats
+    return graders
+
+def _adjust_slots_periodically():
+    while True:
+        time.sleep(SLOT_ADJUST_INTERVAL_S)
+        try:
+            adjust_slots()
+        except Exception as e:
+            print(f"[Worker] Failed to adjust grading slots: {e}")
+
+def heartbeat():
+    """
+    Extends the leases this grader holds. Returns the number of leases extended.
+    """
+    with _held_leases_lock:
+        held = list(_held_leases)
+    if not held:
+        return 0
+    result = mongo.db.submissions_queue.update_many(
+        {"_id": {"$in": held}, "worker_id": WORKER_ID},
+        {"$set": {"lease_expires_at": time.time() + LEASE_DURATION_S}}
+    )
+    return result.modified_count
+
+def reap_expired_leases():
+    """
+    Re-queues submissions whose grader stopped renewing its lease, keeping their place in the queue.
+    A submission that has already used up GRADING_MAX_ATTEMPTS claims is finalized as an error instead,
+    so one that crashes its graders cannot take them all down in turn.
+    Returns (requeued, failed) counts.
+    """
+    now = time.time()
+    expired = {
+        "status": {"$in": ["grading", "finalizing"]},
+        "$or": [{"lease_expires_at": {"$lt": now}}, {"lease_expires_at": {"$exists": False}}]
+    }
+    requeued = failed = 0
+    for submission in mongo.db.submissions_queue.find(expired, {"_id": 1, "attempts": 1}):
+        if submission.get("attempts", 0) >= GRADING_MAX_ATTEMPTS:
+            # Take the lease over so finalize_submission can persist the error
+            claimed = mongo.db.submissions_queue.find_one_and_update(
+                {"_id": submission["_id"], **expired},
+                {"$set": {"status": "grading", "worker_id": WORKER_ID, "lease_expires_at": now + LEASE_DURATION_S}},
+                projection=CLAIM_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+            if claimed:
+                finalize_submission(claimed, {
+                    "overall_status": "error",
+                    "message": f"Grading was abandoned {claimed.get('attempts', 0)} times"
+                })
+                failed += 1
+            continue
+
+        result = mongo.db.submissions_queue.update_one(
+            {"_id": submission["_id"], **expired},
+            {"$set": {"status": "in_queue"}, "$unset": {"worker_id": "", "claimed_at": "", "lease_expires_at": "", "progress": ""}}
+        )
+        requeued += result.modified_count
+
+    if requeued or failed:
+        print(f"[Worker] Reaped expired leases: {requeued} re-queued, {failed} failed")
+        _queue_event.set()
+    return requeued, failed
+
+def _maintain_leases():
+    last_reaped = 0
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL_S)
+        try:
+            heartbeat()
+            publish_grader_stats()
+            if time.time() - last_reaped >= REAPER_INTERVAL_S:
+                reap_expired_leases()
+                last_reaped = time.time()
+        except PyMongoError as e:
+            print(f"[Worker] Lease maintenance failed: {e}")
+
+def _watch_queue():
+    """
+    Wakes the worker on every insert into submissions_queue. Change streams need a replica set;
+    while they are unavailable the worker falls back to adaptive polling.
+    """
+    global _change_stream_active
+    while True:
+        try:
+            with mongo.db.submissions_queue.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                _change_stream_active = True
+                print("[Worker] Dispatching from the submissions_queue change stream")
+                _queue_event.set() # Catch up on anything inserted before the stream opened
+                for _ in stream:
+                    _queue_event.set()
+        except PyMongoError as e:
+            print(f"[Worker] Change stream unavailable, polling instead: {e}")
+        _change_stream_active = False
+        time.sleep(CHANGE_STREAM_RETRY_S)
+
+def worker(dispatch):
+    poll_interval_s = QUEUE_POLL_MIN_INTERVAL_S
+    while not _stopping.is_set():
+        # Cleared before draining, so a wakeup that arrives while draining is not lost
+        _queue_event.clear()
+        if drain_queue(dispatch):
+            poll_interval_s = QUEUE_POLL_MIN_INTERVAL_S
+        else:
+            poll_interval_s = min(poll_interval_s * 2, QUEUE_POLL_MAX_INTERVAL_S)
+
+        _queue_event.wait(QUEUE_SWEEP_INTERVAL_S if _change_stream_active else poll_interval_s)
+
+def start_grading():
+    """
+    Starts this process's grader: the grading engine, the queue worker, the change stream
+    watcher, the lease heartbeat/reaper and the GitHub archiver. Used by grader.py, and by init_app
+    when GRADE_IN_WEB_PROCESS is set.
+    """
+    print(f"[Worker] Starting grader {WORKER_ID} with the {GRADING_ENGINE} engine and up to {GRADING_MAX_IN_FLIGHT} submissions in flight")
+    archive_service.start()
+    if GRADING_ENGINE == "asyncio":
+        grading_engine.start()
+        grade = lambda submission: grading_engine.submit(submission, finalize_submission)
+    else:
+        # One thread per slot, so claimed submissions never wait in the pool's internal queue
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=GRADING_MAX_IN_FLIGHT)
+        grade = lambda submission: executor.submit(grading_task, submission)
+    # Rejudged programs run as one batch execution each, outside the grading engine, but take grading slots alike
+    rejudges = concurrent.futures.ThreadPoolExecutor(max_workers=GRADING_MAX_IN_FLIGHT)
+    dispatch = lambda submission: (
+        rejudges.submit(rejudge_task, submission) if submission.get("kind") == "rejudge" else grade(submission)
+    )
+    threading.Thread(target=_watch_queue, daemon=True).start()
+    threading.Thread(target=_maintain_leases, daemon=True).start()
+    threading.Thread(target=_adjust_slots_periodically, daemon=True).start()
+    threading.Thread(target=worker, args=(dispatch,), daemon=True).start()
+
+def stop_grading(timeout_s=GRADER_DRAIN_TIMEOUT_S):
+    """
+    Drains this grader: stops claiming, waits up to timeout_s for the submissions in flight, then
+    hands the unfinished ones back to the queue so other graders take them without waiting for
+    their leases to expire, and commits pending archive files. Returns the number handed back.
+    """
+    _stopping.set()
+    _queue_event.set()
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        with _slots_lock:
+            if _slots["in_use"] <= 0:
+                break
+        time.sleep(DRAIN_POLL_INTERVAL_S)
+
+    with _held_leases_lock:
+        held = list(_held_leases)
+    handed_back = 0
+    if held:
+        # Their results, if they still arrive, are discarded by finalize_submission's lease check.
+        # A drain is not a crash, so the claim does not count towards GRADING_MAX_ATTEMPTS.
+        result = mongo.db.submissions_queue.update_many(
+            {"_id": {"$in": held}, "worker_id": WORKER_ID, "status": {"$ne": "finalizing"}},
+            {"$set": {"status": "in_queue"}, "$unset": {"worker_id": "", "claimed_at": "", "lease_expires_at": "", "progress": ""}, "$inc": {"attempts": -1}}
+        )
+        handed_back = result.modified_count
 
-        time.sleep(1) # Poll every 1 second
+    archive_service.flush()
+    try:
+        mongo.db.grader_stats.delete_one({"_id": WORKER_ID})
+    except PyMongoError as e:
+        print(f"[Worker] Failed to remove the stats of grader {WORKER_ID}: {e}")
+    print(f"[Worker] Grader {WORKER_ID} stopped; {handed_back} submissions handed back to the queue")
+    return handed_back
 
 def init_app(app):
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count())
-    threading.Thread(target=worker, args=(executor,), daemon=True).start()
+    if GRADE_IN_WEB_PROCESS:
+        start_grading()
@@ -0,0 +1,87 @@
+import os
+import json
+import gridfs
+from extensions import mongo
+
+# Code or per-test results larger than this are kept in GridFS instead of inside the submission
+# document, which keeps documents far from MongoDB's 16 MB limit and list queries light
+SUBMISSION_INLINE_MAX_BYTES = int(os.getenv("SUBMISSION_INLINE_MAX_BYTES", 256 * 1024))
+GRIDFS_COLLECTION = "submission_blobs"
+
+# Everything but the code and per-test results, for listing submissions
+SUMMARY_PROJECTION = {"_id": 0, "code": 0, "code_file_id": 0, "test_results": 0, "test_results_file_id": 0}
+
+def _fs():
+    return gridfs.GridFS(mongo.db, collection=GRIDFS_COLLECTION)
+
+def _encode(field, value, submission_id):
+    """
+    Returns the document fields storing a value: the value itself when it is small,
+    otherwise "<field>_file_id" pointing at its GridFS file.
+    """
+    data = value if isinstance(value, str) else json.dumps(value)
+    encoded = data.encode("utf-8")
+    if len(encoded) <= SUBMISSION_INLINE_MAX_BYTES:
+        return {field: value}
+    file_id = _fs().put(encoded, filename=f"{submission_id}/{field}", submission_id=submission_id, field=field)
+    return {f"{field}_file_id": file_id}
+
+def _decode(document, field):
+    if field in document:
+        return document[field]
+    file_id = document.get(f"{field}_file_id")
+    if file_id is None:
+        return None
+    try:
+        data = _fs().get(file_id).read().decode("utf-8")
+    except gridfs.NoFile:
+        return None
+    return data if field == "code" else json.loads(data)
+
+def encode_test_results(submission_id, test_results):
+    """
+    Returns ($set, $unset) fields that replace the per-test results of a submission document.
+    """
+    fields = _encode("test_results", test_results, submission_id)
+    unset = {field: "" for field in ("test_results", "test_results_file_id") if field not in fields}
+    return fields, unset
+
+def save_submission(record):
+    """
+    Stores a graded submission, code and per-test results included. Saving the same
+    submission again replaces it, so a retried finalize never creates a duplicate.
+    """
+    submission_id = record["submission_id"]
+    document = {key: value for key, value in record.items() if key not in ("code", "test_results")}
+    document.update(_encode("code", record.get("code", ""), submission_id))
+    results, unset = encode_test_results(submission_id, record.get("test_results", []))
+    document.update(results)
+    # A field that moved between the document and GridFS must not be left behind
+    unset.update({field: "" for field in ("code", "code_file_id") if field not in document})
+    mongo.db.submissions.update_one({"submission_id": submission_id}, {"$set": document, "$unset": unset}, upsert=True)
+
+def get_code(document):
+    """
+    Returns the code stored with a submission document, or None for submissions stored before code was kept in MongoDB.
+    """
+    return _decode(document, "code")
+
+def get_submission(submission_id):
+    """
+    Returns the full record of a graded submission, code and per-test results included, or None.
+    """
+    document = mongo.db.submissions.find_one({"submission_id": submission_id}, {"_id": 0})
+    if document is None:
+        return None
+    record = {key: value for key, value in document.items() if not key.endswith("_file_id")}
+    record["code"] = _decode(document, "code")
+    record["test_results"] = _decode(document, "test_results")
+    return record
+
+def delete_files(file_ids):
+    file_ids = list(file_ids)
+    if not file_ids:
+        return
+    fs = _fs()
+    for file_id in file_ids:
+        fs.delete(file_id)
@@ -0,0 +1,90 @@
+import fnmatch
+import posixpath
+
+def parse_subtasks(problem_meta, testcases):
+    """
+    Resolves the "subtasks" declared in a problem's meta.json against its testcases:
+
+        "subtasks": [
+            {"name": "small", "tests": ["small_*.in"], "points": 30},
+            {"name": "large", "tests": ["large_*.in"], "points": 70, "dependsOn": ["small"]}
+        ]
+
+    Test patterns are matched against the testcase file names, and every testcase must belong to
+    at least one subtask. A subtask may only depend on subtasks declared before it.
+    Returns (subtasks, error); subtasks is None when the problem is not split into subtasks.
+    """
+    declared = problem_meta.get("subtasks")
+    if not declared:
+        return None, None
+    if not isinstance(declared, list):
+        return None, {"message": "subtasks must be a list"}
+
+    subtasks = []
+    names = set()
+    for index, subtask in enumerate(declared):
+        if not isinstance(subtask, dict):
+            return None, {"message": f"Subtask {index + 1} must be an object"}
+
+        name = str(subtask.get("name", index + 1))
+        if name in names:
+            return None, {"message": f"Duplicate subtask name: {name}"}
+
+        points = subtask.get("points", 0)
+        if isinstance(points, bool) or not isinstance(points, (int, float)) or points < 0:
+            return None, {"message": f"Subtask {name} has invalid points: {points}"}
+
+        depends_on = [str(dependency) for dependency in subtask.get("dependsOn", [])]
+        unknown = [dependency for dependency in depends_on if dependency not in names]
+        if unknown:
+            return None, {"message": f"Subtask {name} depends on unknown or later subtasks: {', '.join(unknown)}"}
+
+        patterns = subtask.get("tests", [])
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        tests = [testcase for testcase in testcases if _matches(testcase.get('path', ''), patterns)]
+        if not tests:
+            return None, {"message": f"Subtask {name} matches no test cases"}
+
+        names.add(name)
+        subtasks.append({"name": name, "points": points, "depends_on": depends_on, "testcases": tests})
+
+    # A test outside every subtask would never run, and the verdict would silently ignore it
+    covered = {testcase.get('path') for subtask in subtasks for testcase in subtask["testcases"]}
+    uncovered = [posixpath.basename(testcase.get('path', '')) for testcase in testcases if testcase.get('path') not in covered]
+    if uncovered:
+        return None, {"message": f"Test cases in no subtask: {', '.join(uncovered)}"}
+    return subtasks, None
+
+def _matches(path, patterns):
+    file_name = posixpath.basename(path)
+    return any(fnmatch.fnmatchcase(file_name, pattern) for pattern in patterns)
+
+def score_subtasks(subtasks, results_by_path):
+    """
+    Scores every subtask from the results of its testcases: a subtask earns its points only
+    if all of its tests passed, and is "skipped" when none of its tests ran.
+    Returns (subtask_results, score, max_score).
+    """
+    subtask_results = []
+    score = 0
+    max_score = 0
+    for subtask in subtasks:
+        statuses = [results_by_path.get(testcase.get('path'), {}).get("status") for testcase in subtask["testcases"]]
+        if all(status == "passed" for status in statuses):
+            status = "passed"
+        elif all(status in (None, "skipped") for status in statuses):
+            status = "skipped"
+        else:
+            status = "failed"
+
+        earned = subtask["points"] if status == "passed" else 0
+        score += earned
+        max_score += subtask["points"]
+        subtask_results.append({
+            "name": subtask["name"],
+            "status": status,
+            "points": subtask["points"],
+            "earned": earned
+        })
+    return subtask_results, score, max_score
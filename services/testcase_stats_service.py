@@ -0,0 +1,47 @@
+from pymongo import UpdateOne
+from extensions import mongo
+
+# Verdicts that say something about the testcase. A compilation error or an infrastructure error
+# fails every test alike, so it would only make the tests that happen to run first look hard.
+FAILURE_VERDICTS = ("wrong_answer", "time_limit_exceeded", "memory_limit_exceeded", "runtime_error")
+
+def get_failure_rates(problem_id):
+    """
+    Returns {testcase_path: failure_rate} for a problem from the stored per-test counters.
+    Rates are smoothed so a test that has barely run is neither trusted nor ignored.
+    """
+    rates = {}
+    for stats in mongo.db.testcase_stats.find({"problem_id": problem_id}, {"_id": 0, "testcase": 1, "runs": 1, "failures": 1}):
+        rates[stats["testcase"]] = (stats.get("failures", 0) + 1) / (stats.get("runs", 0) + 2)
+    return rates
+
+def order_testcases(testcases, failure_rates):
+    """
+    Orders testcases so the ones most often failed by past submissions run first.
+    Tests without statistics and ties keep their original order.
+    """
+    default_rate = 0.5
+    indexed = list(enumerate(testcases))
+    indexed.sort(key=lambda item: (-failure_rates.get(item[1].get("path"), default_rate), item[0]))
+    return [testcase for _, testcase in indexed]
+
+def record_results(problem_id, test_results):
+    """
+    Incrementally updates the run and failure counters of every testcase that actually ran
+    and passed or failed with one of FAILURE_VERDICTS.
+    """
+    operations = []
+    for result in test_results:
+        testcase = result.get("testcase")
+        status = result.get("status")
+        if not testcase or (status != "passed" and status not in FAILURE_VERDICTS):
+            continue
+        operations.append(UpdateOne(
+            {"problem_id": problem_id, "testcase": testcase},
+            {"$inc": {"runs": 1, "failures": 0 if status == "passed" else 1}},
+            upsert=True
+        ))
+
+    if operations:
+        mongo.db.testcase_stats.bulk_write(operations, ordered=False)
+    return len(operations)
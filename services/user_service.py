@@ -4,6 +4,9 @@ def get_user_by_username(username):
     try:
         user = mongo.db.users.find_one({'username': username}, {'_id': 0})
         if user:
+            stats = user.get('stats', {})
+            user['solved_count'] = len(stats.get('solved', []))
+            user['attempted_count'] = len(stats.get('attempted', []))
             return user, None
         return None, {"message": "User not found"}
     except Exception as e:
@@ -16,7 +19,68 @@ def update_user_profile(username, name, new_username, bio):
     except Exception as e:
         return None, {"message": str(e)}
 
+def record_graded_submission(submission):
+    """
+    Folds a graded submission into its user's aggregates with a single atomic update.
+    The submission is flagged first, so a retried finalize never counts it twice.
+    Returns (counted, error).
+    """
+    try:
+        flagged = mongo.db.submissions.update_one(
+            {'submission_id': submission['submission_id'], 'stats_counted': {'$ne': True}},
+            {'$set': {'stats_counted': True}}
+        )
+        if not flagged.modified_count:
+            return False, None
+
+        problem_id = submission['problem_id']
+        update = {
+            '$inc': {
+                'number_of_submissions': 1,
+                f"stats.verdicts.{submission['status']}": 1,
+                f"stats.languages.{submission['language']}": 1
+            },
+            '$addToSet': {'stats.attempted': problem_id}
+        }
+        if submission['status'] == 'accepted':
+            update['$addToSet']['stats.solved'] = problem_id
+            # Keyed by submission time, so the first accepted submission wins whatever order graders finish in
+            update['$min'] = {f"stats.first_solved_at.{problem_id}": submission['timestamp']}
+        mongo.db.users.update_one({'username': submission['username']}, update)
+        return True, None
+    except Exception as e:
+        return False, {"message": str(e)}
 
-def update_user_problem_status(username, problem_id, status):
-    print(f"[User Service] Updating status for user {username}, problem {problem_id} to {status}")
-    return True, None
+def rebuild_user_stats(username):
+    """
+    Recomputes a user's aggregates from their graded submissions, e.g. after a rejudge changed verdicts.
+    Returns (stats, error).
+    """
+    try:
+        stats = {'attempted': set(), 'solved': set(), 'verdicts': {}, 'languages': {}, 'first_solved_at': {}}
+        submission_ids = []
+        for submission in mongo.db.submissions.find(
+            {'username': username},
+            {'_id': 0, 'submission_id': 1, 'problem_id': 1, 'language': 1, 'status': 1, 'timestamp': 1}
+        ):
+            submission_ids.append(submission['submission_id'])
+            problem_id = submission['problem_id']
+            stats['attempted'].add(problem_id)
+            stats['verdicts'][submission['status']] = stats['verdicts'].get(submission['status'], 0) + 1
+            stats['languages'][submission['language']] = stats['languages'].get(submission['language'], 0) + 1
+            if submission['status'] == 'accepted':
+                stats['solved'].add(problem_id)
+                first = stats['first_solved_at'].get(problem_id)
+                if first is None or submission['timestamp'] < first:
+                    stats['first_solved_at'][problem_id] = submission['timestamp']
+
+        stats['attempted'] = sorted(stats['attempted'])
+        stats['solved'] = sorted(stats['solved'])
+        mongo.db.users.update_one(
+            {'username': username},
+            {'$set': {'stats': stats, 'number_of_submissions': len(submission_ids)}}
+        )
+        mongo.db.submissions.update_many({'submission_id': {'$in': submission_ids}}, {'$set': {'stats_counted': True}})
+        return stats, None
+    except Exception as e:
+        return None, {"message": str(e)}
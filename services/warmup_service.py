@@ -0,0 +1,146 @@
+import os
+import re
+import time
+import threading
+from datetime import datetime, timedelta
+import pytz
+from pymongo.errors import PyMongoError
+from extensions import mongo
+from services.github_services import get_file, get_folder_contents
+from services import judge_service
+
+# How many minutes before a contest's startTime its problem packages are warmed
+WARMUP_LEAD_MINUTES = int(os.getenv("WARMUP_LEAD_MINUTES", 10))
+WARMUP_POLL_INTERVAL_S = int(os.getenv("WARMUP_POLL_INTERVAL_S", 60))
+
+# contest_id -> status of the warmups run by this grader; mirrored to mongo.db.contest_warmups for the API
+warmup_status = {}
+_status_lock = threading.Lock()
+
+def _parse_contest_time(time_str):
+    try:
+        return datetime.strptime(time_str, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=pytz.UTC)
+    except (TypeError, ValueError):
+        return None
+
+def get_contests_to_warm(current_time=None):
+    """
+    Returns the contests that start within the next WARMUP_LEAD_MINUTES and still need warming.
+    """
+    current_time = current_time or datetime.now(pytz.UTC)
+    window_end = current_time + timedelta(minutes=WARMUP_LEAD_MINUTES)
+
+    contests = []
+    for contest in mongo.db.contests.find({}, {'_id': 0, 'id': 1, 'startTime': 1, 'problems': 1}):
+        start_time = _parse_contest_time(contest.get('startTime'))
+        if start_time is None or not (current_time <= start_time <= window_end):
+            continue
+        with _status_lock:
+            # Failed warmups are retried on the next poll while the contest is still in the window
+            if warmup_status.get(contest['id'], {}).get("status") in ("running", "done"):
+                continue
+        contests.append(contest)
+    return contests
+
+def _get_contest_problem_ids(contest):
+    problem_ids = [problem['id'] for problem in mongo.db.problems.find({'contest_id': contest['id']}, {'_id': 0, 'id': 1})]
+    return problem_ids or contest.get('problems', [])
+
+def warm_problem(problem_id):
+    """
+    Fetches and caches everything the judge and the problem page need for a problem:
+    meta.json, problem.md and samples for the page, and the package the judge grades with
+    (the pinned testcases and validator). Returns (problem_status, error).
+    """
+    match = re.match(r'^(C\d+)([A-Z]+)$', problem_id)
+    if not match:
+        return None, {"message": f"Invalid problem ID format: {problem_id}"}
+    base_path = f"data/contests/{match.group(1)}/problems/{match.group(2)}"
+
+    _, _, meta_error = get_file(f"{base_path}/meta.json", force_refresh=True)
+    if meta_error:
+        return None, {"message": f"Failed to fetch meta.json: {meta_error['message']}"}
+
+    get_file(f"{base_path}/problem.md", force_refresh=True)
+
+    samples_contents, _ = get_folder_contents(f"{base_path}/samples", force_refresh=True)
+    if samples_contents.get('success'):
+        for item in samples_contents.get('data', []):
+            if item['type'] == 'dir':
+                for name in ("input.md", "output.md", "description.md"):
+                    get_file(f"{base_path}/samples/{item['name']}/{name}", force_refresh=True)
+
+    # The same package grading loads, from the pinned manifest (pinned now if the problem has none yet)
+    package, package_error = judge_service.load_problem_package(problem_id, force_refresh=True)
+    if package_error:
+        return None, {"message": package_error["message"]}
+
+    # A dry run lets the validator service load and compile the checker before real traffic arrives
+    _, validator_run_error = judge_service._run_validator(package["validator"], "", "")
+
+    return {
+        "testcases": len(package["testcases"]),
+        "validator_warmed": validator_run_error is None
+    }, None
+
+def _save_status(contest_id):
+    with _status_lock:
+        status = {**warmup_status[contest_id], "problems": dict(warmup_status[contest_id]["problems"])}
+    try:
+        mongo.db.contest_warmups.replace_one({"_id": contest_id}, status, upsert=True)
+    except PyMongoError as e:
+        print(f"[Warmup] Failed to save the warmup status of contest {contest_id}: {e}")
+
+def warm_contest(contest):
+    contest_id = contest['id']
+    with _status_lock:
+        warmup_status[contest_id] = {"status": "running", "started_at": time.time(), "problems": {}}
+    _save_status(contest_id)
+
+    print(f"[Warmup] Warming problem packages for contest {contest_id}")
+    failed = False
+    for problem_id in _get_contest_problem_ids(contest):
+        try:
+            problem_status, error = warm_problem(problem_id)
+        except Exception as e:
+            problem_status, error = None, {"message": str(e)}
+
+        if error:
+            failed = True
+            print(f"[Warmup] Failed to warm problem {problem_id}: {error['message']}")
+            problem_status = {"error": error["message"]}
+
+        with _status_lock:
+            warmup_status[contest_id]["problems"][problem_id] = problem_status
+
+    with _status_lock:
+        warmup_status[contest_id]["status"] = "failed" if failed else "done"
+        warmup_status[contest_id]["finished_at"] = time.time()
+    _save_status(contest_id)
+    print(f"[Warmup] Finished warming contest {contest_id}")
+
+def get_warmup_status(contest_id):
+    """
+    Returns the status of the latest warmup of a contest, as recorded by the graders. Returns (status, error).
+    """
+    status = mongo.db.contest_warmups.find_one({"_id": contest_id}, {"_id": 0})
+    if status is None:
+        return None, {"message": "No warmup has been run for this contest"}
+    return status, None
+
+def scheduler():
+    while True:
+        try:
+            for contest in get_contests_to_warm():
+                warm_contest(contest)
+        except Exception as e:
+            print(f"[Warmup] Error in warmup scheduler: {e}")
+
+        time.sleep(WARMUP_POLL_INTERVAL_S)
+
+def init_app(app):
+    """
+    Starts the warmup scheduler. Run by the processes that grade (grader.py, or the web app with
+    GRADE_IN_WEB_PROCESS), whose caches the contest's first submissions hit.
+    """
+    threading.Thread(target=scheduler, daemon=True).start()
@@ -23,15 +23,28 @@ def load_module_from_path(module_name, file_path):
 
 # Paths to individual test files
 test_files = [
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_archive_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_cache_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_contest_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_email_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_firebase_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_github_services.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_grading_engine.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_http_client.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_index_service.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_intake_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_judge_service.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_manifest_service.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_metrics_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_problem_service.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_progress_service.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_rejudge_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_submission_service.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_submission_store.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_subtask_service.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_testcase_stats_service.py')),
     os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_user_service.py')),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'test_warmup_service.py')),
 ]
 
 # Load each test module
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import json
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the archive_service.py file
+archive_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'archive_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("archive_service_module", archive_service_path)
+archive_service_module = importlib.util.module_from_spec(spec)
+sys.modules["archive_service_module"] = archive_service_module
+spec.loader.exec_module(archive_service_module)
+
+from services import github_services
+
+@pytest.fixture
+def mock_commit_files():
+    with patch('archive_service_module.commit_files') as mock_commit_files, \
+         patch.object(archive_service_module, '_pending_files', {}), \
+         patch.object(archive_service_module, '_pending_submissions', set()):
+        archive_service_module._flush_event.clear()
+        yield mock_commit_files
+
+def test_archive_service_module_exists():
+    assert True
+
+def test_flush_commits_all_pending_submissions_at_once(mock_commit_files):
+    mock_commit_files.return_value = ("c1", None)
+    archive_service_module.archive("S1", {"s/S1/meta.json": "{}", "s/S1/code.py": "print(1)"})
+    archive_service_module.archive("S2", {"s/S2/meta.json": "{}", "s/S2/code.c": "int main(){}"})
+
+    assert archive_service_module.flush() == ("c1", None)
+
+    files, message = mock_commit_files.call_args.args
+    assert sorted(files) == ["s/S1/code.py", "s/S1/meta.json", "s/S2/code.c", "s/S2/meta.json"]
+    assert message == "Archive 2 submissions"
+    assert archive_service_module.get_archive_stats()["pending_files"] == 0
+
+def test_flush_with_nothing_pending_makes_no_commit(mock_commit_files):
+    assert archive_service_module.flush() == (None, None)
+    mock_commit_files.assert_not_called()
+
+def test_failed_commit_keeps_files_without_overwriting_newer_ones(mock_commit_files):
+    archive_service_module.archive("S1", {"s/S1/meta.json": "old"})
+
+    def commit_files(files, message):
+        # A rejudge writes the same file while the commit is in progress
+        archive_service_module.archive("S1", {"s/S1/meta.json": "new"})
+        return None, {"error": True, "message": "rate limited"}
+    mock_commit_files.side_effect = commit_files
+
+    _commit_sha, error = archive_service_module.flush()
+
+    assert error["message"] == "rate limited"
+    assert archive_service_module._pending_files == {"s/S1/meta.json": "new"}
+
+def test_full_batch_wakes_the_flusher(mock_commit_files):
+    with patch.object(archive_service_module, 'ARCHIVE_BATCH_SIZE', 2):
+        archive_service_module.archive("S1", {"a": "1"})
+        assert not archive_service_module._flush_event.is_set()
+        archive_service_module.archive("S2", {"b": "2"})
+        assert archive_service_module._flush_event.is_set()
+
+# Tests for the Git Data API commit
+def _response(status_code=200, body=None):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = body or {}
+    return response
+
+def test_commit_files_rebuilds_on_the_new_head_after_a_conflict():
+    session = MagicMock()
+    session.get.side_effect = [
+        _response(body={"object": {"sha": "head1"}}), _response(body={"tree": {"sha": "tree1"}}),
+        _response(body={"object": {"sha": "head2"}}), _response(body={"tree": {"sha": "tree2"}})
+    ]
+    session.post.side_effect = [
+        _response(201, {"sha": "newtree1"}), _response(201, {"sha": "commit1"}),
+        _response(201, {"sha": "newtree2"}), _response(201, {"sha": "commit2"})
+    ]
+    session.patch.side_effect = [_response(422), _response(200)]
+
+    with patch.object(github_services, 'session', session), \
+         patch.object(github_services, '_branch', "main"), \
+         patch('services.github_services.time.sleep'):
+        commit_sha, error = github_services.commit_files({"s/S1/meta.json": "{}"}, "Archive 1 submissions")
+
+    assert (commit_sha, error) == ("commit2", None)
+    second_commit = json.loads(session.post.call_args_list[3].kwargs["data"])
+    assert second_commit["parents"] == ["head2"]
+    assert json.loads(session.patch.call_args.kwargs["data"]) == {"sha": "commit2", "force": False}
@@ -0,0 +1,123 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import asyncio
+import threading
+import time
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the grading_engine.py file
+grading_engine_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'grading_engine.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("grading_engine_module", grading_engine_path)
+grading_engine_module = importlib.util.module_from_spec(spec)
+sys.modules["grading_engine_module"] = grading_engine_module
+spec.loader.exec_module(grading_engine_module)
+
+judge_service = grading_engine_module.judge_service
+
+PACKAGE = {
+    "meta": {},
+    "time_limit_s": 1,
+    "memory_limit_mb": 256,
+    "testcases": [{"stdin": "1", "path": "1.in"}, {"stdin": "2", "path": "2.in"}],
+    "validator": "print('Accepted')"
+}
+
+# Fixture to mock every blocking call made by the grading steps
+@pytest.fixture
+def mock_downstreams():
+    with patch.object(judge_service, 'load_problem_package', return_value=(PACKAGE, None)) as mock_load, \
+         patch.object(judge_service, '_execute_testcase') as mock_execute, \
+         patch.object(judge_service, '_run_validator') as mock_validate, \
+         patch.object(judge_service, '_get_stop_on_first_failure', return_value=False), \
+         patch.object(judge_service, '_load_checkpoints', return_value={}), \
+         patch.object(judge_service, '_save_checkpoint'), \
+         patch.object(judge_service.testcase_stats_service, 'record_results'), \
+         patch.object(judge_service.progress_service, 'report_progress'), \
+         patch.object(judge_service.progress_service, 'track'):
+        mock_execute.side_effect = lambda code, language, stdin, *_: ({"stdout": stdin, "stderr": "", "err": ""}, None)
+        mock_validate.side_effect = lambda validator, output, test_input: ({"stdout": "Accepted" if output == "1" else "WA"}, None)
+        grading_engine_module.start()
+        yield mock_load, mock_execute, mock_validate
+
+def test_grading_engine_module_exists():
+    assert True
+
+def test_engine_matches_threaded_grading(mock_downstreams):
+    expected = judge_service.grade_submission("S1", "code", "python", "C1A")
+
+    finalize = MagicMock()
+    future = grading_engine_module.submit(
+        {"_id": "S1", "code": "code", "language": "python", "problem_id": "C1A"},
+        finalize
+    )
+    future.result(timeout=5)
+
+    submission, grading_results = finalize.call_args.args
+    assert submission["_id"] == "S1"
+    assert grading_results == expected
+    assert [result["status"] for result in grading_results["test_results"]] == ["passed", "wrong_answer"]
+    assert grading_engine_module.get_engine_stats()["in_flight"] == 0
+
+def test_engine_tracks_submissions_off_the_event_loop(mock_downstreams):
+    def on_loop():
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+    tracked_on_loop = []
+    judge_service.progress_service.track.side_effect = lambda *args: tracked_on_loop.append(on_loop())
+
+    future = grading_engine_module.submit(
+        {"_id": "S1", "code": "code", "language": "python", "problem_id": "C1A", "username": "u"},
+        MagicMock()
+    )
+    future.result(timeout=5)
+
+    judge_service.progress_service.track.assert_called_once_with("S1", "u")
+    assert tracked_on_loop == [False]
+
+def test_engine_returns_package_errors(mock_downstreams):
+    mock_load, _, _ = mock_downstreams
+    mock_load.return_value = (None, {"overall_status": "error", "message": "No test cases found for this problem."})
+
+    finalize = MagicMock()
+    grading_engine_module.submit({"_id": "S2", "code": "", "language": "python", "problem_id": "C1A"}, finalize).result(timeout=5)
+
+    assert finalize.call_args.args[1] == {"overall_status": "error", "message": "No test cases found for this problem."}
+
+def test_engine_turns_exceptions_into_error_results(mock_downstreams):
+    _, mock_execute, _ = mock_downstreams
+    mock_execute.side_effect = RuntimeError("boom")
+
+    finalize = MagicMock()
+    grading_engine_module.submit({"_id": "S3", "code": "", "language": "python", "problem_id": "C1A"}, finalize).result(timeout=5)
+
+    assert finalize.call_args.args[1]["overall_status"] == "error"
+    assert "boom" in finalize.call_args.args[1]["message"]
+
+def test_engine_bounds_executor_concurrency(mock_downstreams):
+    _, mock_execute, _ = mock_downstreams
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def slow_execute(code, language, stdin, *_):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.01)
+        with lock:
+            active["now"] -= 1
+        return {"stdout": "1", "stderr": "", "err": ""}, None
+
+    mock_execute.side_effect = slow_execute
+    submissions = [{"_id": f"S{i}", "code": "", "language": "python", "problem_id": "C1A"} for i in range(40)]
+    futures = [grading_engine_module.submit(submission, MagicMock()) for submission in submissions]
+    for future in futures:
+        future.result(timeout=10)
+
+    assert 1 < active["max"] <= grading_engine_module.DOWNSTREAM_LIMITS["executor"]
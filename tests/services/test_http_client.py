@@ -0,0 +1,134 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import requests
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the http_client.py file
+http_client_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'http_client.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("http_client_module", http_client_path)
+http_client_module = importlib.util.module_from_spec(spec)
+sys.modules["http_client_module"] = http_client_module
+spec.loader.exec_module(http_client_module)
+
+URL = "http://executor.local:5000/api/execute"
+
+# Fixture to mock the shared session and retry sleeps
+@pytest.fixture
+def mock_session():
+    with patch.object(http_client_module.session, 'request') as mock_request, \
+         patch('http_client_module.time.sleep') as mock_sleep:
+        http_client_module._stats.clear()
+        yield mock_request, mock_sleep
+
+def test_http_client_module_exists():
+    assert True
+
+def test_post_json_uses_separate_connect_and_read_timeouts(mock_session):
+    mock_request, _ = mock_session
+    mock_request.return_value = MagicMock(status_code=200, headers={})
+
+    response = http_client_module.post_json(URL, {"code": "print(1)"})
+
+    assert response.status_code == 200
+    _, kwargs = mock_request.call_args
+    assert kwargs["timeout"] == (http_client_module.HTTP_CONNECT_TIMEOUT_S, http_client_module.HTTP_READ_TIMEOUT_S)
+    assert kwargs["data"] == '{"code": "print(1)"}'
+
+def test_connection_errors_are_retried(mock_session):
+    mock_request, mock_sleep = mock_session
+    mock_request.side_effect = [
+        requests.exceptions.ConnectionError("refused"),
+        MagicMock(status_code=200, headers={}),
+    ]
+
+    response = http_client_module.post_json(URL, {})
+
+    assert response.status_code == 200
+    assert mock_request.call_count == 2
+    assert mock_sleep.call_count == 1
+    stats = http_client_module.get_pool_stats()["executor.local:5000"]
+    assert stats["retries"] == 1
+    assert stats["errors"] == 1
+    assert stats["in_flight"] == 0
+
+def test_read_timeouts_are_not_retried(mock_session):
+    mock_request, mock_sleep = mock_session
+    mock_request.side_effect = requests.exceptions.ReadTimeout("slow")
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        http_client_module.post_json(URL, {})
+
+    assert mock_request.call_count == 1
+    mock_sleep.assert_not_called()
+
+def test_throttled_responses_honour_retry_after(mock_session):
+    mock_request, mock_sleep = mock_session
+    mock_request.side_effect = [
+        MagicMock(status_code=429, headers={"Retry-After": "2"}),
+        MagicMock(status_code=200, headers={}),
+    ]
+
+    response = http_client_module.post_json(URL, {})
+
+    assert response.status_code == 200
+    mock_sleep.assert_called_once_with(2)
+    assert http_client_module.get_pool_stats()["executor.local:5000"]["throttled"] == 1
+
+def test_gives_up_after_max_retries(mock_session):
+    mock_request, mock_sleep = mock_session
+    mock_request.return_value = MagicMock(status_code=503, headers={})
+
+    response = http_client_module.post_json(URL, {})
+
+    assert response.status_code == 503
+    assert mock_request.call_count == http_client_module.HTTP_MAX_RETRIES + 1
+
+def test_pool_sizes_are_configurable_per_host():
+    sizes = http_client_module._parse_pool_sizes("executor:5000=64, validator:5001=16,bad")
+    assert sizes == {"executor:5000": 64, "validator:5001": 16}
+
+def test_get_pool_stats_reports_pools(mock_session):
+    mock_request, _ = mock_session
+    mock_request.return_value = MagicMock(status_code=200, headers={})
+
+    http_client_module.post_json(URL, {})
+    stats = http_client_module.get_pool_stats()["executor.local:5000"]
+
+    assert stats["requests"] == 1
+    assert "pools" in stats
+
+def test_multipart_file_body_streams_file_from_disk(tmp_path):
+    from io import BytesIO
+    from werkzeug.formparser import parse_form_data
+
+    stdin_path = tmp_path / "big.in"
+    stdin_path.write_bytes(b"1 2 3\n" * 50000)
+
+    with patch.object(http_client_module, 'HTTP_UPLOAD_CHUNK_BYTES', 1024):
+        body = http_client_module.MultipartFileBody({"language": "python", "code": "print(1)"}, "stdin", str(stdin_path))
+        chunks = list(body)
+
+    data = b"".join(chunks)
+    assert len(data) == len(body)
+    assert max(len(chunk) for chunk in chunks[1:-1]) == 1024
+
+    environ = {"REQUEST_METHOD": "POST", "CONTENT_TYPE": body.content_type, "CONTENT_LENGTH": str(len(data)), "wsgi.input": BytesIO(data)}
+    _, form, files = parse_form_data(environ)
+    assert form["code"] == "print(1)"
+    assert files["stdin"].read() == b"1 2 3\n" * 50000
+
+def test_post_file_sends_multipart_content_type(mock_session, tmp_path):
+    mock_request, _ = mock_session
+    mock_request.return_value = MagicMock(status_code=200, headers={})
+    stdin_path = tmp_path / "1.in"
+    stdin_path.write_text("42")
+
+    http_client_module.post_file(URL + "/stream", {"language": "python"}, "stdin", str(stdin_path))
+
+    _, kwargs = mock_request.call_args
+    assert kwargs["headers"]["Content-Type"].startswith("multipart/form-data; boundary=")
+    assert isinstance(kwargs["data"], http_client_module.MultipartFileBody)
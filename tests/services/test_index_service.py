@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import patch
+import sys
+import os
+import importlib.util
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+# Construct the absolute path to the index_service.py file
+index_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'index_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("index_service_module", index_service_path)
+index_service_module = importlib.util.module_from_spec(spec)
+sys.modules["index_service_module"] = index_service_module
+spec.loader.exec_module(index_service_module)
+
+INDEX_SCAN_PLAN = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "username_1"}}
+COLLECTION_SCAN_PLAN = {"queryPlan": {"stage": "SORT", "inputStages": [{"stage": "COLLSCAN"}]}}
+
+@pytest.fixture
+def mock_mongo():
+    with patch('index_service_module.mongo') as mock_mongo:
+        yield mock_mongo
+
+def test_index_service_module_exists():
+    assert True
+
+def test_ensure_indexes_creates_every_declared_index(mock_mongo):
+    collection = mock_mongo.db.__getitem__.return_value
+    collection.create_index.return_value = "index_1"
+
+    names, errors = index_service_module.ensure_indexes()
+
+    declared = sum(len(indexes) for indexes in index_service_module.INDEXES.values())
+    assert collection.create_index.call_count == declared
+    assert len(names) == declared
+    assert errors == []
+
+def test_ensure_indexes_reports_failures_and_continues(mock_mongo):
+    collection = mock_mongo.db.__getitem__.return_value
+    collection.create_index.side_effect = [OperationFailure("E11000 duplicate key")] + ["index_1"] * 100
+
+    names, errors = index_service_module.ensure_indexes()
+
+    assert len(errors) == 1
+    assert "duplicate key" in errors[0]["message"]
+    assert len(names) == collection.create_index.call_count - 1
+
+def test_init_app_boots_when_mongo_is_unreachable(mock_mongo, capsys):
+    collection = mock_mongo.db.__getitem__.return_value
+    collection.create_index.side_effect = ServerSelectionTimeoutError("localhost:27017: connection refused")
+    mock_mongo.db.command.side_effect = ServerSelectionTimeoutError("localhost:27017: connection refused")
+
+    index_service_module.init_app(None)
+
+    # The other indexes would only wait for the same timeout
+    assert collection.create_index.call_count == 1
+    assert "connection refused" in capsys.readouterr().out
+
+def test_plan_stages_walks_nested_plans():
+    assert index_service_module._plan_stages(INDEX_SCAN_PLAN) == ["FETCH", "IXSCAN"]
+    assert index_service_module._plan_stages(COLLECTION_SCAN_PLAN) == ["SORT", "COLLSCAN"]
+
+def test_audit_flags_collection_scans(mock_mongo):
+    mock_mongo.db.command.side_effect = lambda command: {
+        "queryPlanner": {"winningPlan": COLLECTION_SCAN_PLAN if command["explain"]["find"] == "contests" else INDEX_SCAN_PLAN}
+    }
+
+    report, error = index_service_module.audit_query_plans()
+
+    assert error is None
+    assert len(report) == len(index_service_module.AUDITED_QUERIES)
+    assert {entry["collection"] for entry in report if entry["collection_scan"]} == {"contests"}
+    assert mock_mongo.db.command.call_args_list[0].args[0]["verbosity"] == "queryPlanner"
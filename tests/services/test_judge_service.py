@@ -4,6 +4,7 @@ import json
 import os
 import sys
 import importlib.util
+from pymongo.errors import PyMongoError
 
 # Construct the absolute path to the judge_service.py file
 judge_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'judge_service.py'))
@@ -27,9 +28,9 @@ def mock_env_vars():
 # Fixture to mock github_services functions
 @pytest.fixture
 def mock_github_services():
-    with patch('judge_service_module.get_file') as mock_get_file, \
-         patch('judge_service_module.get_folder_contents') as mock_get_folder_contents:
-        yield mock_get_file, mock_get_folder_contents
+    with patch('judge_service_module.download_blob') as mock_download_blob, \
+         patch('judge_service_module.manifest_service') as mock_manifest_service:
+        yield mock_download_blob, mock_manifest_service
 
 # Fixture to mock requests
 @pytest.fixture
@@ -215,3 +216,240 @@ def test_grade_submission_compilation_error(mock_github_services, mock_requests,
     assert result["test_results"][0]["status"] == "compilation_error"
 
 # Add tests for other error types (TLE, MLE, RTE) and edge cases (no meta.json, judge server down)
+
+# Tests for stop-on-first-failure grading
+@pytest.fixture
+def mock_grading_steps():
+    package = {
+        "meta": {"stopOnFirstFailure": True},
+        "time_limit_s": 1,
+        "memory_limit_mb": 256,
+        "testcases": [{"stdin": "1", "path": "t/1.in"}, {"stdin": "2", "path": "t/2.in"}, {"stdin": "3", "path": "t/3.in"}],
+        "validator": "validator"
+    }
+    with patch('judge_service_module.load_problem_package', return_value=(package, None)), \
+         patch('judge_service_module._execute_testcase') as mock_execute, \
+         patch('judge_service_module._run_validator') as mock_validate, \
+         patch('judge_service_module.progress_service'), \
+         patch('judge_service_module._load_checkpoints', return_value={}), \
+         patch('judge_service_module._save_checkpoint'), \
+         patch('judge_service_module.testcase_stats_service') as mock_stats:
+        mock_execute.side_effect = lambda code, language, stdin, *_: ({"stdout": stdin, "stderr": "", "err": ""}, None)
+        mock_validate.side_effect = lambda validator, output, test_input: ({"stdout": "WA" if output == "2" else "Accepted"}, None)
+        mock_stats.get_failure_rates.return_value = {}
+        mock_stats.order_testcases.side_effect = lambda testcases, rates: testcases
+        yield package, mock_execute, mock_stats
+
+def test_grade_submission_stops_on_first_failure(mock_grading_steps):
+    package, mock_execute, mock_stats = mock_grading_steps
+
+    results = judge_service_module.grade_submission("S1", "code", "python", "C1A")["test_results"]
+
+    assert [result["status"] for result in results] == ["passed", "wrong_answer", "skipped"]
+    assert results[2]["testcase"] == "t/3.in"
+    assert mock_execute.call_count == 2
+    mock_stats.record_results.assert_called_once_with("C1A", results)
+
+def test_grade_submission_runs_every_test_without_fail_fast(mock_grading_steps):
+    package, mock_execute, mock_stats = mock_grading_steps
+    package["meta"]["stopOnFirstFailure"] = False
+
+    results = judge_service_module.grade_submission("S1", "code", "python", "C1A")["test_results"]
+
+    assert [result["status"] for result in results] == ["passed", "wrong_answer", "passed"]
+    assert mock_execute.call_count == 3
+    mock_stats.order_testcases.assert_not_called()
+
+def test_grade_submission_short_circuits_subtasks(mock_grading_steps):
+    package, mock_execute, mock_stats = mock_grading_steps
+    package["subtasks"] = [
+        {"name": "small", "points": 20, "depends_on": [], "testcases": [package["testcases"][0]]},
+        {"name": "medium", "points": 30, "depends_on": [], "testcases": package["testcases"][1:]},
+        {"name": "large", "points": 50, "depends_on": ["medium"], "testcases": [package["testcases"][2]]},
+    ]
+
+    results = judge_service_module.grade_submission("S1", "code", "python", "C1A")
+
+    assert [result["status"] for result in results["test_results"]] == ["passed", "wrong_answer", "skipped"]
+    assert mock_execute.call_count == 2
+    assert [subtask["status"] for subtask in results["subtasks"]] == ["passed", "failed", "skipped"]
+    assert results["score"] == 20
+    assert results["max_score"] == 100
+    mock_stats.record_results.assert_called_once_with("C1A", results["test_results"])
+
+def test_grade_submission_runs_shared_subtask_tests_once(mock_grading_steps):
+    package, mock_execute, mock_stats = mock_grading_steps
+    package["subtasks"] = [
+        {"name": "1", "points": 40, "depends_on": [], "testcases": package["testcases"][:2]},
+        {"name": "2", "points": 60, "depends_on": [], "testcases": [package["testcases"][1], package["testcases"][2]]},
+    ]
+
+    results = judge_service_module.grade_submission("S1", "code", "python", "C1A")
+
+    # Test 2 fails in subtask 1, so subtask 2 fails without running test 3
+    assert mock_execute.call_count == 2
+    assert [subtask["status"] for subtask in results["subtasks"]] == ["failed", "failed"]
+    assert results["test_results"][2]["status"] == "skipped"
+    assert results["score"] == 0
+
+# Tests for checkpointed grading
+def test_grade_submission_checkpoints_every_test(mock_grading_steps):
+    package, _, _ = mock_grading_steps
+    package["manifest_version"] = 3
+
+    judge_service_module.grade_submission("S1", "code", "python", "C1A")
+
+    saved = judge_service_module._save_checkpoint.call_args_list
+    assert [saved_call.args[2]["testcase"] for saved_call in saved] == ["t/1.in", "t/2.in"]
+    assert all(saved_call.args[:2] == ("S1", 3) for saved_call in saved)
+
+def test_grade_submission_resumes_from_checkpoints(mock_grading_steps):
+    package, mock_execute, mock_stats = mock_grading_steps
+    package["meta"]["stopOnFirstFailure"] = False
+    judge_service_module._load_checkpoints.return_value = {"t/1.in": {"status": "passed", "testcase": "t/1.in"}}
+
+    results = judge_service_module.grade_submission("S1", "code", "python", "C1A")["test_results"]
+
+    assert [result["status"] for result in results] == ["passed", "wrong_answer", "passed"]
+    assert [execute_call.args[2] for execute_call in mock_execute.call_args_list] == ["2", "3"]
+    # The checkpointed test was counted in the statistics by the attempt that ran it
+    mock_stats.record_results.assert_called_once_with("C1A", results[1:])
+
+def test_load_checkpoints_ignores_other_test_versions():
+    with patch('judge_service_module.mongo') as mock_mongo:
+        mock_mongo.db.submissions_queue.find_one.return_value = {"checkpoints": [
+            {"testcase": "t/1.in", "manifest_version": 2, "result": {"status": "wrong_answer"}},
+            {"testcase": "t/1.in", "manifest_version": 3, "result": {"status": "passed"}},
+            {"testcase": "t/2.in", "manifest_version": 2, "result": {"status": "passed"}},
+        ]}
+
+        assert judge_service_module._load_checkpoints("S1", 3) == {"t/1.in": {"status": "passed"}}
+
+def test_save_checkpoint_only_while_holding_the_lease():
+    with patch('judge_service_module.mongo') as mock_mongo:
+        judge_service_module._save_checkpoint("S1", 3, {"testcase": "t/1.in", "status": "passed"})
+        query, update = mock_mongo.db.submissions_queue.update_one.call_args.args
+        assert query["_id"] == "S1"
+        assert query["worker_id"] == judge_service_module.WORKER_ID
+        assert update["$push"]["checkpoints"]["manifest_version"] == 3
+
+def test_save_checkpoint_keeps_only_verdicts_and_measurements():
+    with patch('judge_service_module.mongo') as mock_mongo, \
+         patch.object(judge_service_module, 'CHECKPOINT_MAX_COUNT', 50):
+        judge_service_module._save_checkpoint("S1", 3, {
+            "testcase": "t/1.in", "status": "passed", "timetaken": 12, "memorytaken": 2048,
+            "stdout": "x" * 100, "user_output": "x" * 100, "stdin": "1"
+        })
+        query, update = mock_mongo.db.submissions_queue.update_one.call_args.args
+
+    assert update["$push"]["checkpoints"]["result"] == {"testcase": "t/1.in", "status": "passed", "timetaken": 12, "memorytaken": 2048}
+    # Nothing is pushed once the submission has CHECKPOINT_MAX_COUNT checkpoints
+    assert query["checkpoints.49"] == {"$exists": False}
+
+def test_save_checkpoint_failure_does_not_fail_grading():
+    with patch('judge_service_module.mongo') as mock_mongo:
+        mock_mongo.db.submissions_queue.update_one.side_effect = PyMongoError("not primary")
+        judge_service_module._save_checkpoint("S1", 3, {"testcase": "t/1.in", "status": "passed"})
+
+# Tests for testcases streamed from disk
+MANIFEST = {
+    "problem_id": "C1A",
+    "version": 3,
+    "tree_sha": "tree",
+    "files": {"meta.json": "meta-sha", "validator.py": "validator-sha"},
+    "testcases": [
+        {"path": "data/contests/C1/problems/A/testcases/1.in", "sha": "small-sha", "size": 7},
+        {"path": "data/contests/C1/problems/A/testcases/2.in", "sha": "big-sha", "size": 100}
+    ]
+}
+
+@pytest.fixture
+def mock_blobs(tmp_path):
+    blobs = {
+        "meta-sha": json.dumps({"timeLimit": 2000, "timeMultipliers": {"python": 3}}).encode(),
+        "validator-sha": b"print('Accepted')",
+        "small-sha": b"1 2\r\n3\n",
+        "big-sha": b"9" * 100
+    }
+
+    def download_blob(blob_sha, destination_path):
+        with open(destination_path, "wb") as f:
+            f.write(blobs[blob_sha])
+        return len(blobs[blob_sha]), None
+
+    with patch.object(judge_service_module, 'TESTCASE_CACHE_DIR', str(tmp_path)), \
+         patch.object(judge_service_module, 'TESTCASE_INLINE_MAX_BYTES', 10), \
+         patch('judge_service_module.download_blob', side_effect=download_blob) as mock_download_blob, \
+         patch('judge_service_module.manifest_service') as mock_manifest_service:
+        judge_service_module.testcase_cache.clear()
+        mock_manifest_service.get_manifest.return_value = (MANIFEST, None)
+        yield mock_download_blob, mock_manifest_service
+
+def test_get_testcases_reads_the_pinned_snapshot(mock_blobs):
+    mock_download_blob, _ = mock_blobs
+
+    testcases = judge_service_module.get_testcases("C1A")
+
+    assert [testcase["path"] for testcase in testcases] == [entry["path"] for entry in MANIFEST["testcases"]]
+    # Small testcases stay in memory, large ones only on disk
+    assert testcases[0]["stdin"] == "1 2\r\n3\n"
+    assert "stdin" not in testcases[1]
+    assert open(testcases[1]["file"], "rb").read() == b"9" * 100
+
+    # Blobs are content-addressed, so they are downloaded once
+    judge_service_module.testcase_cache.clear()
+    judge_service_module.get_testcases("C1A")
+    assert mock_download_blob.call_count == 2
+
+def test_get_testcases_refetches_after_a_version_bump(mock_blobs):
+    _, mock_manifest_service = mock_blobs
+    judge_service_module.get_testcases("C1A")
+
+    bumped = {**MANIFEST, "version": 4, "testcases": MANIFEST["testcases"][:1]}
+    mock_manifest_service.get_manifest.return_value = (bumped, None)
+
+    assert len(judge_service_module.get_testcases("C1A")) == 1
+
+def test_load_problem_package_records_manifest_version(mock_blobs):
+    package, error = judge_service_module.load_problem_package("C1A")
+
+    assert error is None
+    assert package["manifest_version"] == 3
+    assert package["validator"] == "print('Accepted')"
+    assert package["time_limit_s"] == 2
+    assert package["time_multipliers"] == {"python": 3.0}
+    assert judge_service_module._time_limit_s(package, "python") == 6
+
+def test_load_problem_package_fails_without_a_complete_snapshot(mock_blobs):
+    mock_download_blob, _ = mock_blobs
+    mock_download_blob.side_effect = lambda blob_sha, destination_path: (None, {"error": True, "message": f"Blob {blob_sha} failed verification"})
+
+    package, error = judge_service_module.load_problem_package("C1A")
+
+    assert package is None
+    assert "failed verification" in error["message"]
+
+def test_grade_submission_streams_testcases_kept_on_disk(mock_grading_steps):
+    package, mock_execute, _ = mock_grading_steps
+    package["meta"]["stopOnFirstFailure"] = False
+    package["testcases"] = [{"stdin": "1", "path": "t/1.in"}, {"path": "t/big.in", "file": "/cache/C1A/big.in", "size": 10 ** 8}]
+
+    with patch('judge_service_module._execute_testcase_file', return_value=({"stdout": "big", "stderr": "", "err": ""}, None)) as mock_execute_file, \
+         patch('judge_service_module._run_validator_file', return_value=({"stdout": "Accepted"}, None)) as mock_validate_file:
+        results = judge_service_module.grade_submission("S1", "code", "python", "C1A")["test_results"]
+
+    assert [result["status"] for result in results] == ["passed", "passed"]
+    assert mock_execute.call_count == 1
+    mock_execute_file.assert_called_once_with("code", "python", "/cache/C1A/big.in", 1, 256)
+    mock_validate_file.assert_called_once_with("validator", "big", "/cache/C1A/big.in")
+    assert results[1]["stdin"] is None
+
+def test_grade_submission_scales_time_limit_per_language(mock_grading_steps):
+    package, mock_execute, _ = mock_grading_steps
+    package["time_multipliers"] = {"python": 2.5}
+
+    judge_service_module.grade_submission("S1", "code", "python", "C1A")
+    judge_service_module.grade_submission("S2", "code", "c++", "C1A")
+
+    time_limits = [call_args.args[3] for call_args in mock_execute.call_args_list]
+    assert time_limits == [2.5, 2.5, 1, 1]
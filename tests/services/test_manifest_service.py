@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import patch
+from pymongo.errors import DuplicateKeyError
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the manifest_service.py file
+manifest_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'manifest_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("manifest_service_module", manifest_service_path)
+manifest_service_module = importlib.util.module_from_spec(spec)
+sys.modules["manifest_service_module"] = manifest_service_module
+spec.loader.exec_module(manifest_service_module)
+
+PROBLEMS_LISTING = {"success": True, "data": [
+    {"name": "A", "type": "dir", "sha": "tree-a"},
+    {"name": "B", "type": "dir", "sha": "tree-b"}
+]}
+
+TREE = [
+    {"path": "meta.json", "type": "blob", "sha": "meta-sha", "size": 40},
+    {"path": "problem.md", "type": "blob", "sha": "md-sha", "size": 400},
+    {"path": "validator.py", "type": "blob", "sha": "validator-sha", "size": 90},
+    {"path": "testcases", "type": "tree", "sha": "testcases-tree"},
+    {"path": "testcases/2.in", "type": "blob", "sha": "sha-2", "size": 5},
+    {"path": "testcases/1.in", "type": "blob", "sha": "sha-1", "size": 3},
+    {"path": "testcases/1.out", "type": "blob", "sha": "sha-1-out", "size": 3},
+    {"path": "samples/1/input.md", "type": "blob", "sha": "sample-sha", "size": 3}
+]
+
+@pytest.fixture
+def mock_github():
+    with patch('manifest_service_module.get_folder_contents', return_value=(PROBLEMS_LISTING, None)) as mock_get_folder_contents, \
+         patch('manifest_service_module.get_tree', return_value=(TREE, None)) as mock_get_tree, \
+         patch('manifest_service_module.mongo') as mock_mongo:
+        manifest_service_module._manifest_cache.clear()
+        mock_mongo.db.problem_manifests.find_one.return_value = None
+        yield mock_get_folder_contents, mock_get_tree, mock_mongo
+
+def test_manifest_service_module_exists():
+    assert True
+
+def test_pin_problem_snapshots_testcases_and_files(mock_github):
+    _, mock_get_tree, mock_mongo = mock_github
+
+    manifest, error = manifest_service_module.pin_problem("C1A", pinned_by="admin")
+
+    assert error is None
+    mock_get_tree.assert_called_once_with("tree-a")
+    assert manifest["tree_sha"] == "tree-a"
+    assert manifest["version"] == 1
+    assert manifest["files"] == {"meta.json": "meta-sha", "validator.py": "validator-sha"}
+    assert manifest["testcases"] == [
+        {"path": "data/contests/C1/problems/A/testcases/1.in", "sha": "sha-1", "size": 3},
+        {"path": "data/contests/C1/problems/A/testcases/2.in", "sha": "sha-2", "size": 5}
+    ]
+    mock_mongo.db.problem_manifests.insert_one.assert_called_once()
+
+def test_pin_problem_keeps_version_for_unchanged_tree(mock_github):
+    _, _, mock_mongo = mock_github
+    current = {"problem_id": "C1A", "version": 2, "tree_sha": "tree-a"}
+    mock_mongo.db.problem_manifests.find_one.return_value = current
+
+    manifest, error = manifest_service_module.pin_problem("C1A")
+
+    assert manifest == current
+    mock_mongo.db.problem_manifests.insert_one.assert_not_called()
+
+def test_bump_version_pins_the_new_tree(mock_github):
+    _, _, mock_mongo = mock_github
+    mock_mongo.db.problem_manifests.find_one.return_value = {"problem_id": "C1A", "version": 2, "tree_sha": "old-tree"}
+
+    manifest, error = manifest_service_module.bump_version("C1A", "admin")
+
+    assert error is None
+    assert manifest["version"] == 3
+    assert manifest["pinned_by"] == "admin"
+    assert manifest["changed"] is True
+
+def test_pin_problem_uses_the_concurrently_pinned_version(mock_github):
+    _, _, mock_mongo = mock_github
+    winner = {"problem_id": "C1A", "version": 1, "tree_sha": "tree-a"}
+    mock_mongo.db.problem_manifests.find_one.side_effect = [None, winner]
+    mock_mongo.db.problem_manifests.insert_one.side_effect = DuplicateKeyError("duplicate")
+
+    manifest, _ = manifest_service_module.pin_problem("C1A")
+
+    assert manifest == winner
+
+def test_get_manifest_pins_on_first_use_and_caches(mock_github):
+    mock_get_folder_contents, _, mock_mongo = mock_github
+
+    first, _ = manifest_service_module.get_manifest("C1A")
+    second, _ = manifest_service_module.get_manifest("C1A")
+
+    assert first is second
+    assert first["pinned_by"] == "judge"
+    mock_get_folder_contents.assert_called_once()
+
+def test_pin_problem_requires_validator(mock_github):
+    _, mock_get_tree, _ = mock_github
+    mock_get_tree.return_value = ([entry for entry in TREE if entry["path"] != "validator.py"], None)
+
+    manifest, error = manifest_service_module.pin_problem("C1A")
+
+    assert manifest is None
+    assert "validator.py" in error["message"]
@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the metrics_service.py file
+metrics_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'metrics_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("metrics_service_module", metrics_service_path)
+metrics_service_module = importlib.util.module_from_spec(spec)
+sys.modules["metrics_service_module"] = metrics_service_module
+spec.loader.exec_module(metrics_service_module)
+
+RECORD = {"problem_id": "C1A", "contest_id": "C1", "language": "python", "status": "accepted",
+          "queue_wait_s": 0.3, "claim_to_start_s": 0.01, "grading_s": 4.0}
+
+@pytest.fixture
+def mock_mongo():
+    with patch('metrics_service_module.mongo') as mock_mongo:
+        yield mock_mongo
+
+def test_metrics_service_module_exists():
+    assert True
+
+def test_timings_split_the_time_of_a_submission():
+    submission = {"created_at": 100.0, "claimed_at": 102.0, "started_at": 102.5}
+
+    assert metrics_service_module.timings(submission, 110.0) == {"queue_wait_s": 2.0, "claim_to_start_s": 0.5, "grading_s": 7.5}
+    assert metrics_service_module.timings({"created_at": 100.0}, 110.0) == {}
+
+def test_record_grading_increments_cumulative_buckets(mock_mongo):
+    metrics_service_module.record_grading(RECORD)
+
+    query, update = mock_mongo.db.grading_metrics.update_one.call_args.args
+    assert query == {"_id": "C1A|C1|python"}
+    inc = update["$inc"]
+    assert inc["verdicts.accepted"] == 1
+    assert inc["grading_s.count"] == 1
+    assert inc["grading_s.sum"] == 4.0
+    assert "grading_s.buckets.2_5" not in inc
+    assert inc["grading_s.buckets.5"] == 1
+    assert inc["grading_s.buckets.300"] == 1
+    assert inc["queue_wait_s.buckets.0_5"] == 1
+    assert mock_mongo.db.grading_metrics.update_one.call_args.kwargs["upsert"] is True
+
+def test_render_prometheus(mock_mongo):
+    mock_mongo.db.grading_metrics.find.return_value = [{
+        "_id": "C1A|C1|python", "problem_id": "C1A", "contest_id": "C1", "language": "python",
+        "verdicts": {"accepted": 2},
+        "grading_s": {"count": 2, "sum": 5.0, "buckets": {"5": 2, "10": 2, "30": 2, "60": 2, "300": 2}}
+    }]
+
+    body = metrics_service_module.render_prometheus({"depth": 7, "grading": 3, "oldest_wait_s": 12.5})
+
+    assert "judge_queue_depth 7\n" in body
+    assert 'judge_graded_total{problem_id="C1A",contest_id="C1",language="python",verdict="accepted"} 2' in body
+    assert 'judge_grading_seconds_bucket{problem_id="C1A",contest_id="C1",language="python",le="2.5"} 0' in body
+    assert 'judge_grading_seconds_bucket{problem_id="C1A",contest_id="C1",language="python",le="+Inf"} 2' in body
+    assert 'judge_grading_seconds_count{problem_id="C1A",contest_id="C1",language="python"} 2' in body
+
+def test_get_window_metrics(mock_mongo):
+    with patch('metrics_service_module.time.time', return_value=1000.0):
+        mock_mongo.db.submissions.find.return_value = [
+            {**RECORD, "timestamp": 990.0},
+            {**RECORD, "timestamp": 500.0, "status": "wrong_answer", "language": "c++", "grading_s": 8.0},
+        ]
+        mock_mongo.db.submissions_queue.count_documents.return_value = 4
+
+        metrics = metrics_service_module.get_window_metrics(60)
+
+    assert mock_mongo.db.submissions.find.call_args.args[0] == {"graded_at": {"$gte": 940.0}}
+    assert metrics["graded_per_minute"] == 2
+    assert metrics["received_per_minute"] == 5
+    assert metrics["verdicts"] == {"accepted": 1, "wrong_answer": 1}
+    assert metrics["grading_s"]["max"] == 8.0
+    assert set(metrics["by_language"]) == {"python", "c++"}
+    assert metrics["by_contest"]["C1"]["graded"] == 2
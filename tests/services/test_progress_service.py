@@ -0,0 +1,156 @@
+import pytest
+from unittest.mock import patch
+import json
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the progress_service.py file
+progress_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'progress_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("progress_service_module", progress_service_path)
+progress_service_module = importlib.util.module_from_spec(spec)
+sys.modules["progress_service_module"] = progress_service_module
+spec.loader.exec_module(progress_service_module)
+
+# Fixture to mock the mongo extension
+@pytest.fixture
+def mock_mongo():
+    with patch('progress_service_module.mongo') as mock_mongo:
+        progress_service_module._last_write_at.clear()
+        progress_service_module._events_collection.update(capped=False, checked_at=None)
+        mock_mongo.db.submission_events.options.return_value = {"capped": True, "size": 1024}
+        yield mock_mongo
+
+def test_progress_service_module_exists():
+    assert True
+
+def test_report_progress_throttles_mongo_writes(mock_mongo):
+    with patch('progress_service_module.time.time', side_effect=[100.0, 100.5, 103.0]):
+        assert progress_service_module.report_progress("S1", "running test case 1") is True
+        assert progress_service_module.report_progress("S1", "running test case 2") is False
+        assert progress_service_module.report_progress("S1", "running test case 3") is True
+
+    assert mock_mongo.db.submissions_queue.update_one.call_count == 2
+    mock_mongo.db.submissions_queue.update_one.assert_called_with(
+        {"_id": "S1", "worker_id": progress_service_module.WORKER_ID}, {"$set": {"progress": "running test case 3"}}
+    )
+
+def test_report_progress_publishes_every_update(mock_mongo):
+    listener = progress_service_module.subscribe("S2")
+    try:
+        progress_service_module.report_progress("S2", "running test case 1")
+        progress_service_module.report_progress("S2", "running test case 2")
+
+        assert listener.get_nowait()["status"] == "running test case 1"
+        assert listener.get_nowait()["status"] == "running test case 2"
+        assert mock_mongo.db.submissions_queue.update_one.call_count == 1
+    finally:
+        progress_service_module.unsubscribe("S2", listener)
+
+def test_publish_drops_oldest_event_for_slow_listener(mock_mongo):
+    listener = progress_service_module.subscribe("S3")
+    try:
+        for i in range(progress_service_module.SUBSCRIBER_QUEUE_SIZE + 5):
+            progress_service_module.publish("S3", {"status": f"running test case {i + 1}"})
+
+        assert listener.qsize() == progress_service_module.SUBSCRIBER_QUEUE_SIZE
+        assert listener.get_nowait()["status"] == "running test case 6"
+    finally:
+        progress_service_module.unsubscribe("S3", listener)
+
+def test_stream_events_ends_after_final_event(mock_mongo):
+    mock_mongo.db.submissions_queue.find_one.return_value = {"status": "grading"}
+    stream = progress_service_module.stream_events("650c1f000000000000000000")
+
+    first = next(stream)
+    assert json.loads(first[len("data: "):])["status"] == "grading"
+
+    progress_service_module.finish("650c1f000000000000000000", "accepted")
+    final = next(stream)
+    assert json.loads(final[len("data: "):])["final"] is True
+
+    with pytest.raises(StopIteration):
+        next(stream)
+    assert "650c1f000000000000000000" not in progress_service_module._subscribers
+
+def test_stream_events_unknown_submission(mock_mongo):
+    mock_mongo.db.submissions_queue.find_one.return_value = None
+    mock_mongo.db.submissions.find_one.return_value = None
+
+    events = list(progress_service_module.stream_events("missing"))
+
+    assert len(events) == 1
+    assert events[0].startswith("event: error")
+
+def test_user_stream_closes_after_its_maximum_lifetime(mock_mongo):
+    with patch.object(progress_service_module, 'SSE_STREAM_MAX_S', 0.05), \
+         patch.object(progress_service_module, 'SSE_KEEPALIVE_S', 0.02):
+        events = list(progress_service_module.stream_user_events("dave"))
+
+    assert events[0] == ": connected\n\n"
+    assert set(events[1:]) == {": keep-alive\n\n"}
+    assert "user:dave" not in progress_service_module._subscribers
+
+def test_events_of_tracked_submissions_reach_user_listeners(mock_mongo):
+    listener = progress_service_module.subscribe_user("alice")
+    try:
+        progress_service_module.track("S4", "alice")
+        progress_service_module.report_progress("S4", "running test case 1")
+        progress_service_module.finish("S4", "accepted")
+
+        statuses = [listener.get_nowait()["status"] for _ in range(3)]
+        assert statuses == ["grading", "running test case 1", "accepted"]
+        assert "S4" not in progress_service_module._owners
+    finally:
+        progress_service_module.unsubscribe_user("alice", listener)
+
+def test_only_unthrottled_progress_is_relayed(mock_mongo):
+    with patch.object(progress_service_module, 'PROGRESS_BROKER', "mongo"), \
+         patch('progress_service_module.time.time', side_effect=[100.0, 100.5]):
+        progress_service_module.report_progress("S5", "running test case 1")
+        progress_service_module.report_progress("S5", "running test case 2")
+
+    relayed = mock_mongo.db.submission_events.insert_one.call_args.args[0]
+    assert mock_mongo.db.submission_events.insert_one.call_count == 1
+    assert relayed["status"] == "running test case 1"
+    assert relayed["origin"] == progress_service_module._origin
+
+def test_events_are_not_relayed_into_an_uncapped_collection(mock_mongo, capsys):
+    mock_mongo.db.submission_events.options.return_value = {}
+    with patch.object(progress_service_module, 'PROGRESS_BROKER', "mongo"):
+        progress_service_module.publish("S7", {"status": "grading"})
+        progress_service_module.publish("S7", {"status": "accepted", "final": True})
+
+    mock_mongo.db.submission_events.insert_one.assert_not_called()
+    # Checked once, not on every event
+    mock_mongo.db.create_collection.assert_called_once_with(
+        "submission_events", capped=True, size=progress_service_module.PROGRESS_EVENTS_MAX_BYTES
+    )
+    assert "not capped" in capsys.readouterr().out
+
+def test_tail_events_delivers_events_from_other_processes(mock_mongo):
+    event = {"_id": 1, "submission_id": "S6", "username": "bob", "status": "accepted", "final": True, "origin": "other", "relayed_at": 100.0}
+    class TailableCursor:
+        # Yields the duplicated event once, then dies like a cursor whose collection was dropped
+        def __init__(self, events):
+            self.events = events
+            self.alive = True
+        def __iter__(self):
+            self.alive = False
+            return iter(self.events)
+    mock_mongo.db.submission_events.find.return_value = TailableCursor([event, dict(event)])
+    listener = progress_service_module.subscribe("S6")
+    try:
+        with patch('progress_service_module.time.sleep', side_effect=StopIteration):
+            with pytest.raises(StopIteration):
+                progress_service_module._tail_events()
+
+        assert listener.get_nowait() == {"submission_id": "S6", "username": "bob", "status": "accepted", "final": True}
+        # The duplicate was skipped
+        assert listener.empty()
+        query = mock_mongo.db.submission_events.find.call_args.args[0]
+        assert query["origin"] == {"$ne": progress_service_module._origin}
+    finally:
+        progress_service_module.unsubscribe("S6", listener)
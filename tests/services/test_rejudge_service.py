@@ -0,0 +1,259 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the rejudge_service.py file
+rejudge_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'rejudge_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("rejudge_service_module", rejudge_service_path)
+rejudge_service_module = importlib.util.module_from_spec(spec)
+sys.modules["rejudge_service_module"] = rejudge_service_module
+spec.loader.exec_module(rejudge_service_module)
+
+SUBMISSIONS = [
+    {"submission_id": "S1", "problem_id": "C1A", "username": "alice", "language": "python", "status": "accepted", "timestamp": 1},
+    {"submission_id": "S2", "problem_id": "C1A", "username": "bob", "language": "python", "status": "accepted", "timestamp": 2},
+    {"submission_id": "S3", "problem_id": "C1A", "username": "carol", "language": "python", "status": "wrong_answer", "timestamp": 3},
+]
+CODES = {
+    "data/submissions/S1/code.py": "print(1)",
+    "data/submissions/S2/code.py": "print(1)",
+    "data/submissions/S3/code.py": "print(2)",
+}
+
+class _FakeJobs:
+    """
+    Stands in for mongo.db.rejudge_jobs, applying the updates a job makes to its document.
+    """
+    def __init__(self):
+        self.jobs = {}
+
+    def insert_one(self, job):
+        self.jobs[job["_id"]] = dict(job)
+
+    def _matches(self, job, query):
+        for field, condition in query.items():
+            if field == "_id":
+                continue
+            if isinstance(condition, dict) and "$ne" in condition:
+                if condition["$ne"] in job.get(field, []):
+                    return False
+            elif job.get(field) != condition:
+                return False
+        return True
+
+    def update_one(self, query, update):
+        job = self.jobs[query["_id"]]
+        if not self._matches(job, query):
+            return MagicMock(modified_count=0)
+        job.update(update.get("$set", {}))
+        for field, value in update.get("$inc", {}).items():
+            job[field] = job.get(field, 0) + value
+        for field, value in update.get("$push", {}).items():
+            job.setdefault(field, []).append(value)
+        for field, value in update.get("$addToSet", {}).items():
+            values = job.setdefault(field, [])
+            for item in (value["$each"] if isinstance(value, dict) else [value]):
+                if item not in values:
+                    values.append(item)
+        return MagicMock(modified_count=1)
+
+    def find_one_and_update(self, query, update, projection=None, return_document=None):
+        if not self.update_one(query, update).modified_count:
+            return None
+        return dict(self.jobs[query["_id"]])
+
+    def find_one(self, query, projection=None):
+        job = self.jobs.get(query["_id"])
+        hidden = {"_id", "finished_programs", "changed_users"} if projection and projection.get("_id") == 0 else set()
+        return None if job is None else {field: value for field, value in job.items() if field not in hidden}
+
+# Fixture to mock every external dependency of a rejudge job
+@pytest.fixture
+def mock_dependencies():
+    with patch('rejudge_service_module.mongo') as mock_mongo, \
+         patch('rejudge_service_module.get_file') as mock_get_file, \
+         patch('rejudge_service_module.archive_service.archive') as mock_archive, \
+         patch('rejudge_service_module.judge_service') as mock_judge_service, \
+         patch('rejudge_service_module.user_service') as mock_user_service, \
+         patch('rejudge_service_module.manifest_service') as mock_manifest_service:
+        mock_manifest_service.bump_version.return_value = ({"version": 2, "changed": True}, None)
+        mock_manifest_service.get_manifest.return_value = ({"version": 1}, None)
+        mock_user_service.rebuild_user_stats.return_value = ({}, None)
+        mock_get_file.side_effect = lambda path: (CODES[path], "sha", None)
+        mock_judge_service.load_problem_package.return_value = ({"testcases": [], "manifest_version": 2}, None)
+        mock_mongo.db.rejudge_jobs = _FakeJobs()
+        yield mock_mongo, mock_archive, mock_judge_service
+
+def _new_job(job_id):
+    rejudge_service_module.mongo.db.rejudge_jobs.insert_one({
+        "_id": job_id, "job_id": job_id, "status": "collecting", "distinct_programs": 0, "processed_programs": 0,
+        "processed_submissions": 0, "changed_verdicts": 0, "errors": [], "eta_s": None
+    })
+
+def test_rejudge_service_module_exists():
+    assert True
+
+def test_build_rejudge_query_requires_a_filter():
+    query, error = rejudge_service_module.build_rejudge_query({})
+    assert query is None
+    assert "At least one filter" in error["message"]
+
+def test_build_rejudge_query_for_contest():
+    query, error = rejudge_service_module.build_rejudge_query({"contest_id": "C1", "language": "python"})
+    assert error is None
+    assert query == {"language": "python", "problem_id": {"$regex": "^C1[A-Z]+$"}}
+
+def test_group_by_program_deduplicates_identical_code(mock_dependencies):
+    _new_job("J1")
+    problems = rejudge_service_module.group_by_program("J1", SUBMISSIONS)
+
+    programs = problems["C1A"]
+    assert len(programs) == 2
+    assert sorted(len(program["submissions"]) for program in programs.values()) == [1, 2]
+
+def _queued_programs(mock_mongo):
+    programs = mock_mongo.db.submissions_queue.insert_many.call_args.args[0]
+    for index, program in enumerate(programs):
+        program.update(_id=f"P{index}", worker_id="grader-1")
+    return programs
+
+def test_run_rejudge_queues_each_program_once(mock_dependencies):
+    mock_mongo, _, mock_judge_service = mock_dependencies
+    _new_job("J2")
+
+    rejudge_service_module._run_rejudge("J2", SUBMISSIONS, requested_by="admin")
+
+    programs = _queued_programs(mock_mongo)
+    assert len(programs) == 2
+    assert all(program["priority_class"] == "rejudge" and program["priority"] == 2 for program in programs)
+    assert all(program["status"] == "in_queue" and program["manifest_version"] == 1 for program in programs)
+    assert sorted(len(program["submissions"]) for program in programs) == [1, 2]
+    rejudge_service_module.manifest_service.get_manifest.assert_called_once_with("C1A", force_refresh=True)
+    rejudge_service_module.manifest_service.bump_version.assert_not_called()
+    # Graded by the graders, not by the API process
+    mock_judge_service.grade_batch.assert_not_called()
+
+    job, _ = rejudge_service_module.get_rejudge_job("J2")
+    assert job["status"] == "grading"
+    assert job["distinct_programs"] == 2
+
+def test_finalize_program_updates_every_submission_and_finishes_the_job(mock_dependencies):
+    mock_mongo, mock_archive, mock_judge_service = mock_dependencies
+    mock_judge_service.grade_batch.side_effect = lambda code, language, package: [
+        {"status": "passed" if code == "print(2)" else "wrong_answer"}
+    ]
+    _new_job("J3")
+    rejudge_service_module._run_rejudge("J3", SUBMISSIONS, requested_by="admin")
+
+    for program in _queued_programs(mock_mongo):
+        rejudge_service_module.finalize_program(program, rejudge_service_module.grade_program(program))
+
+    assert mock_judge_service.grade_batch.call_count == 2
+    operations = [call.args[0] for call in mock_mongo.db.submissions.bulk_write.call_args_list]
+    assert sum(len(program_operations) for program_operations in operations) == 3
+    assert mock_archive.call_count == 3
+    job, _ = rejudge_service_module.get_rejudge_job("J3")
+    assert job["status"] == "done"
+    assert job["processed_programs"] == 2
+    assert job["processed_submissions"] == 3
+    assert job["changed_verdicts"] == 3
+    rebuilt = {call.args[0] for call in rejudge_service_module.user_service.rebuild_user_stats.call_args_list}
+    assert rebuilt == {"alice", "bob", "carol"}
+
+def test_finalize_program_keeps_verdicts_when_grading_fails(mock_dependencies):
+    mock_mongo, mock_archive, mock_judge_service = mock_dependencies
+    mock_judge_service.grade_batch.return_value = {"overall_status": "error", "message": "Code execution server is not running."}
+    _new_job("J7")
+    rejudge_service_module._run_rejudge("J7", SUBMISSIONS, requested_by="admin")
+
+    for program in _queued_programs(mock_mongo):
+        rejudge_service_module.finalize_program(program, rejudge_service_module.grade_program(program))
+
+    mock_mongo.db.submissions.bulk_write.assert_not_called()
+    mock_archive.assert_not_called()
+    job, _ = rejudge_service_module.get_rejudge_job("J7")
+    assert job["status"] == "done"
+    assert len(job["errors"]) == 2
+    rejudge_service_module.user_service.rebuild_user_stats.assert_not_called()
+
+def test_finalize_program_counts_a_program_once(mock_dependencies):
+    mock_mongo, _, mock_judge_service = mock_dependencies
+    mock_judge_service.grade_batch.return_value = [{"status": "passed"}]
+    _new_job("J8")
+    rejudge_service_module._run_rejudge("J8", SUBMISSIONS, requested_by="admin")
+    program = _queued_programs(mock_mongo)[0]
+
+    # Finalized again after its lease expired while it was being finalized
+    rejudge_service_module.finalize_program(program, [{"status": "passed"}])
+    rejudge_service_module.finalize_program(program, [{"status": "passed"}])
+
+    job, _ = rejudge_service_module.get_rejudge_job("J8")
+    assert job["processed_programs"] == 1
+    assert job["status"] == "grading"
+
+def test_grade_program_reloads_a_package_older_than_the_job(mock_dependencies):
+    _, _, mock_judge_service = mock_dependencies
+    stale, fresh = {"testcases": [], "manifest_version": 1}, {"testcases": [], "manifest_version": 2}
+    mock_judge_service.load_problem_package.side_effect = [(stale, None), (fresh, None)]
+    mock_judge_service.grade_batch.return_value = [{"status": "passed"}]
+    program = {"problem_id": "C1A", "code": "print(1)", "language": "python", "manifest_version": 2}
+
+    assert rejudge_service_module.grade_program(program) == [{"status": "passed"}]
+
+    mock_judge_service.load_problem_package.assert_called_with("C1A", force_refresh=True)
+    mock_judge_service.grade_batch.assert_called_once_with("print(1)", "python", fresh)
+
+def test_group_by_program_prefers_code_stored_in_mongo(mock_dependencies):
+    _new_job("J4")
+    stored = [{**SUBMISSIONS[0], "code": "print(3)"}]
+
+    with patch('rejudge_service_module.get_file') as mock_get_file:
+        problems = rejudge_service_module.group_by_program("J4", stored)
+
+    mock_get_file.assert_not_called()
+    assert [program["code"] for program in problems["C1A"].values()] == ["print(3)"]
+
+def test_run_rejudge_bumps_tests_before_grading(mock_dependencies):
+    mock_mongo, _, _ = mock_dependencies
+    _new_job("J5")
+
+    rejudge_service_module._run_rejudge("J5", SUBMISSIONS, bump=True, requested_by="admin")
+
+    rejudge_service_module.manifest_service.bump_version.assert_called_once_with("C1A", "admin")
+    assert [program["manifest_version"] for program in _queued_programs(mock_mongo)] == [2, 2]
+
+def test_run_rejudge_skips_problems_whose_bump_fails(mock_dependencies):
+    mock_mongo, mock_archive, mock_judge_service = mock_dependencies
+    rejudge_service_module.manifest_service.bump_version.return_value = (None, {"message": "Problem C1A not found"})
+    _new_job("J6")
+
+    rejudge_service_module._run_rejudge("J6", SUBMISSIONS, bump=True, requested_by="admin")
+
+    mock_mongo.db.submissions_queue.insert_many.assert_not_called()
+    job, _ = rejudge_service_module.get_rejudge_job("J6")
+    assert job["processed_programs"] == 2
+    assert job["status"] == "done"
+    assert "failed to bump its tests" in job["errors"][0]
+
+def test_start_rejudge_rejects_invalid_bump(mock_dependencies):
+    job, error = rejudge_service_module.start_rejudge({"problem_id": "C1A", "bump": "yes"}, "admin")
+    assert job is None
+    assert error == {"message": "bump must be a boolean"}
+
+def test_rejudge_job_is_read_from_mongo(mock_dependencies):
+    mock_mongo, _, _ = mock_dependencies
+    mock_mongo.db.submissions.find.return_value = SUBMISSIONS
+
+    with patch('rejudge_service_module.threading.Thread'):
+        job, error = rejudge_service_module.start_rejudge({"problem_id": "C1A"}, "admin")
+
+    assert error is None
+    assert job["status"] == "collecting"
+    assert job["total_submissions"] == 3
+    # Another API process sees the same job
+    assert rejudge_service_module.get_rejudge_job(job["job_id"]) == (job, None)
+    assert rejudge_service_module.get_rejudge_job("unknown")[1]["message"] == "Rejudge job not found"
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import MagicMock, patch, call
 import json
 import time
+import threading
 import sys
 import os
 import importlib.util
@@ -109,3 +110,488 @@ def test_handle_new_submission_get_global_meta_error(mock_grade_submission, mock
     assert "Failed to get global submissions metadata" in result["error"]
 
 # Add more tests for other error scenarios (e.g., json decode error, github file operation errors)
+
+# Tests for queue dispatch
+@pytest.fixture
+def mock_queue():
+    with patch('submission_service_module.mongo') as mock_mongo, \
+         patch('submission_service_module.progress_service'), \
+         patch('submission_service_module.intake_service') as mock_intake, \
+         patch.object(submission_service_module, '_slots', {"limit": 3, "in_use": 0, "saturated": False}), \
+         patch.object(submission_service_module, '_held_leases', set()), \
+         patch.object(submission_service_module, '_stopping', threading.Event()):
+        mock_intake.claim_fingerprint.return_value = None
+        mock_intake.check_rate_limits.return_value = None
+        submission_service_module._queue_event.clear()
+        yield mock_mongo
+
+def test_handle_new_submission_returns_duplicate(mock_queue):
+    mock_queue.db.contests.find_one.return_value = None
+    with patch('submission_service_module.intake_service') as mock_intake:
+        mock_intake.claim_fingerprint.return_value = "S0"
+        result = submission_service_module.handle_new_submission("P1", "u", "python", "print(1)")
+
+    assert result["submission_id"] == "S0"
+    assert result["status"] == "duplicate"
+    mock_intake.check_rate_limits.assert_not_called()
+    mock_queue.db.submissions_queue.insert_one.assert_not_called()
+
+def test_handle_new_submission_rate_limited(mock_queue):
+    mock_queue.db.contests.find_one.return_value = None
+    with patch('submission_service_module.intake_service') as mock_intake:
+        mock_intake.claim_fingerprint.return_value = None
+        mock_intake.check_rate_limits.return_value = 2.5
+        result = submission_service_module.handle_new_submission("P1", "u", "python", "print(1)")
+
+    assert result["retry_after_s"] == 2.5
+    mock_intake.release_fingerprint.assert_called_once()
+    mock_queue.db.submissions_queue.insert_one.assert_not_called()
+
+def _queued(count):
+    return [{"_id": f"S{i}", "status": "grading"} for i in range(count)] + [None]
+
+def test_drain_queue_claims_until_empty(mock_queue):
+    dispatch = MagicMock()
+
+    with patch('submission_service_module._claim_next', side_effect=_queued(2)):
+        claimed = submission_service_module.drain_queue(dispatch)
+
+    assert claimed == 2
+    assert [c.args[0]["_id"] for c in dispatch.call_args_list] == ["S0", "S1"]
+
+def test_drain_queue_stops_when_all_slots_are_busy(mock_queue):
+    from concurrent.futures import Future
+    futures = []
+    def dispatch(submission):
+        futures.append(Future())
+        return futures[-1]
+
+    with patch('submission_service_module._claim_next', side_effect=_queued(5)):
+        assert submission_service_module.drain_queue(dispatch) == 3
+
+        # Finishing a submission frees its slot and wakes the worker
+        futures[0].set_result(None)
+        assert submission_service_module._queue_event.is_set()
+        assert submission_service_module.drain_queue(dispatch) == 1
+
+def test_drain_queue_releases_slot_when_dispatch_fails(mock_queue):
+    dispatch = MagicMock(side_effect=RuntimeError("engine stopped"))
+
+    with patch('submission_service_module._claim_next', side_effect=_queued(1) + _queued(0)):
+        assert submission_service_module.drain_queue(dispatch) == 1
+        # All three slots are free again
+        assert submission_service_module.drain_queue(MagicMock()) == 0
+    assert submission_service_module.get_slot_stats()["in_use"] == 0
+
+def test_handle_new_submission_wakes_the_worker(mock_queue):
+    mock_queue.db.submissions_queue.insert_one.return_value = MagicMock(inserted_id="S1")
+    mock_queue.db.contests.find_one.return_value = None
+
+    submission_service_module.handle_new_submission("C1A", "user", "python", "print(1)")
+
+    assert submission_service_module._queue_event.is_set()
+
+# Tests for the grader process
+def test_init_app_does_not_grade_in_web_process():
+    with patch('submission_service_module.start_grading') as mock_start:
+        submission_service_module.init_app(MagicMock())
+    mock_start.assert_not_called()
+
+def test_drain_queue_claims_nothing_while_stopping(mock_queue):
+    submission_service_module._stopping.set()
+    with patch('submission_service_module._claim_next') as mock_claim:
+        assert submission_service_module.drain_queue(MagicMock()) == 0
+    mock_claim.assert_not_called()
+
+def test_stop_grading_hands_back_unfinished_submissions(mock_queue):
+    submission_service_module._held_leases.update({"S1", "S2"})
+    submission_service_module._slots["in_use"] = 2
+    mock_queue.db.submissions_queue.update_many.return_value = MagicMock(modified_count=2)
+
+    with patch('submission_service_module.archive_service.flush') as mock_flush:
+        assert submission_service_module.stop_grading(timeout_s=0) == 2
+
+    query, update = mock_queue.db.submissions_queue.update_many.call_args.args
+    assert set(query["_id"]["$in"]) == {"S1", "S2"}
+    assert query["worker_id"] == submission_service_module.WORKER_ID
+    # A submission already being finalized is left to finalize_submission
+    assert query["status"] == {"$ne": "finalizing"}
+    assert update["$set"] == {"status": "in_queue"}
+    assert update["$inc"] == {"attempts": -1}
+    assert submission_service_module._stopping.is_set()
+    mock_flush.assert_called_once()
+
+# Tests for leases
+def test_claim_takes_a_lease_for_this_worker(mock_queue):
+    mock_queue.db.submissions_queue.aggregate.side_effect = [
+        [{"_id": {"priority": 1, "contest_id": "C1", "username": "a"}, "submission_id": "S0", "created_at": 1.0}],
+        []
+    ]
+    mock_queue.db.submissions_queue.find_one_and_update.return_value = {"_id": "S0", "created_at": 1.0, "claimed_at": 3.0}
+
+    assert submission_service_module._claim_next()["_id"] == "S0"
+
+    query, update = mock_queue.db.submissions_queue.find_one_and_update.call_args.args
+    assert query == {"_id": "S0", "status": "in_queue"}
+    assert update["$set"]["status"] == "grading"
+    assert update["$set"]["worker_id"] == submission_service_module.WORKER_ID
+    assert update["$set"]["lease_expires_at"] > time.time()
+    assert update["$inc"] == {"attempts": 1}
+    # Checkpoints stay in MongoDB until judge_service loads them
+    assert mock_queue.db.submissions_queue.find_one_and_update.call_args.kwargs["projection"] == {"checkpoints": 0}
+
+def test_heartbeat_extends_only_held_leases(mock_queue):
+    from concurrent.futures import Future
+    futures = []
+    def dispatch(submission):
+        futures.append(Future())
+        return futures[-1]
+    with patch('submission_service_module._claim_next', side_effect=_queued(2)):
+        submission_service_module.drain_queue(dispatch)
+    futures[0].set_result(None)
+
+    submission_service_module.heartbeat()
+
+    query, update = mock_queue.db.submissions_queue.update_many.call_args.args
+    assert query == {"_id": {"$in": ["S1"]}, "worker_id": submission_service_module.WORKER_ID}
+    assert update["$set"]["lease_expires_at"] > time.time()
+    futures[1].set_result(None)
+
+def test_reaper_requeues_expired_leases(mock_queue):
+    mock_queue.db.submissions_queue.find.return_value = [{"_id": "S1", "attempts": 1}]
+    mock_queue.db.submissions_queue.update_one.return_value = MagicMock(modified_count=1)
+
+    assert submission_service_module.reap_expired_leases() == (1, 0)
+
+    query, update = mock_queue.db.submissions_queue.update_one.call_args.args
+    assert query["_id"] == "S1"
+    assert update["$set"] == {"status": "in_queue"}
+    assert "worker_id" in update["$unset"]
+    assert submission_service_module._queue_event.is_set()
+
+def test_reaper_fails_submissions_out_of_attempts(mock_queue):
+    mock_queue.db.submissions_queue.find.return_value = [{"_id": "S1", "attempts": 3}]
+    claimed = {"_id": "S1", "attempts": 3, "worker_id": submission_service_module.WORKER_ID}
+    mock_queue.db.submissions_queue.find_one_and_update.return_value = claimed
+
+    with patch('submission_service_module.finalize_submission') as mock_finalize:
+        assert submission_service_module.reap_expired_leases() == (0, 1)
+
+    submission, grading_results = mock_finalize.call_args.args
+    assert submission is claimed
+    assert grading_results["overall_status"] == "error"
+
+class _FakeQueueCollection:
+    """
+    Just enough of a submissions_queue collection to run progress writes and the lease reaper
+    against the same document.
+    """
+    def __init__(self, docs):
+        self.docs = docs
+
+    def _matches(self, doc, query):
+        for field, condition in query.items():
+            if field == "$or":
+                if not any(self._matches(doc, clause) for clause in condition):
+                    return False
+            elif isinstance(condition, dict):
+                value = doc.get(field)
+                if "$in" in condition and value not in condition["$in"]:
+                    return False
+                if "$lt" in condition and (value is None or not value < condition["$lt"]):
+                    return False
+                if "$exists" in condition and (field in doc) != condition["$exists"]:
+                    return False
+            elif doc.get(field) != condition:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        return [dict(doc) for doc in self.docs if self._matches(doc, query)]
+
+    def update_one(self, query, update):
+        for doc in self.docs:
+            if self._matches(doc, query):
+                doc.update(update.get("$set", {}))
+                for field in update.get("$unset", {}):
+                    doc.pop(field, None)
+                return MagicMock(matched_count=1, modified_count=1)
+        return MagicMock(matched_count=0, modified_count=0)
+
+def test_progress_writes_do_not_hide_expired_leases_from_the_reaper(mock_queue):
+    doc = {"_id": "S1", "status": "grading", "worker_id": submission_service_module.WORKER_ID,
+           "lease_expires_at": time.time() - 1, "attempts": 1}
+    queue = _FakeQueueCollection([doc])
+    mock_queue.db.submissions_queue = queue
+    progress_service = sys.modules["services.progress_service"]
+
+    with patch.object(progress_service, 'mongo') as progress_mongo:
+        progress_mongo.db.submissions_queue = queue
+        assert progress_service.report_progress("S1", "running test case 3", force=True) is True
+
+    assert doc["status"] == "grading"
+    assert doc["progress"] == "running test case 3"
+    assert submission_service_module.reap_expired_leases() == (1, 0)
+    assert doc["status"] == "in_queue"
+    assert "progress" not in doc and "worker_id" not in doc
+
+def test_progress_writes_need_the_lease(mock_queue):
+    doc = {"_id": "S1", "status": "grading", "worker_id": "another-grader"}
+    progress_service = sys.modules["services.progress_service"]
+
+    with patch.object(progress_service, 'mongo') as progress_mongo:
+        progress_mongo.db.submissions_queue = _FakeQueueCollection([doc])
+        progress_service.report_progress("S1", "running test case 3", force=True)
+
+    assert "progress" not in doc
+
+def test_finalize_discards_results_when_lease_was_lost(mock_queue):
+    mock_queue.db.submissions_queue.update_one.return_value = MagicMock(matched_count=0)
+    submission = {"_id": "S1", "worker_id": "other", "problem_id": "C1A", "username": "u",
+                  "language": "python", "code": "", "created_at": 0}
+
+    with patch('submission_service_module.archive_service.archive') as mock_archive:
+        submission_service_module.finalize_submission(submission, {"test_results": []})
+
+    mock_archive.assert_not_called()
+    mock_queue.db.submissions.insert_one.assert_not_called()
+    mock_queue.db.submissions_queue.delete_one.assert_not_called()
+
+def test_finalize_updates_user_stats(mock_queue):
+    mock_queue.db.submissions_queue.update_one.return_value = MagicMock(matched_count=1)
+    submission = {"_id": "S1", "worker_id": "w", "problem_id": "C1A", "username": "u",
+                  "language": "python", "code": "", "created_at": 0}
+
+    with patch('submission_service_module.archive_service.archive'), \
+         patch('submission_service_module.submission_store.save_submission'), \
+         patch('submission_service_module.user_service.record_graded_submission', return_value=(True, None)) as mock_record, \
+         patch('submission_service_module.metrics_service.record_grading') as mock_metrics:
+        submission_service_module.finalize_submission(submission, {"test_results": [{"status": "passed"}]})
+
+    record = mock_record.call_args.args[0]
+    assert record["username"] == "u"
+    assert record["status"] == "accepted"
+    assert record["timestamp"] == 0
+    mock_metrics.assert_called_once_with(record)
+
+def test_finalize_hands_rejudge_programs_to_their_job(mock_queue):
+    mock_queue.db.submissions_queue.update_one.return_value = MagicMock(matched_count=1)
+    program = {"_id": "P1", "kind": "rejudge", "rejudge_job_id": "J1", "worker_id": "w", "problem_id": "C1A",
+               "username": "admin", "language": "python", "code": "", "submissions": [], "created_at": 0}
+
+    with patch('submission_service_module.rejudge_service.finalize_program') as mock_finalize_program, \
+         patch('submission_service_module.submission_store.save_submission') as mock_save:
+        submission_service_module.finalize_submission(program, [{"status": "passed"}])
+
+    mock_finalize_program.assert_called_once_with(program, [{"status": "passed"}])
+    mock_save.assert_not_called()
+    mock_queue.db.submissions_queue.delete_one.assert_called_once_with({"_id": "P1"})
+
+# Tests for scheduling
+def _head(submission_id, created_at, username, contest_id="C1", priority=1):
+    return {"_id": {"priority": priority, "contest_id": contest_id, "username": username},
+            "submission_id": submission_id, "created_at": created_at}
+
+def test_pick_next_prefers_contest_over_practice_and_rejudge():
+    from collections import Counter
+    heads = [_head("rejudge", 1, "a", priority=2), _head("practice", 2, "b", priority=1), _head("contest", 3, "c", priority=0)]
+
+    assert submission_service_module._pick_next(heads, Counter(), Counter())["submission_id"] == "contest"
+
+def test_pick_next_takes_turns_across_users():
+    from collections import Counter
+    # "spammer" submitted first, but already has a submission being graded
+    heads = [_head("spam", 1, "spammer"), _head("other", 5, "other")]
+
+    assert submission_service_module._pick_next(heads, Counter({"C1": 1}), Counter({"spammer": 1}))["submission_id"] == "other"
+    assert submission_service_module._pick_next(heads, Counter(), Counter())["submission_id"] == "spam"
+
+def test_pick_next_shares_graders_across_contests():
+    from collections import Counter
+    heads = [_head("busy", 1, "a", contest_id="C1"), _head("idle", 2, "b", contest_id="C2")]
+
+    assert submission_service_module._pick_next(heads, Counter({"C1": 4}), Counter({"x": 4}))["submission_id"] == "idle"
+
+def test_in_flight_counts_cover_every_leased_submission(mock_queue):
+    mock_queue.db.submissions_queue.aggregate.return_value = [
+        {"_id": {"contest_id": "C1", "username": "a"}, "count": 2},
+        {"_id": {"contest_id": None, "username": "a"}, "count": 1},
+    ]
+
+    by_contest, by_user = submission_service_module._in_flight_counts()
+
+    pipeline = mock_queue.db.submissions_queue.aggregate.call_args.args[0]
+    assert pipeline[0] == {"$match": {"worker_id": {"$exists": True}}}
+    assert by_contest["C1"] == 2
+    assert by_user["a"] == 3
+
+def test_claim_next_skips_heads_claimed_by_another_grader(mock_queue):
+    mock_queue.db.submissions_queue.aggregate.side_effect = [[_head("S0", 1, "a"), _head("S1", 2, "b")], []]
+    mock_queue.db.submissions_queue.find_one_and_update.side_effect = [None, {"_id": "S1", "created_at": 2, "claimed_at": 2.5}]
+
+    assert submission_service_module._claim_next()["_id"] == "S1"
+
+def test_handle_new_submission_classifies_running_contests(mock_queue):
+    mock_queue.db.submissions_queue.insert_one.return_value = MagicMock(inserted_id="S1")
+    mock_queue.db.contests.find_one.return_value = {"startTime": "2000-01-01T00:00:00.000Z", "endTime": "2999-01-01T00:00:00.000Z"}
+
+    submission_service_module.handle_new_submission("C7B", "user", "python", "print(1)")
+
+    queued = mock_queue.db.submissions_queue.insert_one.call_args.args[0]
+    assert queued["contest_id"] == "C7"
+    assert queued["priority_class"] == "contest"
+    assert queued["priority"] == 0
+
+    mock_queue.db.contests.find_one.return_value = {"startTime": "2000-01-01T00:00:00.000Z", "endTime": "2000-01-02T00:00:00.000Z"}
+    submission_service_module.handle_new_submission("C7B", "user", "python", "print(1)")
+    assert mock_queue.db.submissions_queue.insert_one.call_args.args[0]["priority_class"] == "practice"
+
+def test_get_queue_stats_reports_wait_percentiles(mock_queue):
+    mock_queue.db.submissions_queue.aggregate.return_value = [{"_id": "contest", "count": 2}]
+    # Graded submissions carry their queue wait; those still being graded have their claim time
+    mock_queue.db.submissions.find.return_value = [{"priority_class": "contest", "queue_wait_s": float(i)} for i in range(1, 100)]
+    now = time.time()
+    mock_queue.db.submissions_queue.find.return_value = [{"priority_class": "contest", "created_at": now - 200, "claimed_at": now - 100}]
+
+    stats = submission_service_module.get_queue_stats()
+
+    assert stats["contest"]["queued"] == 2
+    assert stats["contest"]["claimed"] == 100
+    assert stats["contest"]["wait_s"] == {"p50": 50.0, "p90": 90.0, "p99": 99.0}
+    assert stats["practice"] == {"queued": 0, "claimed": 0, "wait_s": None}
+
+def test_grader_stats_are_shared_through_mongo(mock_queue):
+    pool_stats = {"executor.local:5000": {"requests": 3, "in_flight": 1}}
+    with patch('submission_service_module.http_client.get_pool_stats', return_value=pool_stats):
+        submission_service_module.publish_grader_stats()
+
+    query, record = mock_queue.db.grader_stats.replace_one.call_args.args
+    assert query == {"_id": submission_service_module.WORKER_ID}
+    assert record["slots"]["limit"] == 3
+    assert record["http_pool"] == [{"host": "executor.local:5000", "requests": 3, "in_flight": 1}]
+
+    # The API process reads what the graders recorded
+    mock_queue.db.grader_stats.find.return_value = [{"_id": "grader-1", **record}]
+    assert submission_service_module.get_grader_stats("http_pool") == {"grader-1": pool_stats}
+    assert submission_service_module.get_grader_stats("slots")["grader-1"]["limit"] == 3
+
+# Tests for adaptive grading slots
+@pytest.fixture
+def executor_stats(mock_queue):
+    stats = {"executor:5000": {"requests": 0, "throttled": 0, "total_latency_s": 0.0}}
+    with patch.dict(os.environ, {"EXECUTE_API_SERVER_URL": "http://executor:5000/api/execute"}), \
+         patch.object(submission_service_module, '_executor_totals', {"requests": 0, "throttled": 0, "total_latency_s": 0.0}), \
+         patch('submission_service_module.http_client.get_pool_stats', return_value=stats):
+        yield stats["executor:5000"]
+
+def test_adjust_slots_grows_while_saturated_and_healthy(executor_stats):
+    with patch.object(submission_service_module, 'GRADING_MAX_IN_FLIGHT', 4), \
+         patch('submission_service_module._claim_next', side_effect=_queued(5)):
+        submission_service_module.drain_queue(MagicMock())
+    executor_stats.update(requests=10, total_latency_s=5.0)
+
+    assert submission_service_module.adjust_slots() == 4
+    # Not saturated since the last adjustment: the limit holds
+    executor_stats.update(requests=20, total_latency_s=10.0)
+    assert submission_service_module.adjust_slots() == 4
+
+def test_adjust_slots_halves_on_throttling(executor_stats):
+    executor_stats.update(requests=10, throttled=2, total_latency_s=1.0)
+
+    assert submission_service_module.adjust_slots() == 1
+
+def test_adjust_slots_halves_on_slow_executor(executor_stats):
+    with patch.object(submission_service_module, 'GRADING_TARGET_EXECUTOR_LATENCY_S', 1.0):
+        executor_stats.update(requests=2, total_latency_s=6.0)
+        assert submission_service_module.adjust_slots() == 1
+        executor_stats.update(requests=4, total_latency_s=12.0)
+        # Never below the minimum
+        assert submission_service_module.adjust_slots() == submission_service_module.GRADING_MIN_IN_FLIGHT
+
+def test_drain_queue_honors_a_lowered_slot_limit(mock_queue):
+    submission_service_module._slots["limit"] = 1
+
+    with patch('submission_service_module._claim_next', side_effect=_queued(3)):
+        assert submission_service_module.drain_queue(MagicMock()) == 1
+    assert submission_service_module.get_slot_stats()["in_use"] == 1
+
+# Tests for queue views
+def _queue_page(mock_queue, documents):
+    mock_queue.db.submissions_queue.find.return_value.sort.return_value.limit.return_value = documents
+
+def test_get_submissions_queue_pages_without_code(mock_queue):
+    from bson.objectid import ObjectId
+    ids = [ObjectId() for _ in range(3)]
+    _queue_page(mock_queue, [{"_id": ids[i], "created_at": float(i), "status": "in_queue"} for i in range(3)])
+
+    page, error = submission_service_module.get_submissions_queue(username="alice", limit=2)
+
+    assert error is None
+    assert [submission["submission_id"] for submission in page["submissions"]] == [str(ids[0]), str(ids[1])]
+    assert page["next_cursor"] == f"1.0:{ids[1]}"
+    query, projection = mock_queue.db.submissions_queue.find.call_args.args
+    assert query == {"username": "alice"}
+    assert projection["code"] == 0
+    mock_queue.db.submissions_queue.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+def test_get_submissions_queue_resumes_after_cursor(mock_queue):
+    from bson.objectid import ObjectId
+    last_id = ObjectId()
+    _queue_page(mock_queue, [])
+
+    page, error = submission_service_module.get_submissions_queue(cursor=f"1.5:{last_id}")
+
+    assert page == {"submissions": [], "next_cursor": None}
+    query = mock_queue.db.submissions_queue.find.call_args.args[0]
+    assert query["$or"] == [{"created_at": {"$gt": 1.5}}, {"created_at": 1.5, "_id": {"$gt": last_id}}]
+
+def test_get_submissions_queue_rejects_invalid_cursor(mock_queue):
+    page, error = submission_service_module.get_submissions_queue(cursor="not-a-cursor")
+
+    assert page is None
+    assert error["message"] == "Invalid cursor"
+
+def test_get_queue_summary_is_computed_once_per_ttl(mock_queue):
+    mock_queue.db.submissions_queue.count_documents.side_effect = [30, 4]
+    mock_queue.db.submissions_queue.find_one.return_value = {"created_at": time.time() - 12}
+    mock_queue.db.submissions.count_documents.return_value = 600
+
+    with patch.object(submission_service_module, '_summary_cache', {"summary": None, "computed_at": 0}), \
+         patch.object(submission_service_module, 'QUEUE_RATE_WINDOW_S', 300):
+        summary = submission_service_module.get_queue_summary()
+        assert submission_service_module.get_queue_summary() is summary
+
+    assert summary["depth"] == 30
+    assert summary["grading"] == 4
+    assert summary["graded_per_minute"] == 120.0
+    assert summary["eta_s"] == 15.0
+    assert mock_queue.db.submissions_queue.count_documents.call_count == 2
+
+def test_get_submission_status_reports_queue_position(mock_queue):
+    from bson.objectid import ObjectId
+    submission_id = str(ObjectId())
+    mock_queue.db.submissions_queue.find_one.return_value = {"status": "in_queue", "priority": 1, "created_at": 10.0}
+    mock_queue.db.submissions_queue.count_documents.return_value = 4
+    mock_queue.db.submissions.count_documents.return_value = 0
+
+    status, error = submission_service_module.get_submission_status(submission_id)
+
+    assert error is None
+    assert status == {"submission_id": submission_id, "status": "in_queue", "position": 5, "eta_s": None}
+    # Ahead of it: queued contest submissions, and older practice ones; rejudges wait behind it
+    query = mock_queue.db.submissions_queue.count_documents.call_args.args[0]
+    assert query == {"status": "in_queue", "$or": [
+        {"priority": {"$lt": 1}},
+        {"priority": 1, "created_at": {"$lt": 10.0}}
+    ]}
+
+def test_get_submission_status_falls_back_to_the_verdict(mock_queue):
+    from bson.objectid import ObjectId
+    submission_id = str(ObjectId())
+    mock_queue.db.submissions_queue.find_one.return_value = None
+    mock_queue.db.submissions.find_one.return_value = {"submission_id": submission_id, "status": "accepted"}
+
+    status, error = submission_service_module.get_submission_status(submission_id)
+
+    assert status["status"] == "accepted"
+    assert submission_service_module.get_submission_status("bad-id")[1]["message"] == "Invalid submission ID"
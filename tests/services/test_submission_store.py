@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import patch
+import json
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the submission_store.py file
+submission_store_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'submission_store.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("submission_store_module", submission_store_path)
+submission_store_module = importlib.util.module_from_spec(spec)
+sys.modules["submission_store_module"] = submission_store_module
+spec.loader.exec_module(submission_store_module)
+
+@pytest.fixture
+def mock_store():
+    with patch('submission_store_module.mongo') as mock_mongo, \
+         patch('submission_store_module.gridfs.GridFS') as mock_gridfs, \
+         patch.object(submission_store_module, 'SUBMISSION_INLINE_MAX_BYTES', 100):
+        yield mock_mongo, mock_gridfs.return_value
+
+RECORD = {
+    "submission_id": "S1",
+    "problem_id": "C1A",
+    "username": "testuser",
+    "language": "python",
+    "status": "accepted",
+    "timestamp": 1678886400
+}
+
+def test_submission_store_module_exists():
+    assert True
+
+def test_save_submission_keeps_small_records_inline(mock_store):
+    mock_mongo, mock_fs = mock_store
+
+    submission_store_module.save_submission({**RECORD, "code": "print(1)", "test_results": [{"status": "passed"}]})
+
+    query, update = mock_mongo.db.submissions.update_one.call_args.args
+    assert query == {"submission_id": "S1"}
+    assert mock_mongo.db.submissions.update_one.call_args.kwargs["upsert"] is True
+    assert update["$set"]["code"] == "print(1)"
+    assert update["$set"]["test_results"] == [{"status": "passed"}]
+    assert update["$unset"] == {"test_results_file_id": "", "code_file_id": ""}
+    mock_fs.put.assert_not_called()
+
+def test_save_submission_moves_large_code_to_gridfs(mock_store):
+    mock_mongo, mock_fs = mock_store
+    mock_fs.put.return_value = "F1"
+    code = "x = 1\n" * 100
+
+    submission_store_module.save_submission({**RECORD, "code": code, "test_results": []})
+
+    assert mock_fs.put.call_args.args[0] == code.encode("utf-8")
+    update = mock_mongo.db.submissions.update_one.call_args.args[1]
+    assert update["$set"]["code_file_id"] == "F1"
+    assert "code" not in update["$set"]
+    assert "code" in update["$unset"]
+
+def test_get_submission_reads_gridfs_results(mock_store):
+    mock_mongo, mock_fs = mock_store
+    results = [{"status": "passed", "output": "y" * 200}]
+    mock_mongo.db.submissions.find_one.return_value = {**RECORD, "code": "print(1)", "test_results_file_id": "F2"}
+    mock_fs.get.return_value.read.return_value = json.dumps(results).encode("utf-8")
+
+    submission = submission_store_module.get_submission("S1")
+
+    mock_fs.get.assert_called_once_with("F2")
+    assert submission["test_results"] == results
+    assert submission["code"] == "print(1)"
+    assert "test_results_file_id" not in submission
+
+def test_get_submission_returns_none_when_missing(mock_store):
+    mock_mongo, _ = mock_store
+    mock_mongo.db.submissions.find_one.return_value = None
+
+    assert submission_store_module.get_submission("S404") is None
+
+def test_encode_test_results_replaces_the_other_representation(mock_store):
+    _, mock_fs = mock_store
+    mock_fs.put.return_value = "F3"
+
+    assert submission_store_module.encode_test_results("S1", []) == ({"test_results": []}, {"test_results_file_id": ""})
+    fields, unset = submission_store_module.encode_test_results("S1", [{"output": "z" * 200}])
+    assert fields == {"test_results_file_id": "F3"}
+    assert unset == {"test_results": ""}
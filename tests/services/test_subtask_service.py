@@ -0,0 +1,67 @@
+import pytest
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the subtask_service.py file
+subtask_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'subtask_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("subtask_service_module", subtask_service_path)
+subtask_service_module = importlib.util.module_from_spec(spec)
+sys.modules["subtask_service_module"] = subtask_service_module
+spec.loader.exec_module(subtask_service_module)
+
+TESTCASES = [
+    {"stdin": "1", "path": "data/contests/C1/problems/A/testcases/small_1.in"},
+    {"stdin": "2", "path": "data/contests/C1/problems/A/testcases/small_2.in"},
+    {"stdin": "3", "path": "data/contests/C1/problems/A/testcases/large_1.in"},
+]
+
+def test_subtask_service_module_exists():
+    assert True
+
+def test_parse_subtasks_without_subtasks():
+    assert subtask_service_module.parse_subtasks({"timeLimit": 1000}, TESTCASES) == (None, None)
+
+def test_parse_subtasks_matches_test_patterns():
+    meta = {"subtasks": [
+        {"name": "small", "tests": ["small_*.in"], "points": 30},
+        {"name": "large", "tests": "large_*.in", "points": 70, "dependsOn": ["small"]},
+    ]}
+
+    subtasks, error = subtask_service_module.parse_subtasks(meta, TESTCASES)
+
+    assert error is None
+    assert [len(subtask["testcases"]) for subtask in subtasks] == [2, 1]
+    assert subtasks[1]["depends_on"] == ["small"]
+
+@pytest.mark.parametrize("subtasks, message", [
+    ([{"name": "a", "tests": ["none_*.in"], "points": 10}], "matches no test cases"),
+    ([{"name": "a", "tests": ["*.in"], "points": 10, "dependsOn": ["b"]}, {"name": "b", "tests": ["*.in"]}], "depends on unknown or later subtasks"),
+    ([{"name": "a", "tests": ["*.in"]}, {"name": "a", "tests": ["*.in"]}], "Duplicate subtask name"),
+    ([{"name": "a", "tests": ["*.in"], "points": "ten"}], "invalid points"),
+    ([{"name": "a", "tests": ["small_*.in"], "points": 10}], "Test cases in no subtask: large_1.in"),
+])
+def test_parse_subtasks_rejects_invalid_declarations(subtasks, message):
+    parsed, error = subtask_service_module.parse_subtasks({"subtasks": subtasks}, TESTCASES)
+
+    assert parsed is None
+    assert message in error["message"]
+
+def test_score_subtasks():
+    subtasks, _ = subtask_service_module.parse_subtasks({"subtasks": [
+        {"name": "small", "tests": ["small_*.in"], "points": 30},
+        {"name": "large", "tests": ["large_*.in"], "points": 70, "dependsOn": ["small"]},
+    ]}, TESTCASES)
+    results_by_path = {
+        TESTCASES[0]["path"]: {"status": "passed"},
+        TESTCASES[1]["path"]: {"status": "passed"},
+        TESTCASES[2]["path"]: {"status": "time_limit_exceeded"},
+    }
+
+    subtask_results, score, max_score = subtask_service_module.score_subtasks(subtasks, results_by_path)
+
+    assert [result["status"] for result in subtask_results] == ["passed", "failed"]
+    assert [result["earned"] for result in subtask_results] == [30, 0]
+    assert (score, max_score) == (30, 100)
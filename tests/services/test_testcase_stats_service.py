@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import patch
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the testcase_stats_service.py file
+testcase_stats_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'testcase_stats_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("testcase_stats_service_module", testcase_stats_service_path)
+testcase_stats_service_module = importlib.util.module_from_spec(spec)
+sys.modules["testcase_stats_service_module"] = testcase_stats_service_module
+spec.loader.exec_module(testcase_stats_service_module)
+
+@pytest.fixture
+def mock_mongo():
+    with patch('testcase_stats_service_module.mongo') as mock_mongo:
+        yield mock_mongo
+
+def test_testcase_stats_service_module_exists():
+    assert True
+
+def test_get_failure_rates_smooths_counters(mock_mongo):
+    mock_mongo.db.testcase_stats.find.return_value = [
+        {"testcase": "t/1.in", "runs": 8, "failures": 0},
+        {"testcase": "t/2.in", "runs": 8, "failures": 6},
+    ]
+
+    rates = testcase_stats_service_module.get_failure_rates("C1A")
+
+    assert rates == {"t/1.in": 0.1, "t/2.in": 0.7}
+
+def test_order_testcases_runs_most_failed_first():
+    testcases = [{"path": "t/1.in"}, {"path": "t/2.in"}, {"path": "t/3.in"}, {"path": "t/4.in"}]
+    rates = {"t/1.in": 0.1, "t/2.in": 0.7, "t/4.in": 0.1}
+
+    ordered = testcase_stats_service_module.order_testcases(testcases, rates)
+
+    # t/3.in has no statistics yet and is treated as a coin flip
+    assert [testcase["path"] for testcase in ordered] == ["t/2.in", "t/3.in", "t/1.in", "t/4.in"]
+
+def test_record_results_only_counts_tests_that_ran(mock_mongo):
+    results = [
+        {"testcase": "t/1.in", "status": "passed"},
+        {"testcase": "t/2.in", "status": "wrong_answer"},
+        {"testcase": "t/3.in", "status": "skipped"},
+        {"overall_status": "error", "message": "Code execution server is not running."},
+    ]
+
+    recorded = testcase_stats_service_module.record_results("C1A", results)
+
+    assert recorded == 2
+    operations = mock_mongo.db.testcase_stats.bulk_write.call_args.args[0]
+    assert operations[0]._doc == {"$inc": {"runs": 1, "failures": 0}}
+    assert operations[1]._doc == {"$inc": {"runs": 1, "failures": 1}}
+    assert operations[1]._upsert is True
+
+def test_record_results_ignores_verdicts_that_fail_every_test(mock_mongo):
+    results = [
+        {"testcase": "t/1.in", "status": "compilation_error"},
+        {"testcase": "t/2.in", "status": "error"},
+        {"testcase": "t/3.in", "status": "time_limit_exceeded"},
+    ]
+
+    recorded = testcase_stats_service_module.record_results("C1A", results)
+
+    assert recorded == 1
+    operations = mock_mongo.db.testcase_stats.bulk_write.call_args.args[0]
+    assert operations[0]._filter == {"problem_id": "C1A", "testcase": "t/3.in"}
+    assert operations[0]._doc == {"$inc": {"runs": 1, "failures": 1}}
@@ -162,3 +162,48 @@ def test_get_solved_problems_success(mock_github_services):
 
     assert error is None
     assert sorted(solved_problems) == sorted(["P1"]) # Only P1 should be solved
+
+# Tests for per-user aggregates
+ACCEPTED = {"submission_id": "S1", "problem_id": "P1", "username": "u", "language": "python", "status": "accepted", "timestamp": 100}
+
+def test_record_graded_submission_updates_aggregates_atomically():
+    with patch('user_service_module.mongo') as mock_mongo:
+        mock_mongo.db.submissions.update_one.return_value = MagicMock(modified_count=1)
+
+        counted, error = user_service_module.record_graded_submission(ACCEPTED)
+
+    assert counted is True
+    assert error is None
+    query, update = mock_mongo.db.users.update_one.call_args.args
+    assert query == {"username": "u"}
+    assert update["$inc"] == {"number_of_submissions": 1, "stats.verdicts.accepted": 1, "stats.languages.python": 1}
+    assert update["$addToSet"] == {"stats.attempted": "P1", "stats.solved": "P1"}
+    assert update["$min"] == {"stats.first_solved_at.P1": 100}
+
+def test_record_graded_submission_counts_each_submission_once():
+    with patch('user_service_module.mongo') as mock_mongo:
+        mock_mongo.db.submissions.update_one.return_value = MagicMock(modified_count=0)
+
+        counted, error = user_service_module.record_graded_submission(ACCEPTED)
+
+    assert counted is False
+    assert error is None
+    mock_mongo.db.users.update_one.assert_not_called()
+
+def test_rebuild_user_stats():
+    with patch('user_service_module.mongo') as mock_mongo:
+        mock_mongo.db.submissions.find.return_value = [
+            {**ACCEPTED, "submission_id": "S1", "timestamp": 300},
+            {**ACCEPTED, "submission_id": "S2", "timestamp": 200},
+            {**ACCEPTED, "submission_id": "S3", "problem_id": "P2", "status": "wrong_answer", "language": "c++"},
+        ]
+
+        stats, error = user_service_module.rebuild_user_stats("u")
+
+    assert error is None
+    assert stats["attempted"] == ["P1", "P2"]
+    assert stats["solved"] == ["P1"]
+    assert stats["verdicts"] == {"accepted": 2, "wrong_answer": 1}
+    assert stats["languages"] == {"python": 2, "c++": 1}
+    assert stats["first_solved_at"] == {"P1": 200}
+    assert mock_mongo.db.users.update_one.call_args.args[1]["$set"]["number_of_submissions"] == 3
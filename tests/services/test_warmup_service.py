@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+import pytz
+import sys
+import os
+import importlib.util
+
+# Construct the absolute path to the warmup_service.py file
+warmup_service_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'warmup_service.py'))
+
+# Create a module spec from the file path
+spec = importlib.util.spec_from_file_location("warmup_service_module", warmup_service_path)
+warmup_service_module = importlib.util.module_from_spec(spec)
+sys.modules["warmup_service_module"] = warmup_service_module
+spec.loader.exec_module(warmup_service_module)
+
+NOW = datetime(2025, 10, 1, 12, 0, 0, tzinfo=pytz.UTC)
+
+def _contest_time(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+@pytest.fixture
+def mock_mongo():
+    with patch('warmup_service_module.mongo') as mock_mongo:
+        warmup_service_module.warmup_status.clear()
+        yield mock_mongo
+
+@pytest.fixture
+def mock_fetchers():
+    with patch('warmup_service_module.get_file') as mock_get_file, \
+         patch('warmup_service_module.get_folder_contents') as mock_get_folder_contents, \
+         patch('warmup_service_module.judge_service') as mock_judge_service:
+        yield mock_get_file, mock_get_folder_contents, mock_judge_service
+
+def test_warmup_service_module_exists():
+    assert True
+
+def test_get_contests_to_warm_only_returns_contests_in_window(mock_mongo):
+    mock_mongo.db.contests.find.return_value = [
+        {"id": "C1", "startTime": _contest_time(NOW + timedelta(minutes=5))},
+        {"id": "C2", "startTime": _contest_time(NOW + timedelta(hours=5))},
+        {"id": "C3", "startTime": _contest_time(NOW - timedelta(minutes=5))},
+        {"id": "C4", "startTime": "not a time"},
+    ]
+
+    contests = warmup_service_module.get_contests_to_warm(NOW)
+
+    assert [contest["id"] for contest in contests] == ["C1"]
+
+def test_get_contests_to_warm_skips_warmed_but_retries_failed(mock_mongo):
+    start = _contest_time(NOW + timedelta(minutes=5))
+    mock_mongo.db.contests.find.return_value = [
+        {"id": "C1", "startTime": start},
+        {"id": "C2", "startTime": start},
+    ]
+    warmup_service_module.warmup_status["C1"] = {"status": "done", "problems": {}}
+    warmup_service_module.warmup_status["C2"] = {"status": "failed", "problems": {}}
+
+    contests = warmup_service_module.get_contests_to_warm(NOW)
+
+    assert [contest["id"] for contest in contests] == ["C2"]
+
+def test_warm_problem_fetches_package(mock_fetchers):
+    mock_get_file, mock_get_folder_contents, mock_judge_service = mock_fetchers
+    mock_get_file.return_value = ("content", "sha", None)
+    mock_get_folder_contents.return_value = ({"success": True, "data": [{"type": "dir", "name": "1"}]}, None)
+    mock_judge_service.load_problem_package.return_value = ({
+        "testcases": [{"stdin": "1", "path": "1.in"}, {"stdin": "2", "path": "2.in"}],
+        "validator": "pinned validator"
+    }, None)
+    mock_judge_service._run_validator.return_value = ({"stdout": ""}, None)
+
+    status, error = warmup_service_module.warm_problem("C1A")
+
+    assert error is None
+    assert status == {"testcases": 2, "validator_warmed": True}
+    mock_judge_service.load_problem_package.assert_called_once_with("C1A", force_refresh=True)
+    # The dry run uses the validator grading will use, not the one at the head of the repository
+    assert mock_judge_service._run_validator.call_args.args[0] == "pinned validator"
+    fetched = [call.args[0] for call in mock_get_file.call_args_list]
+    assert "data/contests/C1/problems/A/meta.json" in fetched
+    assert "data/contests/C1/problems/A/validator.py" not in fetched
+    assert "data/contests/C1/problems/A/samples/1/input.md" in fetched
+
+def test_warm_problem_reports_package_errors(mock_fetchers):
+    mock_get_file, mock_get_folder_contents, mock_judge_service = mock_fetchers
+    mock_get_file.return_value = ("content", "sha", None)
+    mock_get_folder_contents.return_value = ({"success": False}, None)
+    mock_judge_service.load_problem_package.return_value = (None, {"overall_status": "error", "message": "No test cases found for this problem."})
+
+    status, error = warmup_service_module.warm_problem("C1A")
+
+    assert status is None
+    assert error == {"message": "No test cases found for this problem."}
+    mock_judge_service._run_validator.assert_not_called()
+
+def test_warm_contest_records_status(mock_mongo):
+    mock_mongo.db.problems.find.return_value = [{"id": "C1A"}, {"id": "C1B"}]
+    with patch('warmup_service_module.warm_problem', side_effect=[
+        ({"testcases": 3, "validator_warmed": True}, None),
+        (None, {"message": "No test cases found"}),
+    ]):
+        warmup_service_module.warm_contest({"id": "C1"})
+
+    query, status = mock_mongo.db.contest_warmups.replace_one.call_args.args
+    assert query == {"_id": "C1"}
+    assert status["status"] == "failed"
+    assert status["problems"]["C1A"]["testcases"] == 3
+    assert status["problems"]["C1B"] == {"error": "No test cases found"}
+
+def test_get_warmup_status_reads_the_graders_record(mock_mongo):
+    mock_mongo.db.contest_warmups.find_one.return_value = {"status": "done", "problems": {}}
+    assert warmup_service_module.get_warmup_status("C1") == ({"status": "done", "problems": {}}, None)
+
+    mock_mongo.db.contest_warmups.find_one.return_value = None
+    assert warmup_service_module.get_warmup_status("C2")[1]["message"] == "No warmup has been run for this contest"
@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch
+import io
+import logging
+import os
+import sys
+import threading
+
+# Add the parent directory (backend-for-annaforces) to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from utils import tracing
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        # Route the writer thread to a buffer for each test
+        tracing.shutdown()
+        tracing.logger.handlers.clear()
+        self.stream = io.StringIO()
+
+    def tearDown(self):
+        tracing.shutdown()
+        tracing.logger.handlers.clear()
+        tracing.configure(level="INFO")
+
+    def _output(self):
+        tracing.shutdown()
+        return self.stream.getvalue()
+
+    def test_span_logs_duration(self):
+        tracing.configure(level="INFO", stream=self.stream)
+
+        with tracing.span("execute", submission_id="S1"):
+            pass
+
+        output = self._output()
+        self.assertIn("span=execute duration_ms=", output)
+        self.assertIn("submission_id=S1", output)
+
+    def test_traced_decorator_times_calls(self):
+        tracing.configure(level="INFO", stream=self.stream)
+
+        @tracing.traced("validate")
+        def validate(value):
+            return value * 2
+
+        self.assertEqual(validate(21), 42)
+        self.assertIn("span=validate", self._output())
+
+    def test_payloads_are_not_logged_at_info(self):
+        tracing.configure(level="INFO", stream=self.stream)
+
+        with patch.object(tracing, "JUDGE_TRACE_PAYLOAD_SAMPLE_RATE", 1.0):
+            tracing.payload("testcase", "1 2 3")
+
+        self.assertNotIn("payload=", self._output())
+
+    def test_payloads_are_capped_at_debug(self):
+        tracing.configure(level="DEBUG", stream=self.stream)
+
+        with patch.object(tracing, "JUDGE_TRACE_PAYLOAD_SAMPLE_RATE", 1.0), \
+             patch.object(tracing, "JUDGE_TRACE_PAYLOAD_MAX_CHARS", 10):
+            tracing.payload("testcase", "x" * 1000, path="1.in")
+
+        output = self._output()
+        self.assertIn("payload=testcase path=1.in", output)
+        self.assertIn("(1000 chars)", output)
+        self.assertNotIn("x" * 11, output)
+
+    def test_full_queue_drops_records_instead_of_blocking(self):
+        tracing.configure(level="INFO", stream=self.stream)
+        handler = tracing.logger.handlers[0]
+        tracing.shutdown()  # Stop the writer so the queue can fill up
+
+        dropped = tracing.get_dropped_records()
+        with patch.object(handler.queue, "put_nowait", side_effect=tracing.queue.Full):
+            tracing.logger.info("dropped")
+
+        self.assertEqual(tracing.get_dropped_records(), dropped + 1)
+
+    def test_full_queue_counts_drops_from_every_thread(self):
+        tracing.configure(level="INFO", stream=self.stream)
+        handler = tracing.logger.handlers[0]
+        tracing.shutdown()
+
+        dropped = tracing.get_dropped_records()
+        def log_many():
+            for _ in range(1000):
+                tracing.logger.info("dropped")
+        with patch.object(handler.queue, "put_nowait", side_effect=tracing.queue.Full):
+            threads = [threading.Thread(target=log_many) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(tracing.get_dropped_records(), dropped + 4000)
+
+    def test_records_are_formatted_by_the_writer_thread(self):
+        tracing.configure(level="INFO", stream=self.stream)
+        handler = tracing.logger.handlers[0]
+        record = tracing.logger.makeRecord("judge", logging.INFO, __file__, 0, "span=%s", ("grade",), None)
+
+        prepared = handler.prepare(record)
+
+        self.assertIs(prepared, record)
+        self.assertEqual(prepared.args, ("grade",))
+        self.assertEqual(prepared.msg, "span=%s")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+from dotenv import load_dotenv
+import os
+import sys
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import functools
+import contextlib
+from logging.handlers import QueueHandler, QueueListener
+
+load_dotenv()
+
+# INFO logs span timings only; payloads (testcases, outputs, validator source) need DEBUG
+JUDGE_TRACE_LEVEL = os.getenv("JUDGE_TRACE_LEVEL", "INFO").upper()
+# Fraction of payloads logged at DEBUG level, and the size each one is cut to
+JUDGE_TRACE_PAYLOAD_SAMPLE_RATE = float(os.getenv("JUDGE_TRACE_PAYLOAD_SAMPLE_RATE", 0.01))
+JUDGE_TRACE_PAYLOAD_MAX_CHARS = int(os.getenv("JUDGE_TRACE_PAYLOAD_MAX_CHARS", 512))
+# Records waiting for the writer thread; beyond this they are dropped instead of blocking the judge
+JUDGE_TRACE_QUEUE_SIZE = int(os.getenv("JUDGE_TRACE_QUEUE_SIZE", 10000))
+
+logger = logging.getLogger("judge")
+
+_listener = None
+_listener_lock = threading.Lock()
+_dropped_records = 0
+_dropped_lock = threading.Lock()
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without ever waiting on it: when the queue is full the record is dropped.
+    """
+    def prepare(self, record):
+        # QueueHandler.prepare formats the message on the calling thread; leave it to the writer thread.
+        # Callers only log immutable values, so formatting later renders the same text.
+        return record
+
+    def enqueue(self, record):
+        global _dropped_records
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _dropped_lock:
+                _dropped_records += 1
+
+def configure(level=None, stream=None):
+    """
+    Sets up the judge logger with an asynchronous handler. Formatting and the stream writes
+    happen on a QueueListener thread, so tracing never blocks a grading thread on stdout.
+    Safe to call more than once; later calls only change the level.
+    """
+    global _listener
+    with _listener_lock:
+        logger.setLevel(level or JUDGE_TRACE_LEVEL)
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(stream or sys.stdout)
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+
+        records = queue.Queue(maxsize=JUDGE_TRACE_QUEUE_SIZE)
+        logger.addHandler(_DroppingQueueHandler(records))
+        logger.propagate = False
+
+        _listener = QueueListener(records, stream_handler)
+        _listener.start()
+        atexit.register(shutdown)
+
+def shutdown():
+    """
+    Flushes queued records and stops the writer thread.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+def _format_fields(fields):
+    return "".join(f" {key}={value}" for key, value in fields.items())
+
+@contextlib.contextmanager
+def span(name, **fields):
+    """
+    Times a block and logs it as "span=<name> duration_ms=<ms> key=value ...".
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if logger.isEnabledFor(logging.INFO):
+            duration_ms = (time.perf_counter() - started) * 1000
+            logger.info("span=%s duration_ms=%.1f%s", name, duration_ms, _format_fields(fields))
+
+def traced(name):
+    """
+    Decorator form of span() for functions that are called once per fetch, execution or validation.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def payload(name, value, **fields):
+    """
+    Logs a sampled, size-capped payload at DEBUG level. Nothing is rendered unless the record is actually logged.
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= JUDGE_TRACE_PAYLOAD_SAMPLE_RATE:
+        return
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) > JUDGE_TRACE_PAYLOAD_MAX_CHARS:
+        text = f"{text[:JUDGE_TRACE_PAYLOAD_MAX_CHARS]}... ({len(text)} chars)"
+    logger.debug("payload=%s%s value=%r", name, _format_fields(fields), text)
+
+def get_dropped_records():
+    with _dropped_lock:
+        return _dropped_records
+
+configure()